@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class MindcareApiConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'mindcare_api'
+
+    def ready(self):
+        # Connects the receivers that keep caches in step with the models
+        from . import signals
+
+        if settings.EMOTION_MODEL_WARMUP:
+            from .services.model_registry import warmup_emotion_model
+            warmup_emotion_model()
@@ -0,0 +1,35 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+import time
+
+from .services.token_cache import get_token_user_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that caches token -> user lookups.
+
+    See TokenUserCache; tokens are invalidated when deleted (logout) and
+    users when saved or deleted (deactivation), from signals.py.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_user_cache()
+        user = cache.get(key)
+        if user is not None:
+            return user, self.get_model()(key=key, user=user)
+
+        loaded_at = time.time()
+        user_id = cache.get_user_id(key)
+        if user_id is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(key, user, loaded_at)
+            return user, token
+
+        from .models import User
+
+        user = User.objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        cache.set(key, user, loaded_at, shared=False)
+        return user, self.get_model()(key=key, user=user)
@@ -0,0 +1,63 @@
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+import hashlib
+
+
+def make_etag(*parts):
+    """Strong ETag over the string form of parts"""
+    return quote_etag(hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest())
+
+
+def conditional_get(request, etag, last_modified, build_response):
+    """Answer 304 Not Modified when the client's copy matches the validators,
+    otherwise return build_response() with them attached.
+
+    Validators should come from cheap queries (a count, a max timestamp, a
+    row's own fields), so an unchanged resource is never serialized.
+    """
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        response = build_response()
+
+    if response.status_code in (200, 304):
+        if etag:
+            response['ETag'] = etag
+        if last_modified_ts is not None:
+            response['Last-Modified'] = http_date(last_modified_ts)
+        # Per-user data: keep it out of shared caches and revalidate every time
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def queryset_validators(request, queryset, timestamp_field='updated_at'):
+    """Validators of a list response: an ETag over its row count and newest timestamp.
+
+    The full URL is part of the ETag, so filters and page numbers get their
+    own; a deleted row changes the count and an added or edited one the
+    timestamp. There is no Last-Modified: deleting a row leaves the newest
+    timestamp as it was, so If-Modified-Since alone would answer 304 to a
+    list that lost a row.
+    """
+    summary = queryset.order_by().aggregate(count=Count('pk'), last_modified=Max(timestamp_field))
+    etag = make_etag(request.get_full_path(), summary['count'], summary['last_modified'])
+    return etag, None
+
+
+class ConditionalGetMixin:
+    """Conditional GET (ETag / Last-Modified) for generic views.
+
+    Views implement get_validators(), returning (etag, last_modified) for
+    the response GET would build; either may be None.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        return conditional_get(
+            request, etag, last_modified,
+            lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        )
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Lower, TruncDate
+from datetime import date
+
+from ...models import ChatMessage, ChatSession, DailyUserStats, User
+from ...services.rollup_service import STRESS_LEVEL_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild DailyUserStats from chat session and message history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='Only rebuild days on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--user-id', type=int, action='append', dest='user_ids')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        if options['user_ids']:
+            user_ids = user_ids.filter(id__in=options['user_ids'])
+
+        users = rows = 0
+        chunk = []
+        for user_id in user_ids.iterator(chunk_size=options['chunk_size']):
+            chunk.append(user_id)
+            if len(chunk) >= options['chunk_size']:
+                rows += self._rebuild_chunk(chunk, options['since'])
+                users += len(chunk)
+                chunk = []
+        if chunk:
+            rows += self._rebuild_chunk(chunk, options['since'])
+            users += len(chunk)
+
+        self.stdout.write(f"Rebuilt {rows} daily stats rows for {users} users")
+
+    @transaction.atomic
+    def _rebuild_chunk(self, user_ids, since):
+        # Lock the chunk's users so sessions and messages recorded meanwhile
+        # wait for the rebuilt rows instead of updating the deleted ones
+        list(User.objects.select_for_update().filter(id__in=user_ids).values_list('id', flat=True))
+
+        sessions = ChatSession.objects.filter(user_id__in=user_ids)
+        messages = ChatMessage.objects.filter(
+            session__user_id__in=user_ids,
+            sender='user',
+            emotion_detected__isnull=False
+        )
+        existing = DailyUserStats.objects.filter(user_id__in=user_ids)
+        if since:
+            sessions = sessions.filter(session_start__date__gte=since)
+            messages = messages.filter(timestamp__date__gte=since)
+            existing = existing.filter(date__gte=since)
+
+        stats = {}
+
+        def day(user_id, on):
+            if (user_id, on) not in stats:
+                stats[(user_id, on)] = DailyUserStats(
+                    user_id=user_id, date=on,
+                    emotion_counts={}, emotion_confidence_sums={}, emotion_first_seen={}
+                )
+            return stats[(user_id, on)]
+
+        session_rows = sessions.annotate(day=TruncDate('session_start')).order_by().values(
+            'user_id', 'day', 'stress_level'
+        ).annotate(count=Count('id'))
+        for row in session_rows:
+            field = STRESS_LEVEL_FIELDS.get(row['stress_level'])
+            if field:
+                setattr(day(row['user_id'], row['day']), field, row['count'])
+
+        message_rows = messages.annotate(
+            day=TruncDate('timestamp'),
+            emotion=Lower('emotion_detected')
+        ).order_by().values('session__user_id', 'day', 'emotion').annotate(
+            count=Count('id'),
+            confidence=Sum('emotion_confidence'),
+            first_seen=Min('timestamp')
+        )
+        for row in message_rows:
+            stats_row = day(row['session__user_id'], row['day'])
+            stats_row.emotion_counts[row['emotion']] = row['count']
+            stats_row.emotion_confidence_sums[row['emotion']] = float(row['confidence'] or 0)
+            stats_row.emotion_first_seen[row['emotion']] = row['first_seen'].isoformat()
+
+        existing.delete()
+        DailyUserStats.objects.bulk_create(stats.values())
+        return len(stats)
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+import random
+import string
+import time
+
+from ...services.keyword_matcher import KeywordMatcher, normalize_text
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the compiled safety keyword matcher against a linear substring scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--phrases', type=int, default=5000, help='Synthetic phrases per category')
+        parser.add_argument('--categories', type=int, default=3)
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = [self._word(rng) for _ in range(20000)]
+
+        phrases_by_category = {
+            f"category_{index}": [
+                ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4)))
+                for _ in range(options['phrases'])
+            ]
+            for index in range(options['categories'])
+        }
+        messages = [
+            ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(5, 60)))
+            for _ in range(options['messages'])
+        ]
+        total_phrases = sum(len(phrases) for phrases in phrases_by_category.values())
+
+        started = time.perf_counter()
+        matcher = KeywordMatcher(phrases_by_category)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        compiled_hits = sum(1 for message in messages if matcher.first_match(message))
+        compiled_ms = (time.perf_counter() - started) * 1000
+
+        # The previous approach: lowercase and test every keyword as a substring
+        started = time.perf_counter()
+        linear_hits = 0
+        for message in messages:
+            message_lower = message.lower()
+            if any(
+                phrase in message_lower
+                for phrases in phrases_by_category.values() for phrase in phrases
+            ):
+                linear_hits += 1
+        linear_ms = (time.perf_counter() - started) * 1000
+
+        self.stdout.write(f"{total_phrases} phrases, {len(messages)} messages")
+        self.stdout.write(f"Compiled matcher: built in {build_ms:.0f}ms, "
+                          f"{compiled_ms / len(messages) * 1000:.1f}us/message, {compiled_hits} hits")
+        self.stdout.write(f"Linear scan: {linear_ms / len(messages) * 1000:.1f}us/message, "
+                          f"{linear_hits} hits (substring, no word boundaries)")
+        self.stdout.write(f"Speedup: {linear_ms / compiled_ms:.1f}x")
+
+    def _word(self, rng):
+        return normalize_text(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+import time
+
+from ...models import PeerPost
+from ...pagination import PeerPostPagination
+
+
+class Command(BaseCommand):
+    help = 'Compare OFFSET and keyset page latency at increasing depths of the peer post feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depths', default='1,10,100,1000,10000', help='Comma-separated page numbers')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        pagination = PeerPostPagination()
+        pagination.model = PeerPost
+        queryset = PeerPost.objects.filter(is_flagged=False)
+        total = queryset.count()
+        self.stdout.write(f"{total} visible posts, {page_size} per page")
+
+        for depth in [int(value) for value in options['depths'].split(',')]:
+            offset = (depth - 1) * page_size
+            if offset >= total:
+                self.stdout.write(f"Page {depth}: beyond the end of the feed, skipped")
+                continue
+
+            # What PageNumberPagination runs: a COUNT(*) plus an OFFSET scan
+            offset_ms = self._time(options['repeat'], lambda: (
+                queryset.count(),
+                list(queryset.order_by(*pagination.ordering)[offset:offset + page_size])
+            ))
+
+            keyset_ms = None
+            if offset:
+                # The row a client would hold the cursor for after paging this far
+                last_row = queryset.order_by(*pagination.ordering)[offset - 1]
+                position = (last_row.created_at, last_row.id)
+                keyset_ms = self._time(options['repeat'], lambda: list(
+                    queryset.filter(pagination._after(position)).order_by(*pagination.ordering)[:page_size + 1]
+                ))
+            else:
+                keyset_ms = self._time(options['repeat'], lambda: list(
+                    queryset.order_by(*pagination.ordering)[:page_size + 1]
+                ))
+
+            self.stdout.write(f"Page {depth}: offset {offset_ms:.2f}ms, keyset {keyset_ms:.2f}ms")
+
+    def _time(self, repeat, query):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)[len(timings) // 2]
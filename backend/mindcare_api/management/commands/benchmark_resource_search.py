@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+import random
+import time
+
+from ...models import Resource
+from ...services.resource_search import filter_by_tags, search_resources, update_search_vectors
+
+WORDS = (
+    'anxiety stress sleep breathing mindfulness exam study focus grief loneliness '
+    'motivation panic relaxation journaling exercise friendship family burnout '
+    'confidence meditation nutrition routine gratitude resilience mood anger'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Compare resource search strategies over a synthetic catalog (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=100000)
+        parser.add_argument('--query', default='exam anxiety')
+        parser.add_argument('--tags', default='sleep,routine')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._load_catalog(options['resources'], random.Random(options['seed']))
+            self._compare(options)
+            # Leave the real catalog untouched
+            transaction.set_rollback(True)
+
+    def _load_catalog(self, count, rng):
+        started = time.perf_counter()
+        for start in range(0, count, 5000):
+            Resource.objects.bulk_create([
+                Resource(
+                    title=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                    description=' '.join(rng.choices(WORDS, k=40)),
+                    resource_type=rng.choice(Resource.RESOURCE_TYPES)[0],
+                    language='en',
+                    category=rng.choice(WORDS),
+                    tags=rng.sample(WORDS, 3)
+                )
+                for _ in range(min(5000, count - start))
+            ])
+        update_search_vectors(Resource.objects.filter(search_vector__isnull=True))
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Resource._meta.db_table}")
+        self.stdout.write(f"Loaded {count} synthetic resources in {time.perf_counter() - started:.1f}s")
+
+    def _compare(self, options):
+        resources = Resource.objects.filter(is_active=True, language='en').defer('search_vector')
+        words = options['query'].split()
+        tags = options['tags'].split(',')
+
+        def client_side_search():
+            # What clients do today: fetch the catalog and filter it themselves
+            return [
+                resource for resource in resources
+                if all(word in f"{resource.title} {resource.description} {' '.join(resource.tags)}".lower()
+                       for word in words)
+            ][:20]
+
+        def substring_search():
+            condition = Q()
+            for word in words:
+                condition &= Q(title__icontains=word) | Q(description__icontains=word)
+            return list(resources.filter(condition)[:20])
+
+        def client_side_tags():
+            return [resource for resource in resources if set(tags) <= set(resource.tags)][:20]
+
+        strategies = [
+            ('client-side search', client_side_search),
+            ('ILIKE search', substring_search),
+            ('full-text search (q=)', lambda: list(search_resources(resources, options['query'])[:20])),
+            ('client-side tags', client_side_tags),
+            ('tag containment (tags=)', lambda: list(filter_by_tags(resources, tags)[:20])),
+        ]
+        for name, run in strategies:
+            self.stdout.write(f"{name}: {self._time(options['repeat'], run):.1f}ms")
+
+        self.stdout.write(search_resources(resources, options['query'])[:20].explain())
+        self.stdout.write(filter_by_tags(resources, tags)[:20].explain())
+
+    def _time(self, repeat, query):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+import time
+
+from ...authentication import CachedTokenAuthentication
+from ...models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and latency per request of TokenAuthentication and CachedTokenAuthentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help='Authenticate as this user (default: the first active user)')
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by('id')
+        if options['user_id']:
+            users = users.filter(id=options['user_id'])
+        user = users.first()
+        if user is None:
+            raise CommandError("No active user to authenticate as")
+
+        token, _ = Token.objects.get_or_create(user=user)
+        request = RequestFactory().get('/api/dashboard/', HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.stdout.write(f"Authenticating user {user.id} {options['requests']} times")
+
+        for name, backend in [('TokenAuthentication', TokenAuthentication()),
+                              ('CachedTokenAuthentication', CachedTokenAuthentication())]:
+            timings = []
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(options['requests']):
+                    started = time.perf_counter()
+                    backend.authenticate(request)
+                    timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{name}: {len(queries) / options['requests']:.3f} queries/request, "
+                f"median {timings[len(timings) // 2]:.3f}ms, p99 {timings[int(len(timings) * 0.99)]:.3f}ms"
+            )
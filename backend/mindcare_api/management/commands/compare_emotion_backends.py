@@ -0,0 +1,115 @@
+from django.core.management.base import BaseCommand, CommandError
+import statistics
+import time
+
+from ...services.emotion_backends import build_emotion_backend
+
+# Fixed corpus of typical student messages used for parity and latency checks
+PARITY_CORPUS = [
+    "I'm so stressed about my exams next week",
+    "idk",
+    "thanks",
+    "I can't sleep, my mind keeps racing about everything I have to do",
+    "My roommate keeps ignoring me and I feel really lonely",
+    "I finally finished my project and I'm so happy!",
+    "Why does nobody ever listen to me, this is so unfair",
+    "I'm scared I'm going to fail this semester",
+    "I love my friends, they always cheer me up",
+    "I was surprised my professor actually gave me an extension",
+    "Everything feels pointless lately",
+    "I'm nervous about the presentation tomorrow",
+    "Today was actually a good day",
+    "I'm angry at myself for procrastinating again",
+    "I miss home so much",
+    "Can you help me calm down?",
+    "I feel overwhelmed with deadlines and work shifts",
+    "My family is proud of me and that feels amazing",
+    "I don't know who to talk to about this",
+    "I got rejected from the internship and I feel terrible",
+    "The new counselor was really kind to me",
+    "I'm exhausted, I've been studying since 6am",
+    "People in my class make me feel stupid",
+    "I can't stop worrying about money",
+    "ok",
+    "I think I'm doing a bit better this week",
+    "Group projects make me so frustrated",
+    "I'm afraid to tell my parents about my grades",
+    "Honestly I'm just tired of everything",
+    "I'm excited for the weekend trip with my friends",
+]
+
+
+class Command(BaseCommand):
+    help = 'Check label/confidence parity and compare latency between emotion backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default='torch')
+        parser.add_argument('--candidate', default='onnx')
+        parser.add_argument('--batch-size', type=int, default=16)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--min-agreement', type=float, default=0.95,
+                            help='Minimum fraction of matching labels')
+        parser.add_argument('--max-confidence-delta', type=float, default=0.05,
+                            help='Maximum allowed difference in rounded confidence')
+
+    def handle(self, *args, **options):
+        baseline = build_emotion_backend(options['baseline'])
+        candidate = build_emotion_backend(options['candidate'])
+
+        baseline_results = baseline(PARITY_CORPUS)
+        candidate_results = candidate(PARITY_CORPUS)
+
+        matches = 0
+        max_delta = 0.0
+        for text, expected, actual in zip(PARITY_CORPUS, baseline_results, candidate_results):
+            # Confidences are compared the way they are stored on ChatMessage
+            delta = abs(round(expected['score'], 2) - round(actual['score'], 2))
+            max_delta = max(max_delta, delta)
+            if expected['label'].lower() == actual['label'].lower():
+                matches += 1
+            else:
+                self.stdout.write(
+                    f"  mismatch: {text!r} {expected['label']} ({expected['score']:.2f}) "
+                    f"vs {actual['label']} ({actual['score']:.2f})"
+                )
+
+        agreement = matches / len(PARITY_CORPUS)
+        self.stdout.write(f"Label agreement: {agreement:.1%} ({matches}/{len(PARITY_CORPUS)})")
+        self.stdout.write(f"Max confidence delta: {max_delta:.2f}")
+
+        for backend in (baseline, candidate):
+            single, throughput = self._measure(backend, options['batch_size'], options['repeat'])
+            self.stdout.write(
+                f"{backend.name}: p50 {statistics.median(single):.1f}ms, "
+                f"p95 {self._percentile(single, 0.95):.1f}ms per message (batch 1), "
+                f"{throughput:.1f} messages/s (batch {options['batch_size']})"
+            )
+
+        if agreement < options['min_agreement'] or max_delta > options['max_confidence_delta']:
+            raise CommandError('Candidate backend is outside the parity tolerance')
+        self.stdout.write(self.style.SUCCESS('Backends are in parity'))
+
+    def _measure(self, backend, batch_size, repeat):
+        backend(PARITY_CORPUS[:2])  # warm up
+
+        single = []
+        for _ in range(repeat):
+            for text in PARITY_CORPUS:
+                started = time.perf_counter()
+                backend(text)
+                single.append((time.perf_counter() - started) * 1000)
+
+        total = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for i in range(0, len(PARITY_CORPUS), batch_size):
+                batch = PARITY_CORPUS[i:i + batch_size]
+                backend(batch, batch_size=len(batch))
+                total += len(batch)
+        throughput = total / (time.perf_counter() - started)
+
+        return single, throughput
+
+    def _percentile(self, values, fraction):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pathlib import Path
+import os
+import tempfile
+
+from ...services.emotion_backends import ONNX_MODEL_FILENAME
+
+
+class Command(BaseCommand):
+    help = 'Export the emotion model to ONNX and apply int8 dynamic quantization'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=None, help='Model id or path (defaults to EMOTION_MODEL_NAME)')
+        parser.add_argument('--output-dir', default=None, help='Target directory (defaults to EMOTION_ONNX_MODEL_DIR)')
+        parser.add_argument('--opset', type=int, default=14)
+
+    def handle(self, *args, **options):
+        try:
+            import torch
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+        except ImportError as e:
+            raise CommandError(f"ONNX export requires torch, transformers, onnx and onnxruntime: {e}")
+
+        model_name = options['model'] or settings.EMOTION_MODEL_NAME
+        output_dir = Path(options['output_dir'] or settings.EMOTION_ONNX_MODEL_DIR)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        self.stdout.write(f"Loading {model_name}...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+
+        sample = tokenizer(["I'm so stressed about exams"], return_tensors='pt')
+        input_names = [name for name in ('input_ids', 'attention_mask') if name in sample]
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes['logits'] = {0: 'batch'}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fp32_path = os.path.join(tmp_dir, 'model.onnx')
+            with torch.no_grad():
+                torch.onnx.export(
+                    model,
+                    tuple(sample[name] for name in input_names),
+                    fp32_path,
+                    input_names=input_names,
+                    output_names=['logits'],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=options['opset'],
+                    do_constant_folding=True
+                )
+
+            quantized_path = output_dir / ONNX_MODEL_FILENAME
+            quantize_dynamic(fp32_path, str(quantized_path), weight_type=QuantType.QInt8)
+
+        # The runtime backend loads tokenizer and label mapping from the same directory
+        tokenizer.save_pretrained(output_dir)
+        model.config.save_pretrained(output_dir)
+
+        size_mb = quantized_path.stat().st_size / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {quantized_path} ({size_mb:.1f}MB)"))
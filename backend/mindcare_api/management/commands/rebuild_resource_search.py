@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from ...models import Resource
+from ...services.resource_search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored full-text search vector of resources'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Only resources that have no search vector yet, e.g. after a bulk load')
+
+    def handle(self, *args, **options):
+        resources = Resource.objects.all()
+        if options['missing_only']:
+            resources = resources.filter(search_vector__isnull=True)
+
+        max_id = resources.aggregate(max_id=Max('id'))['max_id'] or 0
+        updated = 0
+        # Id ranges keep each UPDATE (and its row locks) short
+        for start in range(0, max_id, options['chunk_size']):
+            updated += update_search_vectors(
+                resources.filter(id__gt=start, id__lte=start + options['chunk_size'])
+            )
+
+        self.stdout.write(f"Updated the search vector of {updated} resources")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.risk_index import get_student_risk_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the counselor risk leaderboard from the database and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report students whose place on the board is wrong')
+
+    def handle(self, *args, **options):
+        risk_index = get_student_risk_index()
+        if risk_index.redis_client is None:
+            raise CommandError("The risk index needs CACHE_REDIS_URL; without it the board is read from the database")
+
+        if not options['verify']:
+            students = risk_index.rebuild()
+            self.stdout.write(f"Rebuilt the risk index with {students} students")
+            return
+
+        expected = {user_id: score['risk_score'] for user_id, score in risk_index.scores().items()}
+        stored = {
+            int(member): score
+            for member, score in risk_index.redis_client.zrange(risk_index.key, 0, -1, withscores=True)
+        }
+
+        mismatched = 0
+        for user_id in sorted(set(expected) | set(stored)):
+            if expected.get(user_id) != stored.get(user_id):
+                self.stdout.write(f"  user {user_id}: stored {stored.get(user_id)}, actual {expected.get(user_id)}")
+                mismatched += 1
+
+        self.stdout.write(f"Checked {len(expected)} students at risk, found {mismatched} misplaced on the board")
+        if mismatched:
+            raise CommandError(f"{mismatched} students have a stale risk score")
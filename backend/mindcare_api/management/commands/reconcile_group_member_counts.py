@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ...models import SupportGroup
+
+
+class Command(BaseCommand):
+    help = 'Recompute SupportGroup.member_count from active memberships and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report groups whose stored count is wrong')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        # Lock the groups so joins and leaves wait until the counts are fixed
+        locked_ids = list(SupportGroup.objects.select_for_update().values_list('id', flat=True))
+        groups = SupportGroup.objects.filter(id__in=locked_ids).annotate(
+            active_members=Count('memberships', filter=Q(memberships__is_active=True))
+        ).only('id', 'name', 'member_count')
+
+        stale = []
+        for group in groups:
+            if group.member_count != group.active_members:
+                self.stdout.write(
+                    f"  group {group.id} ({group.name}): stored {group.member_count}, actual {group.active_members}"
+                )
+                group.member_count = group.active_members
+                group.updated_at = timezone.now()
+                stale.append(group)
+
+        if stale and not options['verify']:
+            SupportGroup.objects.bulk_update(stale, ['member_count', 'updated_at'])
+
+        action = 'found' if options['verify'] else 'repaired'
+        self.stdout.write(f"Checked {len(locked_ids)} groups, {action} {len(stale)} with a stale member count")
+        if options['verify'] and stale:
+            raise CommandError(f"{len(stale)} groups have a member count that does not match their memberships")
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from collections import defaultdict
+
+from ...models import ChatMessage, ChatSession
+from ...services.emotion_service import DEFAULT_STRESS_WEIGHT, STRESS_WEIGHTS
+
+
+class Command(BaseCommand):
+    help = 'Recompute ChatSession stress aggregates from message history and verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report sessions whose stored aggregates are wrong')
+        parser.add_argument('--session-id', type=int, action='append', dest='session_ids')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--tolerance', type=float, default=1e-6)
+
+    def handle(self, *args, **options):
+        session_ids = ChatSession.objects.order_by('id').values_list('id', flat=True)
+        if options['session_ids']:
+            session_ids = session_ids.filter(id__in=options['session_ids'])
+
+        checked = mismatched = 0
+        chunk = []
+        for session_id in session_ids.iterator(chunk_size=options['chunk_size']):
+            chunk.append(session_id)
+            if len(chunk) >= options['chunk_size']:
+                mismatched += self._process_chunk(chunk, options)
+                checked += len(chunk)
+                chunk = []
+        if chunk:
+            mismatched += self._process_chunk(chunk, options)
+            checked += len(chunk)
+
+        action = 'found' if options['verify'] else 'repaired'
+        self.stdout.write(f"Checked {checked} sessions, {action} {mismatched} with stale aggregates")
+        if options['verify'] and mismatched:
+            raise CommandError(f"{mismatched} sessions have aggregates that do not match their history")
+
+    @transaction.atomic
+    def _process_chunk(self, session_ids, options):
+        # Lock the chunk so messages scored meanwhile cannot be overwritten
+        sessions = list(
+            ChatSession.objects.select_for_update().filter(id__in=session_ids).only(
+                'id', 'stress_score_sum', 'emotion_confidence_sum', 'emotion_counts'
+            )
+        )
+        expected = defaultdict(lambda: {'stress_score_sum': 0.0, 'emotion_confidence_sum': 0.0, 'emotion_counts': {}})
+
+        rows = ChatMessage.objects.filter(
+            session_id__in=session_ids,
+            sender='user',
+            emotion_detected__isnull=False
+        ).values('session_id', 'emotion_detected').annotate(
+            count=Count('id'),
+            confidence=Sum('emotion_confidence')
+        )
+        for row in rows:
+            totals = expected[row['session_id']]
+            emotion = row['emotion_detected'].lower()
+            confidence = float(row['confidence'] or 0)
+            totals['stress_score_sum'] += STRESS_WEIGHTS.get(emotion, DEFAULT_STRESS_WEIGHT) * confidence
+            totals['emotion_confidence_sum'] += confidence
+            totals['emotion_counts'][emotion] = totals['emotion_counts'].get(emotion, 0) + row['count']
+
+        stale = []
+        for session in sessions:
+            totals = expected[session.id]
+            if (
+                abs(session.stress_score_sum - totals['stress_score_sum']) > options['tolerance']
+                or abs(session.emotion_confidence_sum - totals['emotion_confidence_sum']) > options['tolerance']
+                or session.emotion_counts != totals['emotion_counts']
+            ):
+                if options['verify']:
+                    self.stdout.write(f"  session {session.id}: stored aggregates do not match history")
+                session.stress_score_sum = totals['stress_score_sum']
+                session.emotion_confidence_sum = totals['emotion_confidence_sum']
+                session.emotion_counts = totals['emotion_counts']
+                stale.append(session)
+
+        if stale and not options['verify']:
+            ChatSession.objects.bulk_update(
+                stale, ['stress_score_sum', 'emotion_confidence_sum', 'emotion_counts']
+            )
+        return len(stale)
@@ -0,0 +1,229 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:33
+
+from django.conf import settings
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Weighted tsvector of existing resources: title, then tags, then description"""
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    table = connection.ops.quote_name(apps.get_model('mindcare_api', 'Resource')._meta.db_table)
+    config = settings.RESOURCE_SEARCH_CONFIG
+    schema_editor.execute(
+        f"UPDATE {table} SET search_vector = "
+        "setweight(to_tsvector(%s::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, coalesce(tags::text, '')), 'B') || "
+        "setweight(to_tsvector(%s::regconfig, coalesce(description, '')), 'C')",
+        [config, config, config]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mindcare_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('low_sessions', models.IntegerField(default=0)),
+                ('moderate_sessions', models.IntegerField(default=0)),
+                ('high_sessions', models.IntegerField(default=0)),
+                ('critical_sessions', models.IntegerField(default=0)),
+                ('emotion_counts', models.JSONField(default=dict)),
+                ('emotion_confidence_sums', models.JSONField(default=dict)),
+                ('emotion_first_seen', models.JSONField(default=dict)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], max_length=10)),
+                ('recipient', models.CharField(max_length=255)),
+                ('subject', models.CharField(blank=True, max_length=255)),
+                ('template', models.CharField(blank=True, max_length=50)),
+                ('substitutions', models.JSONField(default=dict)),
+                ('body', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['next_attempt_at', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyReportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField(unique=True)),
+                ('week_end', models.DateField()),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('total_shards', models.IntegerField(default=0)),
+                ('completed_shards', models.IntegerField(default=0)),
+                ('reports_generated', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-week_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyReportShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_user_id', models.BigIntegerField()),
+                ('max_user_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('reports_generated', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['min_user_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='emotion_confidence_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='emotion_counts',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='recent_turns',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='stress_score_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='supportgroup',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='supportgroup',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='mindcare_ap_user_id_726531_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['user', 'alert_type', '-created_at'], name='mindcare_ap_user_id_b0cf57_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['counselor', 'appointment_date', 'status'], name='mindcare_ap_counsel_41016b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'scheduled')), fields=['student', 'appointment_date'], name='booking_student_upcoming_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'timestamp', 'id'], name='mindcare_ap_session_e5853a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('emotion_detected__isnull', False), ('sender', 'user')), fields=['session', 'timestamp'], name='chatmessage_scored_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', '-session_start'], name='mindcare_ap_user_id_7322fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['session_start'], name='chatsession_active_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(condition=models.Q(('stress_level__in', ['high', 'critical'])), fields=['session_start', 'user'], name='chatsession_high_stress_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peerpost',
+            index=models.Index(fields=['is_flagged', '-created_at', '-id'], name='mindcare_ap_is_flag_e0e9e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='peerpost',
+            index=models.Index(fields=['group', 'is_flagged', '-created_at', '-id'], name='mindcare_ap_group_i_148d60_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='mindcare_ap_search__70f8cb_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='mindcare_ap_tags_725901_gin'),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='weeklyreportshard',
+            name='run',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='mindcare_api.weeklyreportrun'),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='alert',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='mindcare_api.alert'),
+        ),
+        migrations.AddField(
+            model_name='dailyuserstats',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='weeklyreportshard',
+            unique_together={('run', 'min_user_id')},
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='mindcare_ap_status_621242_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyuserstats',
+            index=models.Index(condition=models.Q(('critical_sessions__gt', 0)), fields=['date', 'user'], name='dailystats_critical_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyuserstats',
+            unique_together={('user', 'date')},
+        ),
+    ]
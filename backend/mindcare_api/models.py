@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import json
 
@@ -37,10 +40,28 @@ class ChatSession(models.Model):
     overall_emotion = models.CharField(max_length=50, blank=True, null=True)
     stress_level = models.CharField(max_length=20, choices=STRESS_LEVELS, default='low')
     session_summary = models.TextField(blank=True, null=True)
+    # Short tail of the latest turns; older student turns are folded into
+    # session_summary by ConversationContextEngine
+    recent_turns = models.JSONField(default=list)
     is_active = models.BooleanField(default=True)
+    # Running aggregates over scored user messages, kept up to date by
+    # EmotionDetectionService.record_message_emotion
+    stress_score_sum = models.FloatField(default=0)
+    emotion_confidence_sum = models.FloatField(default=0)
+    emotion_counts = models.JSONField(default=dict)
 
     class Meta:
         ordering = ['-session_start']
+        indexes = [
+            # A student's sessions, newest first (session list, dashboard)
+            models.Index(fields=['user', '-session_start']),
+            # cleanup_old_sessions
+            models.Index(fields=['session_start'], name='chatsession_active_start_idx',
+                         condition=models.Q(is_active=True)),
+            # Persistent stress reconciliation
+            models.Index(fields=['session_start', 'user'], name='chatsession_high_stress_idx',
+                         condition=models.Q(stress_level__in=['high', 'critical'])),
+        ]
 
     def __str__(self):
         return f"Session {self.id} - {self.user.username} ({self.stress_level})"
@@ -65,6 +86,13 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Keyset pagination of a session's messages
+            models.Index(fields=['session', 'timestamp', 'id']),
+            # Scored user messages, read when rebuilding session and daily aggregates
+            models.Index(fields=['session', 'timestamp'], name='chatmessage_scored_idx',
+                         condition=models.Q(sender='user', emotion_detected__isnull=False)),
+        ]
 
     def __str__(self):
         return f"{self.sender}: {self.message[:50]}..."
@@ -89,6 +117,13 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['appointment_date', 'appointment_time']
+        indexes = [
+            # Counselor dashboard: a day's or week's appointments
+            models.Index(fields=['counselor', 'appointment_date', 'status']),
+            # A student's upcoming appointments
+            models.Index(fields=['student', 'appointment_date'], name='booking_student_upcoming_idx',
+                         condition=models.Q(status='scheduled')),
+        ]
 
     def __str__(self):
         return f"Booking {self.id} - {self.student.username} with {self.counselor.username if self.counselor else 'TBD'}"
@@ -118,6 +153,84 @@ class WeeklyReport(models.Model):
     def __str__(self):
         return f"Weekly Report - {self.user.username} ({self.week_start})"
 
+class DailyUserStats(models.Model):
+    """Per-user, per-day rollup of chat sessions and detected emotions.
+
+    Sessions count on the (local) date they started, in their current stress
+    level; messages count on the date they were sent. Maintained incrementally
+    by DailyStatsRollup and rebuilt by the backfill_daily_stats command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    low_sessions = models.IntegerField(default=0)
+    moderate_sessions = models.IntegerField(default=0)
+    high_sessions = models.IntegerField(default=0)
+    critical_sessions = models.IntegerField(default=0)
+    # emotion -> number of scored user messages / sum of their confidence
+    emotion_counts = models.JSONField(default=dict)
+    emotion_confidence_sums = models.JSONField(default=dict)
+    # emotion -> time first detected that day, to keep first-seen ordering
+    emotion_first_seen = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+        indexes = [
+            # Students with recent critical sessions (risk index)
+            models.Index(fields=['date', 'user'], name='dailystats_critical_idx',
+                         condition=models.Q(critical_sessions__gt=0)),
+        ]
+
+    def __str__(self):
+        return f"Daily stats - {self.user.username} ({self.date})"
+
+class WeeklyReportRun(models.Model):
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    week_start = models.DateField(unique=True)
+    week_end = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    total_shards = models.IntegerField(default=0)
+    completed_shards = models.IntegerField(default=0)
+    reports_generated = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-week_start']
+
+    def __str__(self):
+        return f"Weekly report run {self.week_start} ({self.status})"
+
+class WeeklyReportShard(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    run = models.ForeignKey(WeeklyReportRun, on_delete=models.CASCADE, related_name='shards')
+    # Inclusive range of student ids covered by this shard
+    min_user_id = models.BigIntegerField()
+    max_user_id = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    reports_generated = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['min_user_id']
+        unique_together = ['run', 'min_user_id']
+
+    def __str__(self):
+        return f"Shard {self.min_user_id}-{self.max_user_id} of {self.run}"
+
 class Alert(models.Model):
     ALERT_TYPES = [
         ('weekly_report', 'Weekly Report'),
@@ -143,10 +256,59 @@ class Alert(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's alert history
+            models.Index(fields=['user', '-created_at', '-id']),
+            # Alert cooldown checks
+            models.Index(fields=['user', 'alert_type', '-created_at']),
+        ]
 
     def __str__(self):
         return f"Alert {self.id} - {self.alert_type} for {self.user.username}"
 
+class NotificationOutbox(models.Model):
+    """Guardian notification waiting to be delivered by the dispatcher.
+
+    Rows are written in the same transaction as their alert. Emails store the
+    name of a shared template plus per-recipient substitutions, so many of
+    them can go out in one provider request; SMS store the rendered body.
+    """
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    alert = models.ForeignKey(Alert, on_delete=models.CASCADE, related_name='notifications')
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255, blank=True)
+    template = models.CharField(max_length=50, blank=True)
+    substitutions = models.JSONField(default=dict)
+    body = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    # When a pending row is due, or when a claim on a sending row expires
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} notification {self.id} for alert {self.alert_id} ({self.status})"
+
 class Resource(models.Model):
     RESOURCE_TYPES = [
         ('video', 'Video'),
@@ -164,9 +326,18 @@ class Resource(models.Model):
     tags = models.JSONField(default=list)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Weighted title/tags/description vector, kept up to date by signals.py
+    # and rebuilt by the rebuild_resource_search command
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            GinIndex(fields=['search_vector']),
+            # Tag containment filters (tags @> '["..."]')
+            GinIndex(fields=['tags']),
+        ]
 
     def __str__(self):
         return self.title
@@ -176,7 +347,11 @@ class SupportGroup(models.Model):
     description = models.TextField(blank=True, null=True)
     category = models.CharField(max_length=100, blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    # Active memberships, maintained by SupportGroupService
+    member_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also set by SupportGroupService, whose counter updates bypass save()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -204,6 +379,11 @@ class PeerPost(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the feed, overall and per group
+            models.Index(fields=['is_flagged', '-created_at', '-id']),
+            models.Index(fields=['group', 'is_flagged', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"Post in {self.group.name} - {self.content[:50]}..."
@@ -0,0 +1,135 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.encoding import force_str
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+import json
+
+
+class KeysetPagination(BasePagination):
+    """Keyset pagination on a (sort field, id) pair.
+
+    Each page is fetched with a WHERE on the last row of the previous page
+    instead of an OFFSET, and no COUNT(*) is issued, so any page costs one
+    index range scan. Rows inserted while a client pages are never skipped or
+    repeated. The cursor is opaque to clients.
+    """
+
+    # Sort field first, then the tie-breaker; prefix with '-' for descending
+    ordering = ('-created_at', '-id')
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+
+        rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def _after(self, position):
+        # (field, id) > (value, last_id) spelled out so it works on every backend
+        # and uses the composite index
+        field, tie_breaker = [name.lstrip('-') for name in self.ordering]
+        value, last_id = position
+        lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+        tie_lookup = 'lt' if self.ordering[1].startswith('-') else 'gt'
+        return (
+            Q(**{f'{field}__{lookup}': value}) |
+            Q(**{field: value, f'{tie_breaker}__{tie_lookup}': last_id})
+        )
+
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(requested, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        field_name = self.ordering[0].lstrip('-')
+        try:
+            value, last_id = json.loads(force_str(urlsafe_b64decode(encoded.encode('ascii'))))
+            value = self.model._meta.get_field(field_name).to_python(value)
+            last_id = int(last_id)
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, last_id
+
+    def paginate_serialized(self, rows, request):
+        """Page rows that are already serialized, e.g. read from a cache.
+
+        The rows must be in this paginator's ordering, include its fields and
+        hold at least one row more than the page size when there is a next page.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def encode_cursor(self, obj):
+        field_name, tie_breaker = [name.lstrip('-') for name in self.ordering]
+        if isinstance(obj, dict):
+            value, last_id = obj[field_name], obj[tie_breaker]
+        else:
+            value = self.model._meta.get_field(field_name).value_to_string(obj)
+            last_id = getattr(obj, tie_breaker)
+        payload = json.dumps([value, last_id])
+        return force_str(urlsafe_b64encode(payload.encode('utf-8')))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class ChatMessagePagination(KeysetPagination):
+    # Conversations read oldest first
+    ordering = ('timestamp', 'id')
+    page_size = 50
+
+
+class PeerPostPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class AlertPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
@@ -65,6 +65,31 @@ class ChatSessionSerializer(serializers.ModelSerializer):
             'stress_level', 'session_summary', 'is_active', 'messages'
         ]
 
+class ChatSessionSummarySerializer(serializers.ModelSerializer):
+    """Session without its messages, for list views; the message fields come
+    from annotations added in SQL (see views.annotate_session_summaries)"""
+    message_count = serializers.SerializerMethodField()
+    last_message_preview = serializers.SerializerMethodField()
+    last_message_at = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ChatSession
+        fields = [
+            'id', 'session_start', 'session_end', 'overall_emotion',
+            'stress_level', 'session_summary', 'is_active',
+            'message_count', 'last_message_preview', 'last_message_at'
+        ]
+    
+    def get_message_count(self, obj):
+        return getattr(obj, 'message_count', 0)
+    
+    def get_last_message_preview(self, obj):
+        return getattr(obj, 'last_message_preview', None)
+    
+    def get_last_message_at(self, obj):
+        last_message_at = getattr(obj, 'last_message_at', None)
+        return serializers.DateTimeField().to_representation(last_message_at) if last_message_at else None
+
 class BookingSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.get_full_name', read_only=True)
     counselor_name = serializers.CharField(source='counselor.get_full_name', read_only=True)
@@ -105,17 +130,13 @@ class ResourceSerializer(serializers.ModelSerializer):
         ]
 
 class SupportGroupSerializer(serializers.ModelSerializer):
-    member_count = serializers.SerializerMethodField()
-    
     class Meta:
         model = SupportGroup
         fields = [
             'id', 'name', 'description', 'category',
             'is_active', 'created_at', 'member_count'
         ]
-    
-    def get_member_count(self, obj):
-        return obj.memberships.filter(is_active=True).count()
+        read_only_fields = ['member_count']
 
 class PeerPostSerializer(serializers.ModelSerializer):
     author_name = serializers.SerializerMethodField()
@@ -123,7 +144,7 @@ class PeerPostSerializer(serializers.ModelSerializer):
     class Meta:
         model = PeerPost
         fields = [
-            'id', 'content', 'is_anonymous', 'emotion_tag',
+            'id', 'group', 'content', 'is_anonymous', 'emotion_tag',
             'created_at', 'is_flagged', 'author_name'
         ]
     
@@ -138,3 +159,4 @@ class GroupMembershipSerializer(serializers.ModelSerializer):
     class Meta:
         model = GroupMembership
         fields = ['id', 'group', 'group_name', 'joined_at', 'is_active']
+        read_only_fields = ['is_active']
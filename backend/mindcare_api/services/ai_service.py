@@ -1,22 +1,56 @@
-import openai
-from django.conf import settings
 import logging
+from .context_engine import ConversationContextEngine
+from .keyword_matcher import safety_matcher
+from .llm_client import CircuitOpenError, get_llm_client
 
 logger = logging.getLogger(__name__)
 
 class AIService:
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
+        self.llm_client = get_llm_client()
+        self.context_engine = ConversationContextEngine()
         
     def generate_response(self, user_message, session):
         """Generate AI response for mental health support"""
         try:
-            # Get conversation context
-            recent_messages = session.messages.order_by('-timestamp')[:10]
-            context = self._build_context(recent_messages)
+            ai_response = self.llm_client.chat_completion(
+                messages=self._build_messages(user_message, session),
+                max_tokens=300,
+                temperature=0.7
+            )
             
-            # System prompt for mental health support
-            system_prompt = """You are a compassionate AI mental health assistant for college students. 
+            # Safety check - ensure response is appropriate
+            return self.finalize_response(ai_response)
+                
+        except CircuitOpenError:
+            logger.warning("LLM circuit open, using fallback response")
+            return self._get_fallback_response()
+        except Exception as e:
+            logger.error(f"Error generating AI response: {str(e)}")
+            return self._get_fallback_response()
+    
+    def stream_response(self, user_message, session):
+        """Yield the AI response in chunks as the model generates it"""
+        return self.llm_client.stream_chat_completion(
+            messages=self._build_messages(user_message, session),
+            max_tokens=300,
+            temperature=0.7
+        )
+    
+    def finalize_response(self, ai_response):
+        """Return the response if it passes the safety check, otherwise a fallback"""
+        ai_response = ai_response.strip()
+        if ai_response and self._is_safe_response(ai_response):
+            return ai_response
+        return self._get_fallback_response()
+    
+    def _build_messages(self, user_message, session):
+        """Build the chat completion messages for a user turn"""
+        # Get conversation context
+        context = self._build_context(session)
+        
+        # System prompt for mental health support
+        system_prompt = """You are a compassionate AI mental health assistant for college students. 
             Your role is to provide supportive, empathetic responses while following these guidelines:
             
             1. Always be supportive and non-judgmental
@@ -28,44 +62,19 @@ class AIService:
             7. Use a warm, understanding tone
             
             Remember: You are here to support, not replace professional mental health care."""
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Context: {context}\n\nCurrent message: {user_message}"}
-                ],
-                max_tokens=300,
-                temperature=0.7
-            )
-            
-            ai_response = response.choices[0].message.content.strip()
-            
-            # Safety check - ensure response is appropriate
-            if self._is_safe_response(ai_response):
-                return ai_response
-            else:
-                return self._get_fallback_response()
-                
-        except Exception as e:
-            logger.error(f"Error generating AI response: {str(e)}")
-            return self._get_fallback_response()
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Context: {context}\n\nCurrent message: {user_message}"}
+        ]
     
-    def _build_context(self, recent_messages):
-        """Build conversation context from recent messages"""
-        context_parts = []
-        for msg in reversed(recent_messages):
-            role = "Student" if msg.sender == "user" else "Assistant"
-            context_parts.append(f"{role}: {msg.message}")
-        return "\n".join(context_parts[-6:])  # Last 6 messages for context
+    def _build_context(self, session):
+        """Build conversation context from the session's rolling summary and recent turns"""
+        return self.context_engine.build_context(session)
     
     def _is_safe_response(self, response):
         """Check if AI response is safe and appropriate"""
-        unsafe_keywords = [
-            'diagnose', 'prescription', 'medication', 'cure', 'treatment plan'
-        ]
-        response_lower = response.lower()
-        return not any(keyword in response_lower for keyword in unsafe_keywords)
+        return not safety_matcher.matches(response, 'unsafe_response')
     
     def _get_fallback_response(self):
         """Return a safe fallback response"""
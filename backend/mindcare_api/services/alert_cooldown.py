@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import threading
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class AlertCooldown:
+    """At most one alert of a type per user per cooldown window.
+
+    The window is claimed with an atomic Redis SET NX EX, so concurrent
+    workers cannot both pass the check. Without Redis (or when it fails) the
+    user row is locked and the Alert table is checked instead; that lock is
+    held until the caller's transaction ends, so acquire() must be called in
+    the transaction that creates the alert.
+    """
+
+    def __init__(self, redis_client=None, cooldown_seconds=None, key_prefix='alert_cooldown'):
+        self.redis_client = redis_client
+        self.cooldown_seconds = cooldown_seconds or settings.ALERT_COOLDOWN_HOURS * 3600
+        self.key_prefix = key_prefix
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.suppressed = 0
+        self.fallbacks = 0
+
+    def make_key(self, user_id, alert_type):
+        return f"{self.key_prefix}:{alert_type}:{user_id}"
+
+    def acquire(self, user, alert_type):
+        """Claim the user's cooldown window; False if an alert was already sent in it"""
+        acquired = None
+        if self.redis_client is not None:
+            try:
+                acquired = bool(self.redis_client.set(
+                    self.make_key(user.id, alert_type), timezone.now().isoformat(),
+                    nx=True, ex=self.cooldown_seconds
+                ))
+            except Exception as e:
+                logger.warning(f"Error claiming alert cooldown in Redis, using the database: {str(e)}")
+            else:
+                # Claims are rare, so also honour alerts sent before Redis was
+                # flushed or the cooldown was introduced
+                if acquired:
+                    last_alert_at = self._last_alert_at(user, alert_type)
+                    if last_alert_at is not None:
+                        acquired = False
+                        self._expire_with(user, alert_type, last_alert_at)
+
+        if acquired is None:
+            with self._lock:
+                self.fallbacks += 1
+            acquired = self._acquire_in_database(user, alert_type)
+
+        with self._lock:
+            if acquired:
+                self.sent += 1
+            else:
+                self.suppressed += 1
+        return acquired
+
+    def release(self, user, alert_type):
+        """Give the window back, e.g. when creating the alert failed"""
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.delete(self.make_key(user.id, alert_type))
+        except Exception as e:
+            logger.warning(f"Error releasing alert cooldown: {str(e)}")
+
+    def _acquire_in_database(self, user, alert_type):
+        from ..models import User
+
+        # Serializes concurrent checks for the same user until the transaction ends
+        User.objects.select_for_update().only('id').get(id=user.id)
+        return self._last_alert_at(user, alert_type) is None
+
+    def _last_alert_at(self, user, alert_type):
+        """When the user's latest alert of this type inside the window was created, or None"""
+        from ..models import Alert
+
+        return Alert.objects.filter(
+            user_id=user.id,
+            alert_type=alert_type,
+            created_at__gte=timezone.now() - timedelta(seconds=self.cooldown_seconds)
+        ).order_by('-created_at').values_list('created_at', flat=True).first()
+
+    def _expire_with(self, user, alert_type, last_alert_at):
+        # The key just claimed would start a fresh window; end it with the
+        # existing alert's window instead
+        key = self.make_key(user.id, alert_type)
+        remaining = last_alert_at + timedelta(seconds=self.cooldown_seconds) - timezone.now()
+        try:
+            if remaining.total_seconds() >= 1:
+                self.redis_client.set(key, last_alert_at.isoformat(), ex=int(remaining.total_seconds()))
+            else:
+                self.redis_client.delete(key)
+        except Exception as e:
+            logger.warning(f"Error shortening alert cooldown: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sent': self.sent,
+                'suppressed': self.suppressed,
+                'database_fallbacks': self.fallbacks,
+                'cooldown_seconds': self.cooldown_seconds,
+                'shared': self.redis_client is not None,
+            }
+
+
+_alert_cooldowns = {}
+_cooldown_lock = threading.Lock()
+
+
+def get_alert_cooldown(key_prefix='alert_cooldown', cooldown_hours=None):
+    """Return the process-wide alert cooldown for key_prefix"""
+    cooldown = _alert_cooldowns.get(key_prefix)
+    if cooldown is None:
+        with _cooldown_lock:
+            cooldown = _alert_cooldowns.get(key_prefix)
+            if cooldown is None:
+                cooldown = AlertCooldown(
+                    redis_client=get_redis_client(),
+                    cooldown_seconds=cooldown_hours * 3600 if cooldown_hours else None,
+                    key_prefix=key_prefix
+                )
+                _alert_cooldowns[key_prefix] = cooldown
+    return cooldown
@@ -1,49 +1,80 @@
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta
 import logging
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-from twilio.rest import Client
+from .alert_cooldown import get_alert_cooldown
 
 logger = logging.getLogger(__name__)
 
 class AlertService:
-    def __init__(self):
-        self.sendgrid_client = SendGridAPIClient(settings.SENDGRID_API_KEY) if settings.SENDGRID_API_KEY else None
-        self.twilio_client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN) if settings.TWILIO_ACCOUNT_SID else None
+    """Creates alerts and queues their guardian notifications in the outbox.
+    
+    Delivery happens in NotificationDispatcher, so creating an alert never
+    waits on SendGrid or Twilio.
+    """
     
     def check_and_send_alert(self, user, session):
         """Check if alert should be sent and send if necessary"""
         from ..models import Alert
         
+        cooldown = get_alert_cooldown()
+        acquired = False
         try:
-            # Check if we've sent an alert recently (cooldown period)
-            cooldown_time = timezone.now() - timedelta(hours=settings.ALERT_COOLDOWN_HOURS)
-            recent_alert = Alert.objects.filter(
-                user=user,
-                alert_type='critical_stress',
-                created_at__gte=cooldown_time
-            ).exists()
-            
-            if recent_alert:
-                logger.info(f"Alert cooldown active for user {user.id}")
-                return None
+            # Create alert and queue its notifications together
+            with transaction.atomic():
+                # Only one alert per cooldown period, even across workers
+                acquired = cooldown.acquire(user, 'critical_stress')
+                if not acquired:
+                    logger.info(f"Alert cooldown active for user {user.id}")
+                    return None
+                
+                alert = Alert.objects.create(
+                    user=user,
+                    alert_type='critical_stress',
+                    message=f"High emotional distress detected in recent chat session. Stress level: {session.stress_level}"
+                )
+                self.queue_alert_notifications(alert)
             
-            # Create alert
-            alert = Alert.objects.create(
-                user=user,
-                alert_type='critical_stress',
-                message=f"High emotional distress detected in recent chat session. Stress level: {session.stress_level}"
-            )
+            return alert
             
-            # Send notifications
-            self._send_alert_notifications(alert)
+        except Exception as e:
+            logger.error(f"Error checking/sending alert: {str(e)}")
+            if acquired:
+                cooldown.release(user, 'critical_stress')
+            return None
+    
+    def check_and_send_persistent_stress_alert(self, user, high_stress_count):
+        """Alert the guardian of a student with repeated high-stress sessions"""
+        from ..models import Alert
+        
+        cooldown = get_alert_cooldown(
+            key_prefix='persistent_stress_cooldown',
+            cooldown_hours=settings.PERSISTENT_STRESS_COOLDOWN_HOURS
+        )
+        acquired = False
+        try:
+            with transaction.atomic():
+                acquired = cooldown.acquire(user, 'critical_stress')
+                if not acquired:
+                    return None
+                
+                alert = Alert.objects.create(
+                    user=user,
+                    alert_type='critical_stress',
+                    message=(
+                        f"Persistent high stress detected: {high_stress_count} high-stress sessions "
+                        f"in the last {settings.PERSISTENT_STRESS_WINDOW_HOURS // 24} days."
+                    )
+                )
+                self.queue_alert_notifications(alert)
             
+            logger.info(f"Sent persistent stress alert for user {user.id}")
             return alert
             
         except Exception as e:
-            logger.error(f"Error checking/sending alert: {str(e)}")
+            logger.error(f"Error sending persistent stress alert: {str(e)}")
+            if acquired:
+                cooldown.release(user, 'critical_stress')
             return None
     
     def send_emergency_alert(self, user, message=""):
@@ -51,13 +82,13 @@ class AlertService:
         from ..models import Alert
         
         try:
-            alert = Alert.objects.create(
-                user=user,
-                alert_type='emergency',
-                message=f"EMERGENCY: {message}" if message else "Emergency alert triggered by user"
-            )
-            
-            self._send_alert_notifications(alert, is_emergency=True)
+            with transaction.atomic():
+                alert = Alert.objects.create(
+                    user=user,
+                    alert_type='emergency',
+                    message=f"EMERGENCY: {message}" if message else "Emergency alert triggered by user"
+                )
+                self.queue_alert_notifications(alert, is_emergency=True)
             return alert
             
         except Exception as e:
@@ -66,79 +97,138 @@ class AlertService:
     
     def send_weekly_report(self, user, report):
         """Send weekly report to guardian"""
-        from ..models import Alert
-        
+        alerts = self.send_weekly_reports([report])
+        return alerts[0] if alerts else None
+    
+    def send_weekly_reports(self, reports):
+        """Create the weekly report alerts of many students and queue their emails at once"""
         try:
-            alert = Alert.objects.create(
-                user=user,
-                alert_type='weekly_report',
-                message=f"Weekly mental health report for {user.get_full_name()}"
-            )
-            
-            self._send_weekly_report_email(alert, report)
-            return alert
+            with transaction.atomic():
+                return self.queue_weekly_reports(reports)
             
         except Exception as e:
             logger.error(f"Error sending weekly report: {str(e)}")
-            return None
+            return []
+    
+    def queue_weekly_reports(self, reports):
+        """Create the weekly report alerts and write their guardian emails to the outbox.
+        
+        Call inside the transaction that creates the reports, so that either
+        both are stored or neither is.
+        """
+        from ..models import Alert, NotificationOutbox
+        
+        alerts = Alert.objects.bulk_create([
+            Alert(
+                user=report.user,
+                alert_type='weekly_report',
+                message=f"Weekly mental health report for {report.user.get_full_name()}"
+            )
+            for report in reports
+        ])
+        
+        notifications = []
+        for alert, report in zip(alerts, reports):
+            if report.user.guardian_email:
+                notifications.append(NotificationOutbox(
+                    alert=alert,
+                    channel='email',
+                    recipient=report.user.guardian_email,
+                    subject=f"Weekly Mental Health Report - {report.user.get_full_name()}",
+                    template='weekly_report',
+                    substitutions=self._weekly_report_substitutions(report)
+                ))
+        self._queue(alerts, notifications)
+        return alerts
     
-    def _send_alert_notifications(self, alert, is_emergency=False):
-        """Send alert via email and SMS"""
+    def queue_alert_notifications(self, alert, is_emergency=False):
+        """Write the alert's guardian email and SMS to the outbox.
+        
+        Call inside the transaction that creates the alert, so that either
+        both are stored or neither is.
+        """
+        from ..models import NotificationOutbox
+        
         user = alert.user
+        notifications = []
         
-        # Send email to guardian
-        if user.guardian_email and self.sendgrid_client:
-            try:
-                subject = "🚨 URGENT: Mental Health Alert" if is_emergency else "⚠️ Mental Health Alert"
-                self._send_email(
-                    to_email=user.guardian_email,
-                    subject=subject,
-                    content=self._format_alert_email(alert, is_emergency)
-                )
-                alert.sent_via_email = True
-                alert.sent_to_guardian = True
-            except Exception as e:
-                logger.error(f"Error sending alert email: {str(e)}")
-        
-        # Send SMS to guardian
-        if user.guardian_phone and self.twilio_client:
-            try:
-                message_body = self._format_alert_sms(alert, is_emergency)
-                self._send_sms(user.guardian_phone, message_body)
-                alert.sent_via_sms = True
-                alert.sent_to_guardian = True
-            except Exception as e:
-                logger.error(f"Error sending alert SMS: {str(e)}")
-        
-        # Update alert status
-        alert.status = 'sent' if (alert.sent_via_email or alert.sent_via_sms) else 'failed'
-        alert.sent_at = timezone.now()
-        alert.save()
-    
-    def _send_email(self, to_email, subject, content):
-        """Send email using SendGrid"""
-        message = Mail(
-            from_email='noreply@mindcare.edu',
-            to_emails=to_email,
-            subject=subject,
-            html_content=content
-        )
+        if user.guardian_email:
+            notifications.append(NotificationOutbox(
+                alert=alert,
+                channel='email',
+                recipient=user.guardian_email,
+                subject="🚨 URGENT: Mental Health Alert" if is_emergency else "⚠️ Mental Health Alert",
+                template='emergency_alert' if is_emergency else 'alert',
+                substitutions=self._alert_substitutions(alert)
+            ))
+        
+        if user.guardian_phone:
+            notifications.append(NotificationOutbox(
+                alert=alert,
+                channel='sms',
+                recipient=user.guardian_phone,
+                body=self._format_alert_sms(alert, is_emergency)
+            ))
         
-        response = self.sendgrid_client.send(message)
-        return response.status_code == 202
+        self._queue([alert], notifications)
     
-    def _send_sms(self, to_phone, message_body):
-        """Send SMS using Twilio"""
-        message = self.twilio_client.messages.create(
-            body=message_body,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=to_phone
-        )
-        return message.sid
+    def _queue(self, alerts, notifications):
+        from ..models import Alert, NotificationOutbox
+        
+        # Alerts without a guardian contact cannot be delivered at all
+        notified = {notification.alert_id for notification in notifications}
+        undeliverable = [alert for alert in alerts if alert.id not in notified]
+        for alert in undeliverable:
+            alert.status = 'failed'
+            alert.sent_at = timezone.now()
+        if undeliverable:
+            Alert.objects.bulk_update(undeliverable, ['status', 'sent_at'])
+        
+        if notifications:
+            NotificationOutbox.objects.bulk_create(notifications)
+            transaction.on_commit(self._start_dispatch)
     
-    def _format_alert_email(self, alert, is_emergency=False):
-        """Format alert email content"""
+    def _start_dispatch(self):
+        from ..tasks import dispatch_notifications
+        
+        try:
+            dispatch_notifications.delay()
+        except Exception as e:
+            # The periodic dispatch run picks the notifications up instead
+            logger.error(f"Error starting notification dispatch: {str(e)}")
+    
+    def email_template(self, template):
+        """HTML of a named email template, with -tag- placeholders for substitutions"""
+        if template == 'alert':
+            return self._format_alert_email()
+        if template == 'emergency_alert':
+            return self._format_alert_email(is_emergency=True)
+        if template == 'weekly_report':
+            return self._format_weekly_report_email()
+        raise ValueError(f"Unknown email template: {template}")
+    
+    def _alert_substitutions(self, alert):
         user = alert.user
+        return {
+            '-full_name-': user.get_full_name(),
+            '-first_name-': user.first_name,
+            '-message-': alert.message,
+            '-created_at-': alert.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+    
+    def _weekly_report_substitutions(self, report):
+        return {
+            '-full_name-': report.user.get_full_name(),
+            '-week_start-': str(report.week_start),
+            '-week_end-': str(report.week_end),
+            '-total_sessions-': str(report.total_sessions),
+            '-avg_stress_level-': str(report.avg_stress_level or 'N/A'),
+            '-risk_assessment-': report.risk_assessment.title(),
+            '-summary-': report.summary or 'No specific concerns noted this week.',
+        }
+    
+    def _format_alert_email(self, is_emergency=False):
+        """Format alert email template"""
         urgency = "URGENT - IMMEDIATE ATTENTION REQUIRED" if is_emergency else "Attention Required"
         
         return f"""
@@ -149,19 +239,19 @@ class AlertService:
                 
                 <p>Dear Guardian,</p>
                 
-                <p>This is an automated alert from the MindCare Mental Health System regarding <strong>{user.get_full_name()}</strong>.</p>
+                <p>This is an automated alert from the MindCare Mental Health System regarding <strong>-full_name-</strong>.</p>
                 
                 <div style="background-color: {'#fef2f2' if is_emergency else '#fff7ed'}; border-left: 4px solid {'#dc2626' if is_emergency else '#ea580c'}; padding: 15px; margin: 20px 0;">
                     <p><strong>Alert Details:</strong></p>
-                    <p>{alert.message}</p>
-                    <p><strong>Time:</strong> {alert.created_at.strftime('%Y-%m-%d %H:%M:%S')}</p>
+                    <p>-message-</p>
+                    <p><strong>Time:</strong> -created_at-</p>
                 </div>
                 
                 {'<p style="color: #dc2626; font-weight: bold;">If this is a life-threatening emergency, please call 911 immediately.</p>' if is_emergency else ''}
                 
                 <p><strong>Recommended Actions:</strong></p>
                 <ul>
-                    <li>Reach out to {user.first_name} with care and understanding</li>
+                    <li>Reach out to -first_name- with care and understanding</li>
                     <li>Consider scheduling a counseling session</li>
                     <li>Monitor their well-being closely</li>
                     {'<li>Seek immediate professional help if needed</li>' if is_emergency else ''}
@@ -189,14 +279,9 @@ class AlertService:
         
         return f"{prefix}: Mental health concern detected for {user.first_name}. {alert.message} Please check in with them. For crisis: call 988. -MindCare"
     
-    def _send_weekly_report_email(self, alert, report):
-        """Send weekly report email"""
-        user = alert.user
-        
-        if not user.guardian_email or not self.sendgrid_client:
-            return
-        
-        content = f"""
+    def _format_weekly_report_email(self):
+        """Format weekly report email template"""
+        return """
         <html>
         <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
             <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
@@ -204,18 +289,18 @@ class AlertService:
                 
                 <p>Dear Guardian,</p>
                 
-                <p>Here is the weekly mental health summary for <strong>{user.get_full_name()}</strong> for the week of {report.week_start} to {report.week_end}.</p>
+                <p>Here is the weekly mental health summary for <strong>-full_name-</strong> for the week of -week_start- to -week_end-.</p>
                 
                 <div style="background-color: #f0f9ff; border-left: 4px solid #0891b2; padding: 15px; margin: 20px 0;">
                     <h3>Summary</h3>
-                    <p><strong>Total Chat Sessions:</strong> {report.total_sessions}</p>
-                    <p><strong>Average Stress Level:</strong> {report.avg_stress_level or 'N/A'}</p>
-                    <p><strong>Risk Assessment:</strong> {report.risk_assessment.title()}</p>
+                    <p><strong>Total Chat Sessions:</strong> -total_sessions-</p>
+                    <p><strong>Average Stress Level:</strong> -avg_stress_level-</p>
+                    <p><strong>Risk Assessment:</strong> -risk_assessment-</p>
                 </div>
                 
                 <div style="margin: 20px 0;">
                     <h3>Weekly Summary</h3>
-                    <p>{report.summary or 'No specific concerns noted this week.'}</p>
+                    <p>-summary-</p>
                 </div>
                 
                 <p>This report is generated automatically to keep you informed about your student's mental health engagement. If you have any concerns, please don't hesitate to reach out.</p>
@@ -225,19 +310,3 @@ class AlertService:
         </body>
         </html>
         """
-        
-        try:
-            self._send_email(
-                to_email=user.guardian_email,
-                subject=f"Weekly Mental Health Report - {user.get_full_name()}",
-                content=content
-            )
-            alert.sent_via_email = True
-            alert.sent_to_guardian = True
-            alert.status = 'sent'
-            alert.sent_at = timezone.now()
-            alert.save()
-        except Exception as e:
-            logger.error(f"Error sending weekly report email: {str(e)}")
-            alert.status = 'failed'
-            alert.save()
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token for English text, used to turn the budget into characters
+CHARS_PER_TOKEN = 4
+TURN_MAX_CHARS = 500
+SUMMARY_EXCERPT_CHARS = 120
+
+
+class ConversationContextEngine:
+    """Incrementally maintained conversation context for prompt building.
+
+    Each ChatSession keeps a short tail of recent turns in recent_turns and a
+    compact rolling summary of older student turns in session_summary. Both are
+    updated as messages arrive, so building a prompt reads only the session row.
+    """
+
+    def __init__(self, tail_size=None, summary_max_chars=None, token_budget=None):
+        self.tail_size = tail_size or settings.CHAT_CONTEXT_TAIL_TURNS
+        self.summary_max_chars = summary_max_chars or settings.CHAT_CONTEXT_SUMMARY_MAX_CHARS
+        self.token_budget = token_budget or settings.CHAT_CONTEXT_TOKEN_BUDGET
+
+    def record_turn(self, session, sender, message, emotion=None):
+        """Append a turn to the session tail, folding evicted turns into the summary"""
+        from ..models import ChatSession
+
+        turn = {
+            'sender': sender,
+            'text': message[:TURN_MAX_CHARS],
+            'emotion': emotion,
+            'at': timezone.now().isoformat(),
+        }
+
+        with transaction.atomic():
+            locked = ChatSession.objects.select_for_update().only(
+                'id', 'recent_turns', 'session_summary'
+            ).get(pk=session.pk)
+
+            turns = list(locked.recent_turns or [])
+            turns.append(turn)
+            summary = locked.session_summary or ''
+            while len(turns) > self.tail_size:
+                summary = self._fold_into_summary(summary, turns.pop(0))
+
+            locked.recent_turns = turns
+            locked.session_summary = summary or None
+            locked.save(update_fields=['recent_turns', 'session_summary'])
+
+        session.recent_turns = locked.recent_turns
+        session.session_summary = locked.session_summary
+
+    def _fold_into_summary(self, summary, turn):
+        # Assistant turns are dropped once they leave the tail; what the student
+        # said (and felt) is what later replies need to stay consistent with
+        if turn['sender'] != 'user':
+            return summary
+
+        excerpt = turn['text'][:SUMMARY_EXCERPT_CHARS]
+        emotion_info = f" ({turn['emotion']})" if turn.get('emotion') else ""
+        lines = summary.splitlines() if summary else []
+        lines.append(f"- {excerpt}{emotion_info}")
+
+        # Keep the summary bounded by dropping its oldest points
+        while len(lines) > 1 and len('\n'.join(lines)) > self.summary_max_chars:
+            lines.pop(0)
+        return '\n'.join(lines)
+
+    def format_turns(self, session, excerpt_chars=None, with_emotions=False):
+        """Render the recent turns as 'Student: ...' / 'Assistant: ...' lines"""
+        lines = []
+        for turn in session.recent_turns or []:
+            role = "Student" if turn['sender'] == 'user' else "Assistant"
+            text = turn['text']
+            if excerpt_chars:
+                text = f"{text[:excerpt_chars]}..."
+            emotion_info = f" (emotion: {turn['emotion']})" if with_emotions and turn.get('emotion') else ""
+            lines.append(f"{role}: {text}{emotion_info}")
+        return lines
+
+    def build_context(self, session, excerpt_chars=None, with_emotions=False):
+        """Return summary plus recent turns, trimmed to the token budget"""
+        budget = self.token_budget * CHARS_PER_TOKEN
+        turn_lines = self.format_turns(session, excerpt_chars, with_emotions)
+
+        # The most recent turns matter most, so they claim the budget first
+        kept = []
+        used = 0
+        for line in reversed(turn_lines):
+            if used + len(line) + 1 > budget:
+                break
+            kept.insert(0, line)
+            used += len(line) + 1
+
+        parts = []
+        summary = session.session_summary
+        if summary and used < budget:
+            header = "Earlier in this conversation the student said:"
+            remaining = budget - used - len(header) - 1
+            if remaining > 0:
+                # Older summary points are the first to go
+                trimmed = summary[-remaining:]
+                if trimmed != summary:
+                    trimmed = trimmed.partition('\n')[2]
+                if trimmed:
+                    parts.append(f"{header}\n{trimmed}")
+        parts.extend(kept)
+        return "\n".join(parts)
+
+    def recent_emotions(self, session, minutes=30):
+        """Emotions detected in the student turns of the tail within the last few minutes"""
+        cutoff = timezone.now() - timedelta(minutes=minutes)
+        emotions = []
+        for turn in session.recent_turns or []:
+            if turn['sender'] != 'user' or not turn.get('emotion'):
+                continue
+            try:
+                at = datetime.fromisoformat(turn['at'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if at >= cutoff:
+                emotions.append(turn['emotion'])
+        return emotions
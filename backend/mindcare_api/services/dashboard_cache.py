@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+import json
+import logging
+import threading
+import time
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardCache:
+    """Per-user cache of the rendered user dashboard in Redis.
+
+    Each user has a version counter, and payloads are stored under the
+    version (and date) they were built for. Writes that change the dashboard
+    bump the counter once their transaction commits, so the next read misses
+    and a payload built from older data can never be served again, even if
+    its build finishes after the bump. On a miss one request takes a short
+    lock and rebuilds; concurrent requests wait briefly for its payload
+    rather than all running the dashboard queries.
+    """
+
+    def __init__(self, redis_client, ttl_seconds=300, lock_seconds=10, wait_seconds=2.0,
+                 poll_seconds=0.05, key_prefix='dashboard'):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self.key_prefix = key_prefix
+        # Outlives every payload, so an expired counter cannot reuse a version
+        self.version_ttl_seconds = max(ttl_seconds * 10, 86400)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def make_version_key(self, user_id):
+        return f"{self.key_prefix}:version:{user_id}"
+
+    def make_key(self, user_id, version):
+        return f"{self.key_prefix}:{user_id}:{version}:{timezone.localdate().isoformat()}"
+
+    def get_or_build(self, user_id, build):
+        """Return the user's dashboard payload, calling build() to compute it on a miss"""
+        try:
+            version = int(self.redis_client.get(self.make_version_key(user_id)) or 0)
+            key = self.make_key(user_id, version)
+            payload = self.redis_client.get(key)
+        except Exception as e:
+            self._error('reading', e)
+            return build()
+
+        if payload is not None:
+            with self._lock:
+                self.hits += 1
+            return json.loads(payload)
+
+        with self._lock:
+            self.misses += 1
+        try:
+            building = self.redis_client.set(f"{key}:lock", 1, nx=True, ex=self.lock_seconds)
+        except Exception as e:
+            self._error('locking', e)
+            return build()
+
+        if not building:
+            payload = self._wait_for(key)
+            if payload is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return json.loads(payload)
+            return build()
+
+        try:
+            data = build()
+            try:
+                self.redis_client.set(key, json.dumps(data, cls=DjangoJSONEncoder), ex=self.ttl_seconds)
+            except Exception as e:
+                self._error('storing', e)
+        finally:
+            self._release(f"{key}:lock")
+        return data
+
+    def _wait_for(self, key):
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_seconds)
+            try:
+                payload = self.redis_client.get(key)
+            except Exception as e:
+                self._error('reading', e)
+                return None
+            if payload is not None:
+                return payload
+        return None
+
+    def _release(self, lock_key):
+        try:
+            self.redis_client.delete(lock_key)
+        except Exception as e:
+            self._error('unlocking', e)
+
+    def bump(self, user_id):
+        """Invalidate the user's cached dashboard; call after the write has committed"""
+        key = self.make_version_key(user_id)
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.incr(key)
+            pipeline.expire(key, self.version_ttl_seconds)
+            pipeline.execute()
+        except Exception as e:
+            self._error('invalidating', e)
+
+    def _error(self, action, error):
+        with self._lock:
+            self.errors += 1
+        logger.warning(f"Error {action} dashboard cache: {str(error)}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+
+_dashboard_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_dashboard_cache():
+    """Return the process-wide dashboard cache, or None when it is disabled or Redis is not configured"""
+    global _dashboard_cache
+
+    if not settings.DASHBOARD_CACHE_ENABLED:
+        return None
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return None
+
+    if _dashboard_cache is None:
+        with _cache_lock:
+            if _dashboard_cache is None:
+                _dashboard_cache = DashboardCache(
+                    redis_client,
+                    ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS
+                )
+    return _dashboard_cache
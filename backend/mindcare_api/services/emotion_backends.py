@@ -0,0 +1,92 @@
+from transformers import AutoConfig, AutoTokenizer, pipeline
+import torch
+import numpy as np
+from django.conf import settings
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_FILENAME = 'model.int8.onnx'
+
+
+class TorchPipelineBackend:
+    """Eager PyTorch inference through the transformers pipeline"""
+
+    name = 'torch'
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.classifier = pipeline(
+            "text-classification",
+            model=model_name,
+            device=0 if torch.cuda.is_available() else -1
+        )
+
+    def __call__(self, texts, batch_size=None):
+        if isinstance(texts, str):
+            return self.classifier(texts)
+        return self.classifier(texts, batch_size=batch_size or len(texts))
+
+
+class OnnxRuntimeBackend:
+    """Int8 dynamically quantized ONNX graph run under onnxruntime on CPU.
+
+    The graph, tokenizer and config are produced by the export_emotion_onnx
+    management command.
+    """
+
+    name = 'onnx'
+
+    def __init__(self, model_dir):
+        import onnxruntime
+
+        self.model_name = model_dir
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.id2label = AutoConfig.from_pretrained(model_dir).id2label
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.EMOTION_ONNX_THREADS:
+            options.intra_op_num_threads = settings.EMOTION_ONNX_THREADS
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILENAME),
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self.input_names = {graph_input.name for graph_input in self.session.get_inputs()}
+
+    def __call__(self, texts, batch_size=None):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        encoded = self.tokenizer(
+            list(texts), padding=True, truncation=True, max_length=512, return_tensors='np'
+        )
+        feed = {
+            name: values.astype(np.int64)
+            for name, values in encoded.items() if name in self.input_names
+        }
+        logits = self.session.run(None, feed)[0]
+
+        # Same softmax-then-argmax the text-classification pipeline applies
+        shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        scores = shifted / shifted.sum(axis=-1, keepdims=True)
+        results = [
+            {'label': self.id2label[int(row.argmax())], 'score': float(row.max())}
+            for row in scores
+        ]
+        return results if not single else results[:1]
+
+
+def build_emotion_backend(backend_name=None):
+    """Instantiate the inference backend selected by EMOTION_BACKEND"""
+    backend_name = backend_name or settings.EMOTION_BACKEND
+
+    if backend_name == 'torch':
+        return TorchPipelineBackend(settings.EMOTION_MODEL_NAME)
+    if backend_name == 'onnx':
+        return OnnxRuntimeBackend(settings.EMOTION_ONNX_MODEL_DIR)
+
+    raise ValueError(f"Unknown emotion backend: {backend_name}")
@@ -0,0 +1,143 @@
+from django.conf import settings
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import threading
+import time
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """Normalize text without changing what the uncased model sees"""
+    return ' '.join(text.lower().split())
+
+
+class EmotionResultCache:
+    """Content-addressed cache of emotion detection results.
+
+    Entries are keyed by a SHA-256 of the model version and the normalized
+    text, so a model change makes old entries unreachable. The in-process tier
+    is a bounded LRU with TTL; the optional shared tier is Redis and stores
+    only the hash key and the result, never the message text.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=86400, redis_client=None, key_prefix='emotion'):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_version = None
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_errors = 0
+
+    def make_key(self, text, model_version):
+        digest = hashlib.sha256(f"{model_version}\x00{normalize_text(text)}".encode('utf-8')).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def get(self, text, model_version):
+        key = self.make_key(text, model_version)
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_model_version(model_version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.local_hits += 1
+                    return dict(result)
+                del self._entries[key]
+
+        if self.redis_client is not None:
+            try:
+                payload = self.redis_client.get(key)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Error reading shared emotion cache: {str(e)}")
+                payload = None
+            if payload is not None:
+                result = json.loads(payload)
+                with self._lock:
+                    self.shared_hits += 1
+                    self._store_local(key, result, now)
+                return dict(result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, text, model_version, result):
+        key = self.make_key(text, model_version)
+
+        with self._lock:
+            self._check_model_version(model_version)
+            self._store_local(key, result, time.monotonic())
+
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(key, json.dumps(result), ex=self.ttl_seconds)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Error writing shared emotion cache: {str(e)}")
+
+    def _store_local(self, key, result, now):
+        self._entries[key] = (dict(result), now + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _check_model_version(self, model_version):
+        # Drop every local entry as soon as a different model is in use
+        if model_version != self._model_version:
+            if self._model_version is not None:
+                logger.info(f"Emotion model changed to {model_version}, clearing local emotion cache")
+            self._entries.clear()
+            self._model_version = model_version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.local_hits + self.shared_hits) / lookups, 3) if lookups else 0,
+                'evictions': self.evictions,
+                'shared_errors': self.shared_errors,
+                'shared_tier': self.redis_client is not None,
+            }
+
+
+_emotion_result_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_emotion_result_cache():
+    """Return the process-wide emotion result cache built from settings"""
+    global _emotion_result_cache
+
+    if _emotion_result_cache is None:
+        with _cache_lock:
+            if _emotion_result_cache is None:
+                _emotion_result_cache = EmotionResultCache(
+                    max_entries=settings.EMOTION_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.EMOTION_CACHE_TTL_SECONDS,
+                    redis_client=get_redis_client() if settings.EMOTION_CACHE_SHARED else None
+                )
+    return _emotion_result_cache
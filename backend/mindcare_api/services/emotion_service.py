@@ -1,81 +1,135 @@
-from transformers import pipeline
-import torch
 from django.conf import settings
+from django.db import transaction
 import logging
 from collections import Counter
+from .emotion_cache import get_emotion_result_cache
+from .model_registry import emotion_model_registry
+from .rollup_service import daily_stats_rollup
 
 logger = logging.getLogger(__name__)
 
+# Stress weights for different emotions
+STRESS_WEIGHTS = {
+    'sadness': 0.7,
+    'anger': 0.8,
+    'fear': 0.9,
+    'disgust': 0.6,
+    'surprise': 0.3,
+    'joy': 0.1,
+    'love': 0.1,
+    'anxiety': 0.8,
+    'depression': 0.9,
+    'stress': 0.8
+}
+DEFAULT_STRESS_WEIGHT = 0.5
+
+def summarize_emotion_counts(emotion_counts):
+    """Build the weekly emotion analysis from a Counter of emotions.
+
+    The Counter must be in first-seen order: it decides the order of the
+    distribution and which emotion wins a tie for dominant.
+    """
+    total_messages = sum(emotion_counts.values())
+    if not total_messages:
+        return {}
+    
+    # Calculate percentages
+    emotion_percentages = {
+        emotion: round((count / total_messages) * 100, 1)
+        for emotion, count in emotion_counts.items()
+    }
+    
+    return {
+        'dominant_emotion': emotion_counts.most_common(1)[0][0],
+        'emotion_distribution': emotion_percentages,
+        'total_analyzed_messages': total_messages
+    }
+
 class EmotionDetectionService:
     def __init__(self):
-        try:
-            # Load the emotion detection model
-            self.emotion_classifier = pipeline(
-                "text-classification",
-                model="bhadresh-savani/distilbert-base-uncased-emotion",
-                device=0 if torch.cuda.is_available() else -1
-            )
-        except Exception as e:
-            logger.error(f"Error loading emotion model: {str(e)}")
-            self.emotion_classifier = None
+        # The pipeline itself lives in the process-wide registry so that
+        # constructing a service per request does not reload the model
+        self.registry = emotion_model_registry
+    
+    @property
+    def emotion_classifier(self):
+        return self.registry.get_classifier()
     
     def detect_emotion(self, text):
         """Detect emotion in text and return emotion with confidence"""
-        if not self.emotion_classifier or not text.strip():
+        if not text.strip():
             return None
+        
+        cache = get_emotion_result_cache() if settings.EMOTION_CACHE_ENABLED else None
+        if cache:
+            model_version = self.registry.model_version()
+            cached = cache.get(text, model_version)
+            if cached:
+                return cached
             
         try:
-            result = self.emotion_classifier(text)
-            if result:
-                emotion = result[0]['label'].lower()
-                confidence = result[0]['score']
-                return {
-                    'emotion': emotion,
-                    'confidence': round(confidence, 2)
+            if settings.EMOTION_BATCHING_ENABLED:
+                # Concurrent callers are grouped into one batched pipeline call
+                top = self.registry.get_batcher().submit(
+                    text, timeout=settings.EMOTION_BATCH_TIMEOUT_SECONDS
+                )
+            else:
+                classifier = self.emotion_classifier
+                if not classifier:
+                    return None
+                result = classifier(text)
+                top = result[0] if result else None
+            
+            if top:
+                emotion_result = {
+                    'emotion': top['label'].lower(),
+                    'confidence': round(top['score'], 2)
                 }
+                if cache:
+                    cache.set(text, model_version, emotion_result)
+                return emotion_result
         except Exception as e:
             logger.error(f"Error detecting emotion: {str(e)}")
         
         return None
     
-    def calculate_session_stress(self, session):
-        """Calculate overall stress level for a chat session"""
-        try:
-            messages = session.messages.filter(sender='user', emotion_detected__isnull=False)
-            
-            if not messages.exists():
-                return 'low'
+    def record_message_emotion(self, message, emotion_result):
+        """Store a detected emotion on a user message and fold it into the session aggregates"""
+        from ..models import ChatSession
+        
+        emotion = emotion_result['emotion'].lower()
+        confidence = emotion_result['confidence']
+        
+        with transaction.atomic():
+            # Lock the session row so concurrent messages cannot lose updates
+            locked = ChatSession.objects.select_for_update().get(pk=message.session_id)
             
-            # Define stress weights for different emotions
-            stress_weights = {
-                'sadness': 0.7,
-                'anger': 0.8,
-                'fear': 0.9,
-                'disgust': 0.6,
-                'surprise': 0.3,
-                'joy': 0.1,
-                'love': 0.1,
-                'anxiety': 0.8,
-                'depression': 0.9,
-                'stress': 0.8
-            }
+            message.emotion_detected = emotion
+            message.emotion_confidence = confidence
+            message.save(update_fields=['emotion_detected', 'emotion_confidence'])
             
-            # Calculate weighted average stress
-            total_weight = 0
-            total_score = 0
+            confidence = float(confidence or 0)
+            locked.stress_score_sum += STRESS_WEIGHTS.get(emotion, DEFAULT_STRESS_WEIGHT) * confidence
+            locked.emotion_confidence_sum += confidence
+            locked.emotion_counts[emotion] = locked.emotion_counts.get(emotion, 0) + 1
+            locked.save(update_fields=['stress_score_sum', 'emotion_confidence_sum', 'emotion_counts'])
             
-            for message in messages:
-                emotion = message.emotion_detected.lower()
-                confidence = float(message.emotion_confidence or 0)
-                weight = stress_weights.get(emotion, 0.5)
-                
-                total_score += weight * confidence
-                total_weight += confidence
-            
-            if total_weight == 0:
+            daily_stats_rollup.record_message_emotion(locked.user_id, message.timestamp, emotion, confidence)
+        
+        session = message.session
+        session.stress_score_sum = locked.stress_score_sum
+        session.emotion_confidence_sum = locked.emotion_confidence_sum
+        session.emotion_counts = locked.emotion_counts
+        return session
+    
+    def calculate_session_stress(self, session):
+        """Calculate overall stress level for a chat session from its running aggregates"""
+        try:
+            if not session.emotion_confidence_sum:
                 return 'low'
             
-            avg_stress = total_score / total_weight
+            # Weighted average stress over all scored user messages
+            avg_stress = session.stress_score_sum / session.emotion_confidence_sum
             
             # Convert to stress level categories
             if avg_stress >= settings.STRESS_THRESHOLD_CRITICAL:
@@ -93,35 +147,9 @@ class EmotionDetectionService:
     
     def analyze_weekly_emotions(self, user, week_start, week_end):
         """Analyze emotions for a user over a week period"""
-        from ..models import ChatMessage
-        
         try:
-            messages = ChatMessage.objects.filter(
-                session__user=user,
-                sender='user',
-                timestamp__date__range=[week_start, week_end],
-                emotion_detected__isnull=False
-            )
-            
-            if not messages.exists():
-                return {}
-            
-            # Count emotions
-            emotions = [msg.emotion_detected.lower() for msg in messages]
-            emotion_counts = Counter(emotions)
-            
-            # Calculate percentages
-            total_messages = len(emotions)
-            emotion_percentages = {
-                emotion: round((count / total_messages) * 100, 1)
-                for emotion, count in emotion_counts.items()
-            }
-            
-            return {
-                'dominant_emotion': emotion_counts.most_common(1)[0][0],
-                'emotion_distribution': emotion_percentages,
-                'total_analyzed_messages': total_messages
-            }
+            emotion_counts = daily_stats_rollup.emotion_counts([user.id], week_start, week_end)
+            return summarize_emotion_counts(emotion_counts.get(user.id, Counter()))
             
         except Exception as e:
             logger.error(f"Error analyzing weekly emotions: {str(e)}")
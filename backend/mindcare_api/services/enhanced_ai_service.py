@@ -1,19 +1,17 @@
-import openai
-from django.conf import settings
 import logging
 import json
 import re
 from datetime import datetime, timedelta
+from .context_engine import ConversationContextEngine
+from .keyword_matcher import safety_matcher
+from .llm_client import CircuitOpenError, get_llm_client
 
 logger = logging.getLogger(__name__)
 
 class EnhancedAIService:
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
-        self.crisis_keywords = [
-            'suicide', 'kill myself', 'end it all', 'hurt myself', 'self harm',
-            'want to die', 'better off dead', 'no point living', 'end my life'
-        ]
+        self.llm_client = get_llm_client()
+        self.context_engine = ConversationContextEngine()
         
     def generate_response(self, user_message, session, user_context=None):
         """Generate enhanced AI response with context awareness"""
@@ -33,14 +31,36 @@ class EnhancedAIService:
             
             return safe_response
             
+        except CircuitOpenError:
+            logger.warning("LLM circuit open, using fallback response")
+            return self._get_fallback_response()
         except Exception as e:
             logger.error(f"Error in enhanced AI response generation: {str(e)}")
             return self._get_fallback_response()
     
+    def stream_response(self, user_message, session, user_context=None):
+        """Yield the enhanced AI response in chunks as the model generates it"""
+        # Crisis resources are sent immediately rather than generated
+        if self._detect_crisis(user_message):
+            yield self._get_crisis_response()
+            return
+        
+        context = self._build_enhanced_context(session, user_context)
+        yield from self.llm_client.stream_chat_completion(
+            messages=self._build_messages(user_message, context, session),
+            max_tokens=400,
+            temperature=0.7,
+            presence_penalty=0.1,
+            frequency_penalty=0.1
+        )
+    
+    def finalize_response(self, response):
+        """Apply the safety filter to a fully streamed response"""
+        return self._apply_safety_filter(response.strip())
+    
     def _detect_crisis(self, message):
-        """Detect crisis indicators in user message"""
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in self.crisis_keywords)
+        """Detect crisis indicators in user message, returning the matched (category, phrase)"""
+        return safety_matcher.first_match(message, categories=('crisis',))
     
     def _get_crisis_response(self):
         """Return immediate crisis intervention response"""
@@ -69,25 +89,11 @@ Would you like me to help you find additional local resources or support?"""
     
     def _get_conversation_summary(self, session):
         """Get summarized conversation history"""
-        recent_messages = session.messages.order_by('-timestamp')[:10]
-        summary = []
-        
-        for msg in reversed(recent_messages):
-            role = "Student" if msg.sender == "user" else "Assistant"
-            emotion_info = f" (emotion: {msg.emotion_detected})" if msg.emotion_detected else ""
-            summary.append(f"{role}: {msg.message[:100]}...{emotion_info}")
-        
-        return "\n".join(summary[-6:])  # Last 6 exchanges
+        return self.context_engine.build_context(session, excerpt_chars=100, with_emotions=True)
     
     def _get_recent_emotions(self, session):
         """Get recent emotional patterns"""
-        recent_messages = session.messages.filter(
-            sender='user',
-            emotion_detected__isnull=False,
-            timestamp__gte=datetime.now() - timedelta(minutes=30)
-        )
-        
-        emotions = [msg.emotion_detected for msg in recent_messages]
+        emotions = self.context_engine.recent_emotions(session, minutes=30)
         return emotions[-5:] if emotions else []
     
     def _calculate_session_duration(self, session):
@@ -99,6 +105,18 @@ Would you like me to help you find additional local resources or support?"""
     
     def _call_openai_api(self, user_message, context, session):
         """Make enhanced API call to OpenAI"""
+        response = self.llm_client.chat_completion(
+            messages=self._build_messages(user_message, context, session),
+            max_tokens=400,
+            temperature=0.7,
+            presence_penalty=0.1,
+            frequency_penalty=0.1
+        )
+        
+        return response.strip()
+    
+    def _build_messages(self, user_message, context, session):
+        """Build the chat completion messages for a user turn"""
         system_prompt = self._build_system_prompt(context, session)
         
         messages = [
@@ -113,16 +131,7 @@ Would you like me to help you find additional local resources or support?"""
                 "content": f"Recent conversation context:\n{context['conversation_history']}"
             })
         
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_tokens=400,
-            temperature=0.7,
-            presence_penalty=0.1,
-            frequency_penalty=0.1
-        )
-        
-        return response.choices[0].message.content.strip()
+        return messages
     
     def _build_system_prompt(self, context, session):
         """Build comprehensive system prompt"""
@@ -171,14 +180,9 @@ STUDENT-SPECIFIC FOCUS:
     def _apply_safety_filter(self, response):
         """Apply safety filters to AI response"""
         # Check for inappropriate medical advice
-        medical_flags = [
-            'diagnose', 'prescription', 'medication', 'dosage', 'treatment plan',
-            'cure', 'disorder', 'illness', 'disease', 'therapy session'
-        ]
-        
-        response_lower = response.lower()
-        if any(flag in response_lower for flag in medical_flags):
-            logger.warning("Medical advice detected in AI response, using fallback")
+        match = safety_matcher.first_match(response, categories=('medical_advice',))
+        if match:
+            logger.warning(f"Medical advice detected in AI response ({match[1]}), using fallback")
             return self._get_fallback_response()
         
         # Check response length and quality
@@ -0,0 +1,154 @@
+from django.conf import settings
+import json
+import logging
+import threading
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class PeerFeedCache:
+    """Capped per-group lists of pre-serialized visible peer posts in Redis.
+
+    Each list holds the newest posts of a group, newest first, exactly as
+    PeerPostSerializer renders them, so the first page of a hot group is read
+    with one LRANGE. New posts are pushed when created; a list is dropped
+    when one of its posts is flagged or deleted, so a list shorter than
+    max_posts always holds the whole group and a short page really is the
+    last one. A missing list is rebuilt from the database on the next read;
+    the TTL bounds how long a list missed by a concurrent rebuild can stay
+    stale.
+    """
+
+    def __init__(self, redis_client, max_posts=200, ttl_seconds=3600, key_prefix='peer_feed'):
+        self.redis_client = redis_client
+        self.max_posts = max_posts
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def make_key(self, group_id):
+        return f"{self.key_prefix}:{group_id}"
+
+    def get_page(self, group_id, page_size):
+        """Return up to page_size + 1 serialized posts, newest first, or None on a miss"""
+        if page_size >= self.max_posts:
+            # The list cannot tell whether a page this large has a next page
+            return None
+
+        key = self.make_key(group_id)
+        try:
+            payloads = self.redis_client.lrange(key, 0, page_size)
+        except Exception as e:
+            self._error('reading', e)
+            return None
+
+        if not payloads:
+            with self._lock:
+                self.misses += 1
+            payloads = self.rebuild(group_id)
+            if payloads is None:
+                return None
+            payloads = payloads[:page_size + 1]
+        else:
+            with self._lock:
+                self.hits += 1
+
+        return [json.loads(payload) for payload in payloads]
+
+    def rebuild(self, group_id):
+        """Reload a group's list from the database and return its payloads"""
+        from ..models import PeerPost
+        from ..serializers import PeerPostSerializer
+
+        posts = PeerPost.objects.filter(
+            group_id=group_id, is_flagged=False
+        ).select_related('user').order_by('-created_at', '-id')[:self.max_posts]
+        payloads = [json.dumps(data) for data in PeerPostSerializer(posts, many=True).data]
+        if not payloads:
+            return payloads
+
+        key = self.make_key(group_id)
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.delete(key)
+            pipeline.rpush(key, *payloads)
+            pipeline.expire(key, self.ttl_seconds)
+            pipeline.execute()
+        except Exception as e:
+            self._error('rebuilding', e)
+        return payloads
+
+    def push(self, post):
+        """Add a newly created post to the front of its group's list"""
+        from ..serializers import PeerPostSerializer
+
+        key = self.make_key(post.group_id)
+        payload = json.dumps(PeerPostSerializer(post).data)
+        try:
+            # LPUSHX leaves a missing list missing; the next read rebuilds it
+            pipeline = self.redis_client.pipeline()
+            pipeline.lpushx(key, payload)
+            pipeline.ltrim(key, 0, self.max_posts - 1)
+            pipeline.execute()
+        except Exception as e:
+            self._error('updating', e)
+
+    def remove(self, post):
+        """Drop a post from its group's feed, e.g. once it has been flagged.
+
+        Removing just the post would leave the list one short of the group's
+        newest posts, and a page read from it could end the feed early, so
+        the whole list goes and the next read rebuilds it.
+        """
+        self.invalidate(post.group_id)
+
+    def invalidate(self, group_id):
+        try:
+            self.redis_client.delete(self.make_key(group_id))
+        except Exception as e:
+            self._error('invalidating', e)
+
+    def _error(self, action, e):
+        with self._lock:
+            self.errors += 1
+        logger.warning(f"Error {action} peer feed cache: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'errors': self.errors,
+                'max_posts': self.max_posts,
+            }
+
+
+_peer_feed_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_peer_feed_cache():
+    """Return the process-wide peer feed cache, or None when it is disabled or Redis is not configured"""
+    global _peer_feed_cache
+
+    if not settings.PEER_FEED_CACHE_ENABLED:
+        return None
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return None
+
+    if _peer_feed_cache is None:
+        with _cache_lock:
+            if _peer_feed_cache is None:
+                _peer_feed_cache = PeerFeedCache(
+                    redis_client,
+                    max_posts=settings.PEER_FEED_CACHE_SIZE,
+                    ttl_seconds=settings.PEER_FEED_CACHE_TTL_SECONDS
+                )
+    return _peer_feed_cache
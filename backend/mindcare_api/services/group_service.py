@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SupportGroupService:
+    """Membership changes that keep SupportGroup.member_count in step.
+
+    The counter is adjusted with F() expressions in the same transaction as
+    the membership row, so concurrent joins and leaves never lose an update.
+    """
+
+    def join_group(self, user, group):
+        """Create or reactivate the user's membership of group"""
+        from ..models import GroupMembership, SupportGroup
+
+        with transaction.atomic():
+            membership, created = GroupMembership.objects.select_for_update().get_or_create(
+                user=user,
+                group=group
+            )
+            if created or not membership.is_active:
+                if not created:
+                    membership.is_active = True
+                    membership.save(update_fields=['is_active'])
+                SupportGroup.objects.filter(id=group.id).update(
+                    member_count=F('member_count') + 1, updated_at=timezone.now()
+                )
+
+        return membership
+
+    def leave_group(self, membership):
+        """Deactivate a membership, keeping it for history"""
+        from ..models import GroupMembership, SupportGroup
+
+        with transaction.atomic():
+            locked = GroupMembership.objects.select_for_update().get(pk=membership.pk)
+            if locked.is_active:
+                locked.is_active = False
+                locked.save(update_fields=['is_active'])
+                SupportGroup.objects.filter(id=locked.group_id).update(
+                    member_count=F('member_count') - 1, updated_at=timezone.now()
+                )
+
+        membership.is_active = False
+        return membership
@@ -0,0 +1,118 @@
+from concurrent.futures import Future
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collect single inference requests from concurrent callers into batches.
+
+    Callers block in submit() while a background thread drains the queue and
+    runs one batched call per max_batch_size items or max_wait_ms window,
+    whichever comes first, then hands each result back to its caller.
+    """
+
+    def __init__(self, infer_batch, max_batch_size=16, max_wait_ms=5, name='batcher'):
+        self.infer_batch = infer_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.name = name
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._batches = 0
+        self._items = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._inference_total = 0.0
+
+    def submit(self, item, timeout=None):
+        """Queue an item and block until its result is available"""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result(timeout=timeout)
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so a forked worker starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            # The window opens when the oldest request was queued, which keeps
+            # its added latency bounded by max_wait
+            deadline = first[2] + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        items = [item for item, _, _ in batch]
+
+        try:
+            results = list(self.infer_batch(items))
+            if len(results) != len(items):
+                # zip() would silently leave the extra callers waiting forever
+                raise ValueError(f"{self.name} returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Error running {self.name} batch of {len(items)}: {str(e)}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+        finished = time.perf_counter()
+        waits = [started - enqueued_at for _, _, enqueued_at in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._queue_wait_total += sum(waits)
+            self._queue_wait_max = max(self._queue_wait_max, max(waits))
+            self._inference_total += finished - started
+
+    def stats(self):
+        """Batch fill and queue wait metrics since the worker started"""
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+            return {
+                'batches': batches,
+                'items': items,
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 1),
+                'avg_batch_size': round(items / batches, 2) if batches else 0,
+                'avg_batch_fill': round(items / (batches * self.max_batch_size), 3) if batches else 0,
+                'avg_queue_wait_ms': round(self._queue_wait_total / items * 1000, 2) if items else 0,
+                'max_queue_wait_ms': round(self._queue_wait_max * 1000, 2),
+                'avg_inference_ms': round(self._inference_total / batches * 1000, 2) if batches else 0,
+            }
@@ -0,0 +1,139 @@
+from django.conf import settings
+import json
+import logging
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+CRISIS_PHRASES = [
+    'suicide', 'kill myself', 'end it all', 'hurt myself', 'self harm',
+    'want to die', 'better off dead', 'no point living', 'end my life'
+]
+
+# Medical advice the enhanced assistant must never give
+MEDICAL_ADVICE_PHRASES = [
+    'diagnose', 'prescription', 'medication', 'dosage', 'treatment plan',
+    'cure', 'disorder', 'illness', 'disease', 'therapy session'
+]
+
+# Terms the basic assistant treats as unsafe in a response
+UNSAFE_RESPONSE_PHRASES = [
+    'diagnose', 'prescription', 'medication', 'cure', 'treatment plan'
+]
+
+# Common digit/symbol substitutions used to dodge keyword filters
+LEETSPEAK = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's',
+})
+
+NON_WORD = re.compile(r'[\W_]+')
+
+# Simple inflections, so 'medication' also matches 'medications' and 'diagnose' 'diagnosed'
+INFLECTION_SUFFIX = r'(?:e?s|e?d)?'
+
+
+def normalize_text(text):
+    """Fold case, accents, leetspeak and punctuation so variants match the same phrase"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    folded = stripped.casefold().translate(LEETSPEAK)
+    return NON_WORD.sub(' ', folded).strip()
+
+
+def _trie_pattern(phrases):
+    """Compile phrases into a prefix-factored regex, which scans like a trie
+    instead of trying each alternative from scratch"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def walk(node):
+        branches = [re.escape(ch) + walk(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if '' in node:
+            # The phrase may end here; longer matches are tried first
+            pattern = f"(?:{pattern})?" if len(branches) == 1 else f"{pattern}?"
+        return pattern
+
+    return walk(trie)
+
+
+class KeywordMatcher:
+    """Multi-category phrase matcher with one compiled regex per category.
+
+    Phrases and input are normalized the same way (Unicode, case, leetspeak,
+    punctuation) and matched on word boundaries. Each category is scanned
+    separately with a lookahead, so a phrase is still found when it overlaps
+    or sits inside a longer phrase, e.g. 'self harm' in 'self harm support
+    group'. Within a category, a phrase starting where a longer one of the
+    same category starts is reported as the longer phrase.
+    """
+
+    def __init__(self, phrases_by_category):
+        # category -> normalized phrase -> original phrase
+        self.phrases = {}
+        for category, phrases in phrases_by_category.items():
+            for phrase in phrases:
+                normalized = normalize_text(phrase)
+                if normalized:
+                    self.phrases.setdefault(category, {}).setdefault(normalized, phrase)
+
+        # Zero-width matches, so finditer tries every word start instead of
+        # resuming after the end of the previous match
+        self.regexes = {
+            category: re.compile(f"\\b(?=(?P<phrase>{_trie_pattern(phrases)}){INFLECTION_SUFFIX}\\b)")
+            for category, phrases in self.phrases.items()
+        }
+
+    def find_all(self, text, categories=None):
+        """Return (category, phrase) for every phrase found in text, in text order,
+        optionally limited to some categories"""
+        normalized = normalize_text(text)
+        matches = []
+        for category, regex in self.regexes.items():
+            if categories is not None and category not in categories:
+                continue
+            phrases = self.phrases[category]
+            matches.extend(
+                (match.start(), category, phrases[match.group('phrase')])
+                for match in regex.finditer(normalized)
+            )
+        matches.sort(key=lambda match: match[0])
+        return [(category, phrase) for _, category, phrase in matches]
+
+    def first_match(self, text, categories=None):
+        """Return the first (category, phrase) found, optionally limited to some categories"""
+        matches = self.find_all(text, categories=categories)
+        return matches[0] if matches else None
+
+    def matches(self, text, category):
+        return self.first_match(text, categories=(category,)) is not None
+
+
+def _load_phrases():
+    phrases = {
+        'crisis': list(CRISIS_PHRASES),
+        'medical_advice': list(MEDICAL_ADVICE_PHRASES),
+        'unsafe_response': list(UNSAFE_RESPONSE_PHRASES),
+    }
+
+    # Larger (e.g. multilingual) lists maintained by the clinical team
+    if settings.SAFETY_PHRASES_FILE:
+        try:
+            with open(settings.SAFETY_PHRASES_FILE, encoding='utf-8') as phrases_file:
+                for category, extra in json.load(phrases_file).items():
+                    phrases.setdefault(category, []).extend(extra)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading safety phrases file: {str(e)}")
+
+    return phrases
+
+
+# Built once per process at import time
+safety_matcher = KeywordMatcher(_load_phrases())
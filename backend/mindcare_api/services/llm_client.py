@@ -0,0 +1,249 @@
+import openai
+import httpx
+from django.conf import settings
+from collections import deque
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: the upstream may answer differently on the next attempt
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit breaker is open"""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when no attempt could complete within the call deadline"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected for reset_seconds. The first call after that is let through
+    as a probe: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+                return True
+            # Either still cooling down or a probe is already in flight
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning(f"LLM circuit breaker opened after {self.consecutive_failures} failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Shared chat completion client with connection pooling, deadlines,
+    bounded retries with jitter and a circuit breaker."""
+
+    def __init__(self, api_key=None, base_url=None, model=None, timeout=None, connect_timeout=None,
+                 max_retries=None, backoff_seconds=None, pool_size=None,
+                 failure_threshold=None, reset_seconds=None):
+        self.model = model or settings.OPENAI_MODEL
+        self.timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+        self.connect_timeout = connect_timeout or settings.LLM_CONNECT_TIMEOUT_SECONDS
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = settings.LLM_RETRY_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+        pool_size = pool_size or settings.LLM_POOL_SIZE
+
+        # Keep-alive pool shared by every request in the process
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        )
+        self.client = openai.OpenAI(
+            api_key=api_key or settings.OPENAI_API_KEY,
+            base_url=base_url or settings.OPENAI_BASE_URL,
+            http_client=self.http_client,
+            max_retries=0  # retries are handled here so they respect the deadline
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=failure_threshold or settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=reset_seconds or settings.LLM_CIRCUIT_RESET_SECONDS
+        )
+
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def chat_completion(self, messages, timeout=None, **params):
+        """Return the text of a chat completion, raising on failure"""
+        model = params.pop('model', self.model)
+        response = self._call(
+            lambda remaining: self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=self._timeout(remaining),
+                **params
+            ),
+            timeout
+        )
+        return response.choices[0].message.content
+
+    def stream_chat_completion(self, messages, timeout=None, **params):
+        """Yield chat completion text chunks as they arrive.
+
+        Only opening the stream is retried; the deadline applies to opening it
+        and to each read while it is being consumed.
+        """
+        model = params.pop('model', self.model)
+        started = time.monotonic()
+        stream = self._call(
+            lambda remaining: self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                timeout=self._timeout(remaining),
+                stream=True,
+                **params
+            ),
+            timeout,
+            record_success=False
+        )
+
+        ok = True
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            ok = False
+            raise
+        finally:
+            # Also runs when the consumer stops early, e.g. the client disconnected
+            stream.response.close()
+            self._record(started, ok=ok)
+
+    def _call(self, request, timeout=None, record_success=True):
+        if not self.breaker.allow_request():
+            with self._stats_lock:
+                self.rejected += 1
+            raise CircuitOpenError("LLM upstream is unhealthy, circuit breaker is open")
+
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        attempt = 0
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._record(started, ok=False)
+                raise DeadlineExceededError("LLM request did not complete before its deadline")
+            try:
+                result = request(remaining)
+            except RETRYABLE_ERRORS as e:
+                backoff = self._backoff(attempt)
+                if attempt >= self.max_retries or time.monotonic() + backoff >= deadline:
+                    self._record(started, ok=False)
+                    raise
+                logger.warning(f"LLM request failed ({type(e).__name__}), retrying in {backoff:.2f}s")
+                with self._stats_lock:
+                    self.retries += 1
+                attempt += 1
+                time.sleep(backoff)
+            except openai.APIStatusError:
+                # Client errors (bad request, auth) will not improve on retry, but
+                # they do show the upstream is reachable
+                self.breaker.record_success()
+                with self._stats_lock:
+                    self.requests += 1
+                    self.failures += 1
+                raise
+            else:
+                if record_success:
+                    self._record(started, ok=True)
+                return result
+
+    def _backoff(self, attempt):
+        # Exponential backoff with full jitter
+        return random.uniform(0, self.backoff_seconds * (2 ** attempt))
+
+    def _timeout(self, remaining):
+        return httpx.Timeout(remaining, connect=min(self.connect_timeout, remaining))
+
+    def _record(self, started, ok):
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+        with self._stats_lock:
+            self.requests += 1
+            if ok:
+                self.successes += 1
+                self._latencies.append(time.monotonic() - started)
+            else:
+                self.failures += 1
+
+    def stats(self):
+        """Latency and error counters for monitoring"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            return {
+                'requests': self.requests,
+                'successes': self.successes,
+                'failures': self.failures,
+                'retries': self.retries,
+                'rejected_by_circuit': self.rejected,
+                'circuit_state': self.breaker.state,
+                'latency_p50_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                'latency_p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+                'latency_max_ms': round(latencies[-1] * 1000, 1) if latencies else None,
+            }
+
+
+_llm_client = None
+_llm_client_pid = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the process-wide LLM client"""
+    global _llm_client, _llm_client_pid
+
+    # Pooled sockets must not be shared with a forked worker
+    if _llm_client is None or _llm_client_pid != os.getpid():
+        with _llm_client_lock:
+            if _llm_client is None or _llm_client_pid != os.getpid():
+                _llm_client = LLMClient()
+                _llm_client_pid = os.getpid()
+    return _llm_client
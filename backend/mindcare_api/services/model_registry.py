@@ -0,0 +1,122 @@
+from django.conf import settings
+import logging
+import resource
+import threading
+import time
+from .emotion_backends import build_emotion_backend
+from .inference_batcher import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+
+def _resident_memory_mb():
+    """Return the current resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return round(resident_pages * resource.getpagesize() / (1024 * 1024), 1)
+    except (OSError, IndexError, ValueError):
+        # Not on Linux - fall back to the peak RSS reported by getrusage (KB)
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class EmotionModelRegistry:
+    """Process-wide, lazily built holder for the emotion classification backend.
+
+    Every EmotionDetectionService in the process shares the backend held here,
+    so the model is read from disk once per worker instead of once per request.
+    """
+
+    def __init__(self, backend_name=None):
+        self.backend_name = backend_name
+        self._classifier = None
+        self._batcher = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.memory_before_mb = None
+        self.memory_after_mb = None
+
+    def get_classifier(self):
+        """Return the shared inference backend, loading it on first use"""
+        classifier = self._classifier
+        if classifier is not None:
+            return classifier
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if self._classifier is None:
+                self._classifier = self._load()
+            return self._classifier
+
+    def get_batcher(self):
+        """Return the shared micro-batcher that feeds the pipeline"""
+        if self._batcher is None:
+            with self._lock:
+                if self._batcher is None:
+                    self._batcher = MicroBatcher(
+                        self._classify_batch,
+                        max_batch_size=settings.EMOTION_BATCH_MAX_SIZE,
+                        max_wait_ms=settings.EMOTION_BATCH_MAX_WAIT_MS,
+                        name='emotion-batcher'
+                    )
+        return self._batcher
+
+    def _classify_batch(self, texts):
+        classifier = self.get_classifier()
+        if classifier is None:
+            raise RuntimeError("Emotion model is not available")
+        # A list input returns one top-scoring {'label', 'score'} per text
+        return classifier(texts, batch_size=len(texts))
+
+    def get_backend_name(self):
+        return self.backend_name or settings.EMOTION_BACKEND
+
+    def model_version(self):
+        """Identifier of the model producing results, used to version cached results"""
+        backend_name = self.get_backend_name()
+        model_id = settings.EMOTION_ONNX_MODEL_DIR if backend_name == 'onnx' else settings.EMOTION_MODEL_NAME
+        return f"{backend_name}:{model_id}:{settings.EMOTION_MODEL_REVISION}"
+
+    def _load(self):
+        backend_name = self.get_backend_name()
+        self.memory_before_mb = _resident_memory_mb()
+        started = time.perf_counter()
+
+        try:
+            classifier = build_emotion_backend(backend_name)
+        except Exception as e:
+            logger.error(f"Error loading emotion model: {str(e)}")
+            return None
+
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self.memory_after_mb = _resident_memory_mb()
+        logger.info(
+            f"Loaded {backend_name} emotion model {classifier.model_name} in {self.load_seconds}s "
+            f"(RSS {self.memory_before_mb}MB -> {self.memory_after_mb}MB)"
+        )
+        return classifier
+
+    def is_loaded(self):
+        return self._classifier is not None
+
+    def stats(self):
+        """Report load time, resident memory and batching metrics for monitoring"""
+        return {
+            'backend': self.get_backend_name(),
+            'model': self._classifier.model_name if self._classifier else None,
+            'loaded': self.is_loaded(),
+            'load_seconds': self.load_seconds,
+            'memory_before_mb': self.memory_before_mb,
+            'memory_after_mb': self.memory_after_mb,
+            'resident_memory_mb': _resident_memory_mb(),
+            'batching': self._batcher.stats() if self._batcher else None,
+        }
+
+
+emotion_model_registry = EmotionModelRegistry()
+
+
+def warmup_emotion_model():
+    """Load the shared emotion model eagerly, e.g. when a worker boots"""
+    emotion_model_registry.get_classifier()
+    return emotion_model_registry.stats()
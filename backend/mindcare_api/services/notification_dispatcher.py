@@ -0,0 +1,209 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+import random
+from .alert_service import AlertService
+from .notification_providers import PermanentDeliveryError, build_email_provider, build_sms_provider
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """Drains the notification outbox in batches.
+
+    A batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    dispatchers can run side by side. Emails sharing a template go out as one
+    multi-recipient provider request; SMS are sent with bounded concurrency.
+    Failed deliveries are retried with exponential backoff and jitter, and
+    each alert's status is updated once all its notifications are settled.
+    """
+
+    def __init__(self, email_provider=None, sms_provider=None, batch_size=None, sms_concurrency=None,
+                 max_attempts=None, backoff_seconds=None, claim_seconds=None):
+        self.email_provider = email_provider or build_email_provider()
+        self.sms_provider = sms_provider or build_sms_provider()
+        self.batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+        self.sms_concurrency = sms_concurrency or settings.NOTIFICATION_SMS_CONCURRENCY
+        self.max_attempts = max_attempts or settings.NOTIFICATION_MAX_ATTEMPTS
+        self.backoff_seconds = backoff_seconds or settings.NOTIFICATION_RETRY_BACKOFF_SECONDS
+        self.claim_seconds = claim_seconds or settings.NOTIFICATION_CLAIM_SECONDS
+        self.alert_service = AlertService()
+
+    def dispatch_pending(self, max_batches=None):
+        """Dispatch batches until nothing is due, returning delivery counts"""
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            counts = self.dispatch_batch()
+            if counts is None:
+                break
+            for key, value in counts.items():
+                totals[key] += value
+            batches += 1
+        return totals
+
+    def dispatch_batch(self):
+        """Deliver one batch of due notifications; None when nothing is due"""
+        jobs = self._claim()
+        if not jobs:
+            return None
+
+        errors = {}
+        errors.update(self._send_emails([job for job in jobs if job.channel == 'email']))
+        errors.update(self._send_sms([job for job in jobs if job.channel == 'sms']))
+
+        counts = self._record_results(jobs, errors)
+        self._update_alerts({job.alert_id for job in jobs})
+        return counts
+
+    def _claim(self):
+        from ..models import NotificationOutbox
+
+        now = timezone.now()
+        with transaction.atomic():
+            # A 'sending' row whose claim expired belonged to a dispatcher that died
+            jobs = list(
+                NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+                    status__in=['pending', 'sending'],
+                    next_attempt_at__lte=now
+                ).order_by('next_attempt_at', 'id')[:self.batch_size]
+            )
+            if jobs:
+                NotificationOutbox.objects.filter(id__in=[job.id for job in jobs]).update(
+                    status='sending',
+                    attempts=F('attempts') + 1,
+                    next_attempt_at=now + timedelta(seconds=self.claim_seconds)
+                )
+        for job in jobs:
+            job.attempts += 1
+        return jobs
+
+    def _send_emails(self, jobs):
+        """Send emails grouped by template; returns job id -> error for failures"""
+        by_template = defaultdict(list)
+        for job in jobs:
+            by_template[job.template].append(job)
+
+        errors = {}
+        for template, template_jobs in by_template.items():
+            try:
+                html = self.alert_service.email_template(template)
+            except ValueError as e:
+                errors.update({job.id: PermanentDeliveryError(str(e)) for job in template_jobs})
+                continue
+
+            for start in range(0, len(template_jobs), self.email_provider.max_batch_size):
+                chunk = template_jobs[start:start + self.email_provider.max_batch_size]
+                try:
+                    self.email_provider.send_batch(
+                        html,
+                        [(job.recipient, job.subject, job.substitutions) for job in chunk]
+                    )
+                except PermanentDeliveryError as e:
+                    if len(chunk) == 1:
+                        logger.error(f"Error sending '{template}' email {chunk[0].id}: {str(e)}")
+                        errors[chunk[0].id] = e
+                        continue
+                    # A single bad recipient rejects the whole request; resend
+                    # one by one so only the rejected recipients fail
+                    logger.warning(
+                        f"Batch of {len(chunk)} '{template}' emails rejected, retrying per recipient: {str(e)}"
+                    )
+                    errors.update(self._send_emails_individually(html, template, chunk))
+                except Exception as e:
+                    logger.error(f"Error sending {len(chunk)} '{template}' emails: {str(e)}")
+                    errors.update({job.id: e for job in chunk})
+        return errors
+
+    def _send_emails_individually(self, html, template, jobs):
+        errors = {}
+        for job in jobs:
+            try:
+                self.email_provider.send_batch(html, [(job.recipient, job.subject, job.substitutions)])
+            except Exception as e:
+                logger.error(f"Error sending '{template}' email {job.id}: {str(e)}")
+                errors[job.id] = e
+        return errors
+
+    def _send_sms(self, jobs):
+        """Send SMS concurrently; returns job id -> error for failures"""
+        if not jobs:
+            return {}
+
+        def send(job):
+            try:
+                self.sms_provider.send(job.recipient, job.body)
+            except Exception as e:
+                logger.error(f"Error sending alert SMS {job.id}: {str(e)}")
+                return job.id, e
+            return job.id, None
+
+        with ThreadPoolExecutor(max_workers=min(self.sms_concurrency, len(jobs))) as executor:
+            results = executor.map(send, jobs)
+            return {job_id: error for job_id, error in results if error is not None}
+
+    def _record_results(self, jobs, errors):
+        from ..models import NotificationOutbox
+
+        now = timezone.now()
+        counts = {'sent': 0, 'retried': 0, 'failed': 0}
+        for job in jobs:
+            error = errors.get(job.id)
+            if error is None:
+                job.status = 'sent'
+                job.sent_at = now
+                job.last_error = None
+                counts['sent'] += 1
+            elif isinstance(error, PermanentDeliveryError) or job.attempts >= self.max_attempts:
+                job.status = 'failed'
+                job.last_error = str(error)
+                counts['failed'] += 1
+            else:
+                job.status = 'pending'
+                job.next_attempt_at = now + timedelta(seconds=self._backoff(job.attempts))
+                job.last_error = str(error)
+                counts['retried'] += 1
+
+        NotificationOutbox.objects.bulk_update(jobs, ['status', 'sent_at', 'last_error', 'next_attempt_at'])
+        return counts
+
+    def _backoff(self, attempts):
+        # Exponential backoff with full jitter
+        return random.uniform(0, self.backoff_seconds * (2 ** (attempts - 1)))
+
+    def _update_alerts(self, alert_ids):
+        """Reflect the delivery state of each alert's notifications on the alert"""
+        from ..models import Alert, NotificationOutbox
+
+        states = defaultdict(lambda: defaultdict(int))
+        rows = NotificationOutbox.objects.filter(alert_id__in=alert_ids).order_by().values(
+            'alert_id', 'channel', 'status'
+        ).annotate(count=Count('id'))
+        for row in rows:
+            states[row['alert_id']][(row['channel'], row['status'])] += row['count']
+
+        now = timezone.now()
+        alerts = list(Alert.objects.filter(id__in=alert_ids).only(
+            'id', 'status', 'sent_via_email', 'sent_via_sms', 'sent_to_guardian', 'sent_at'
+        ))
+        for alert in alerts:
+            state = states[alert.id]
+            alert.sent_via_email = state[('email', 'sent')] > 0
+            alert.sent_via_sms = state[('sms', 'sent')] > 0
+            alert.sent_to_guardian = alert.sent_via_email or alert.sent_via_sms
+
+            settled = not any(
+                count for (_, status), count in state.items() if status in ('pending', 'sending')
+            )
+            if settled:
+                alert.status = 'sent' if alert.sent_to_guardian else 'failed'
+                alert.sent_at = now
+
+        Alert.objects.bulk_update(
+            alerts, ['status', 'sent_via_email', 'sent_via_sms', 'sent_to_guardian', 'sent_at']
+        )
@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# SendGrid accepts at most this many personalizations per request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+
+class PermanentDeliveryError(Exception):
+    """Raised for deliveries that will fail the same way if retried"""
+
+
+class SendGridEmailProvider:
+    """Sends one email template to many recipients per SendGrid request"""
+
+    max_batch_size = SENDGRID_MAX_PERSONALIZATIONS
+
+    def __init__(self):
+        from sendgrid import SendGridAPIClient
+
+        self.client = SendGridAPIClient(settings.SENDGRID_API_KEY) if settings.SENDGRID_API_KEY else None
+
+    def send_batch(self, template, messages):
+        """Send template to every (to_email, subject, substitutions) in messages"""
+        from sendgrid.helpers.mail import Mail, Personalization, Substitution, To
+        from python_http_client.exceptions import HTTPError
+
+        if self.client is None:
+            raise PermanentDeliveryError("SendGrid is not configured")
+
+        mail = Mail(
+            from_email=settings.NOTIFICATION_FROM_EMAIL,
+            subject=messages[0][1],
+            html_content=template
+        )
+        for to_email, subject, substitutions in messages:
+            personalization = Personalization()
+            personalization.add_to(To(to_email))
+            personalization.subject = subject
+            for tag, value in substitutions.items():
+                personalization.add_substitution(Substitution(tag, str(value)))
+            mail.add_personalization(personalization)
+
+        try:
+            response = self.client.send(mail)
+        except HTTPError as e:
+            # Rate limiting and server errors are worth retrying, the rest are not
+            if e.status_code == 429 or e.status_code >= 500:
+                raise
+            raise PermanentDeliveryError(f"SendGrid rejected the request: {e.status_code}")
+        if response.status_code != 202:
+            raise RuntimeError(f"Unexpected SendGrid response: {response.status_code}")
+
+
+class TwilioSmsProvider:
+    """Sends SMS through Twilio; the client is thread-safe and shared"""
+
+    def __init__(self):
+        from twilio.rest import Client
+
+        self.client = (
+            Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+            if settings.TWILIO_ACCOUNT_SID else None
+        )
+
+    def send(self, to_phone, body):
+        from twilio.base.exceptions import TwilioRestException
+
+        if self.client is None:
+            raise PermanentDeliveryError("Twilio is not configured")
+
+        try:
+            message = self.client.messages.create(
+                body=body,
+                from_=settings.TWILIO_PHONE_NUMBER,
+                to=to_phone
+            )
+        except TwilioRestException as e:
+            if e.status == 429 or e.status >= 500:
+                raise
+            raise PermanentDeliveryError(f"Twilio rejected the message: {e.status}")
+        return message.sid
+
+
+class InMemoryEmailProvider:
+    """Local stand-in for SendGrid that records what would have been sent"""
+
+    max_batch_size = SENDGRID_MAX_PERSONALIZATIONS
+
+    def __init__(self, latency_seconds=0):
+        self.latency_seconds = latency_seconds
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def send_batch(self, template, messages):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self._lock:
+            self.requests.append((template, list(messages)))
+
+    @property
+    def sent(self):
+        return [message for _, messages in self.requests for message in messages]
+
+
+class InMemorySmsProvider:
+    """Local stand-in for Twilio that records what would have been sent"""
+
+    def __init__(self, latency_seconds=0):
+        self.latency_seconds = latency_seconds
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to_phone, body):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self._lock:
+            self.sent.append((to_phone, body))
+        return uuid.uuid4().hex
+
+
+def build_email_provider():
+    return import_string(settings.NOTIFICATION_EMAIL_PROVIDER)()
+
+
+def build_sms_provider():
+    return import_string(settings.NOTIFICATION_SMS_PROVIDER)()
@@ -0,0 +1,23 @@
+from django.conf import settings
+import logging
+import redis
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def get_redis_client():
+    """Return the shared Redis client used by the cache tiers, or None if not configured"""
+    global _client
+
+    if not settings.CACHE_REDIS_URL:
+        return None
+    if _client is None:
+        # redis-py clients are thread-safe and pool their connections
+        _client = redis.Redis.from_url(
+            settings.CACHE_REDIS_URL,
+            socket_timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS
+        )
+    return _client
@@ -0,0 +1,208 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from collections import Counter
+from datetime import timedelta
+import logging
+import math
+from .emotion_service import summarize_emotion_counts
+from .rollup_service import daily_stats_rollup
+
+logger = logging.getLogger(__name__)
+
+# Score of each session stress level when averaging a week
+STRESS_LEVEL_SCORES = {
+    'low': 0.2, 'moderate': 0.4, 'high': 0.7, 'critical': 1.0
+}
+DEFAULT_STRESS_LEVEL_SCORE = 0.2
+
+
+def current_week_range():
+    """Return (week_start, week_end) of the current Sunday to Saturday week"""
+    today = timezone.now().date()
+    days_since_sunday = today.weekday() + 1 if today.weekday() != 6 else 0
+    week_start = today - timedelta(days=days_since_sunday)
+    return week_start, week_start + timedelta(days=6)
+
+
+def assess_risk(avg_stress):
+    if avg_stress >= 0.8:
+        return 'critical'
+    if avg_stress >= 0.6:
+        return 'high'
+    if avg_stress >= 0.4:
+        return 'moderate'
+    return 'low'
+
+
+def generate_weekly_summary(user, total_sessions, emotion_analysis, avg_stress):
+    """Generate human-readable weekly summary"""
+    try:
+        # Stress level summary
+        if avg_stress >= 0.8:
+            stress_summary = "showed high levels of emotional distress"
+        elif avg_stress >= 0.6:
+            stress_summary = "experienced elevated stress levels"
+        elif avg_stress >= 0.4:
+            stress_summary = "had moderate stress indicators"
+        else:
+            stress_summary = "maintained relatively stable emotional well-being"
+
+        # Emotion summary
+        emotion_summary = ""
+        if emotion_analysis and 'dominant_emotion' in emotion_analysis:
+            dominant = emotion_analysis['dominant_emotion']
+            emotion_summary = f" The most frequently detected emotion was {dominant}."
+
+        # Activity summary
+        if total_sessions >= 7:
+            activity_summary = "engaged frequently with the mental health support system"
+        elif total_sessions >= 3:
+            activity_summary = "regularly used the mental health support resources"
+        else:
+            activity_summary = "had limited engagement with support resources"
+
+        summary = f"This week, {user.first_name} {activity_summary} with {total_sessions} chat sessions and {stress_summary}.{emotion_summary}"
+
+        # Add recommendations
+        if avg_stress >= 0.7:
+            summary += " Recommendation: Consider scheduling a counseling session for additional support."
+        elif avg_stress >= 0.5:
+            summary += " Recommendation: Continue monitoring and encourage use of coping strategies."
+        else:
+            summary += " Overall positive engagement with mental health resources."
+
+        return summary
+
+    except Exception as e:
+        logger.error(f"Error generating weekly summary: {str(e)}")
+        return f"Weekly summary for {total_sessions} sessions with average stress level of {avg_stress:.2f}."
+
+
+class WeeklyReportEngine:
+    """Set-based weekly report generation.
+
+    Students are streamed by id in chunks. For each chunk the week's session
+    counts, stress levels and emotion distributions come from the daily
+    rollup (DailyUserStats), and the reports of the students who do not have
+    one for the week yet are written with one bulk insert and sent.
+    """
+
+    def __init__(self, week_start, week_end, chunk_size=None, alert_service=None):
+        self.week_start = week_start
+        self.week_end = week_end
+        self.chunk_size = chunk_size or settings.WEEKLY_REPORT_CHUNK_SIZE
+        self.alert_service = alert_service
+
+    def student_ids(self, min_id=None, max_id=None):
+        """Ids of the active students, optionally limited to an inclusive id range"""
+        from ..models import User
+
+        students = User.objects.filter(role='student', is_active=True)
+        if min_id is not None:
+            students = students.filter(id__gte=min_id)
+        if max_id is not None:
+            students = students.filter(id__lte=max_id)
+        return students.order_by('id').values_list('id', flat=True)
+
+    def shard_ranges(self, shard_size):
+        """Split the students into inclusive (min_id, max_id) ranges of about shard_size students"""
+        ranges = []
+        first_id = last_id = None
+        count = 0
+        for user_id in self.student_ids().iterator(chunk_size=self.chunk_size):
+            if first_id is None:
+                first_id = user_id
+            last_id = user_id
+            count += 1
+            if count >= shard_size:
+                ranges.append((first_id, last_id))
+                first_id, count = None, 0
+        if first_id is not None:
+            ranges.append((first_id, last_id))
+        return ranges
+
+    def run(self, min_id=None, max_id=None):
+        """Generate reports for every student in range and return how many were created"""
+        reports_generated = 0
+        chunk = []
+        for user_id in self.student_ids(min_id, max_id).iterator(chunk_size=self.chunk_size):
+            chunk.append(user_id)
+            if len(chunk) >= self.chunk_size:
+                reports_generated += len(self.generate_chunk(chunk))
+                chunk = []
+        if chunk:
+            reports_generated += len(self.generate_chunk(chunk))
+        return reports_generated
+
+    def generate_chunk(self, user_ids):
+        """Create the missing reports of these students and send them to guardians"""
+        from ..models import User, WeeklyReport
+
+        with transaction.atomic():
+            # Lock the chunk's students, so a concurrent run for the same week
+            # waits here and then finds these reports among the existing ones
+            # instead of sending them a second time
+            list(User.objects.select_for_update().filter(id__in=user_ids).order_by('id').values_list('id', flat=True))
+
+            existing = set(WeeklyReport.objects.filter(
+                user_id__in=user_ids, week_start=self.week_start
+            ).values_list('user_id', flat=True))
+            user_ids = [user_id for user_id in user_ids if user_id not in existing]
+            if not user_ids:
+                return []
+
+            stress_counts = self._stress_level_counts(user_ids)
+            if not stress_counts:
+                return []
+            emotion_counts = self._emotion_counts(list(stress_counts))
+            users = User.objects.filter(id__in=stress_counts).only('id', 'first_name')
+
+            reports = []
+            for user in users:
+                level_counts = stress_counts[user.id]
+                total_sessions = sum(level_counts.values())
+                avg_stress = math.fsum(
+                    STRESS_LEVEL_SCORES.get(level, DEFAULT_STRESS_LEVEL_SCORE) * count
+                    for level, count in level_counts.items()
+                ) / total_sessions
+                emotion_analysis = summarize_emotion_counts(emotion_counts.get(user.id, Counter()))
+
+                reports.append(WeeklyReport(
+                    user=user,
+                    week_start=self.week_start,
+                    week_end=self.week_end,
+                    total_sessions=total_sessions,
+                    avg_stress_level=round(avg_stress, 2),
+                    dominant_emotions=emotion_analysis,
+                    summary=generate_weekly_summary(user, total_sessions, emotion_analysis, avg_stress),
+                    risk_assessment=assess_risk(avg_stress)
+                ))
+
+            # Every report here is new: writers hold the students' locks, so
+            # none can have been inserted since the check above
+            inserted = WeeklyReport.objects.bulk_create(reports)
+
+            # Reloaded for the stored (rounded) values and the full users
+            created = list(WeeklyReport.objects.filter(
+                id__in=[report.id for report in inserted]
+            ).select_related('user'))
+            # In the same transaction: a report is never stored without its
+            # email, so a retried chunk cannot skip a report nobody was sent
+            self._queue_reports(created)
+        return created
+
+    def _stress_level_counts(self, user_ids):
+        """user id -> {stress level: sessions} for the week"""
+        return daily_stats_rollup.session_level_counts(user_ids, self.week_start, self.week_end)
+
+    def _emotion_counts(self, user_ids):
+        """user id -> Counter of detected emotions, in first-seen order"""
+        return daily_stats_rollup.emotion_counts(user_ids, self.week_start, self.week_end)
+
+    def _queue_reports(self, reports):
+        if self.alert_service is None:
+            return
+        reports = [report for report in reports if report.user.guardian_email]
+        if reports:
+            self.alert_service.queue_weekly_reports(reports)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, TextField
+from django.db.models.functions import Cast
+
+# Fields that feed Resource.search_vector
+SEARCH_FIELDS = ('title', 'description', 'tags')
+
+
+def resource_search_vector():
+    """Weighted tsvector of a resource: title first, then tags, then description"""
+    config = settings.RESOURCE_SEARCH_CONFIG
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector(Cast('tags', TextField()), weight='B', config=config)
+        + SearchVector('description', weight='C', config=config)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the stored search vector of every resource in queryset"""
+    return queryset.update(search_vector=resource_search_vector())
+
+
+def search_resources(queryset, text):
+    """Resources matching a web-style search, best matches first"""
+    query = SearchQuery(text, search_type='websearch', config=settings.RESOURCE_SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query)
+    ).order_by('-rank', 'title', 'id')
+
+
+def filter_by_tags(queryset, tags):
+    """Resources carrying every one of tags (a JSONB containment test)"""
+    return queryset.filter(tags__contains=list(tags))
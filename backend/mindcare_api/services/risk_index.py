@@ -0,0 +1,190 @@
+from django.conf import settings
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import threading
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Contribution of each critical/high session and each distress alert in the window
+CRITICAL_SESSION_WEIGHT = 5
+HIGH_SESSION_WEIGHT = 2
+ALERT_WEIGHT = 3
+RISK_ALERT_TYPES = ('critical_stress', 'emergency')
+
+
+class StudentRiskIndex:
+    """Leaderboard of students with critical sessions in the last few days.
+
+    Each such student is a member of a Redis sorted set, scored by their
+    critical and high-stress sessions and distress alerts in the window.
+    A student's score is recomputed from the daily rollup whenever one of
+    their sessions crosses into or out of high stress or they get an alert,
+    so the counselor dashboard reads the top of the board with ZREVRANGE
+    instead of scanning every recent session. Nothing happens when a session
+    or alert ages out of the window, so the hourly rebuild rescores the
+    board. Until then board scores can only overstate risk: top() recomputes
+    the scores of the students it reads, lowers or drops the out-of-date
+    entries, and reads further down the board until the students it returns
+    are provably the highest. Without Redis the board is computed from the
+    database.
+    """
+
+    def __init__(self, redis_client=None, window_days=None, key='risk_index'):
+        self.redis_client = redis_client
+        self.window_days = window_days or settings.RISK_INDEX_WINDOW_DAYS
+        self.key = key
+
+    def window_start(self):
+        return timezone.now() - timedelta(days=self.window_days)
+
+    def scores(self, user_ids=None):
+        """user id -> {'risk_score', 'critical_sessions', 'last_critical_date'} for students at risk"""
+        from ..models import Alert, DailyUserStats
+
+        window_start = self.window_start()
+        rows = DailyUserStats.objects.filter(date__gte=timezone.localdate(window_start))
+        alerts = Alert.objects.filter(alert_type__in=RISK_ALERT_TYPES, created_at__gte=window_start)
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+            alerts = alerts.filter(user_id__in=user_ids)
+
+        rows = rows.order_by().values('user_id').annotate(
+            total_critical_sessions=Sum('critical_sessions'),
+            total_high_sessions=Sum('high_sessions'),
+            last_critical_date=Max('date', filter=Q(critical_sessions__gt=0))
+        ).filter(total_critical_sessions__gt=0)
+
+        results = {
+            row['user_id']: {
+                'risk_score': (
+                    CRITICAL_SESSION_WEIGHT * row['total_critical_sessions']
+                    + HIGH_SESSION_WEIGHT * row['total_high_sessions']
+                ),
+                'critical_sessions': row['total_critical_sessions'],
+                'last_critical_date': row['last_critical_date'],
+            }
+            for row in rows
+        }
+        if results:
+            alert_counts = alerts.filter(user_id__in=list(results)).order_by().values(
+                'user_id'
+            ).annotate(count=Count('id')).values_list('user_id', 'count')
+            for user_id, count in alert_counts:
+                results[user_id]['risk_score'] += ALERT_WEIGHT * count
+        return results
+
+    def user_changed(self, user_id):
+        """Recompute one student's place on the board"""
+        if self.redis_client is None:
+            return
+        score = self.scores([user_id]).get(user_id)
+        try:
+            if score is None:
+                self.redis_client.zrem(self.key, user_id)
+            else:
+                self.redis_client.zadd(self.key, {user_id: score['risk_score']})
+        except Exception as e:
+            logger.warning(f"Error updating risk index: {str(e)}")
+
+    def top(self, limit, user_ids=None):
+        """The limit highest-risk students, optionally only among user_ids, highest first"""
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            if not user_ids:
+                return []
+
+        if self.redis_client is not None:
+            try:
+                return self._top_from_board(limit, user_ids)
+            except Exception as e:
+                logger.warning(f"Error reading risk index, using the database: {str(e)}")
+        return self._rank(self.scores(user_ids), limit)
+
+    def _top_from_board(self, limit, user_ids):
+        if user_ids is not None:
+            # A caseload is small: rescore all of its students on the board
+            member_scores = self.redis_client.zmscore(self.key, user_ids)
+            board = {user_id: score for user_id, score in zip(user_ids, member_scores) if score is not None}
+            return self._rank(self._rescore(board), limit)
+
+        # Board scores never understate risk: rises are written as they
+        # happen and only falls wait for a rescore. Once the limit-th student
+        # of the rescored window scores at least the lowest board score read,
+        # nobody further down can outrank them; until then widen the window.
+        window = limit
+        while True:
+            members = self.redis_client.zrevrange(self.key, 0, window - 1, withscores=True)
+            board = {int(member): score for member, score in members}
+            if len(members) < window:
+                return self._rank(self._rescore(board), limit)
+
+            # Redis orders ties by member; read all ties at the cut so they
+            # are broken by user id like the database does
+            lowest = members[-1][1]
+            board.update(
+                (int(member), lowest) for member in self.redis_client.zrangebyscore(self.key, lowest, lowest)
+            )
+            ranked = self._rank(self._rescore(board), limit)
+            if len(ranked) == limit and ranked[-1]['risk_score'] >= lowest:
+                return ranked
+            window *= 2
+
+    def _rescore(self, board):
+        """Scores of the students read from the board; fixes the board entries that were out of date"""
+        scores = self.scores(list(board))
+        stale = [user_id for user_id in board if user_id not in scores]
+        lowered = {
+            user_id: score['risk_score'] for user_id, score in scores.items()
+            if score['risk_score'] != board[user_id]
+        }
+        if stale or lowered:
+            try:
+                pipeline = self.redis_client.pipeline()
+                if stale:
+                    pipeline.zrem(self.key, *stale)
+                if lowered:
+                    # xx: a student removed meanwhile stays removed
+                    pipeline.zadd(self.key, lowered, xx=True)
+                pipeline.execute()
+            except Exception as e:
+                logger.warning(f"Error updating stale risk index entries: {str(e)}")
+        return scores
+
+    def _rank(self, scores, limit):
+        ranked = sorted(scores.items(), key=lambda item: (-item[1]['risk_score'], item[0]))
+        return [dict(score, user_id=user_id) for user_id, score in ranked[:limit]]
+
+    def rebuild(self):
+        """Replace the board with scores computed from the database; returns the number of students"""
+        scores = self.scores()
+        if self.redis_client is None:
+            return len(scores)
+
+        staging_key = f"{self.key}:rebuild"
+        pipeline = self.redis_client.pipeline()
+        pipeline.delete(staging_key)
+        if scores:
+            pipeline.zadd(staging_key, {user_id: score['risk_score'] for user_id, score in scores.items()})
+            pipeline.rename(staging_key, self.key)
+        else:
+            pipeline.delete(self.key)
+        pipeline.execute()
+        return len(scores)
+
+
+_risk_index = None
+_risk_index_lock = threading.Lock()
+
+
+def get_student_risk_index():
+    """Return the process-wide student risk index"""
+    global _risk_index
+
+    if _risk_index is None:
+        with _risk_index_lock:
+            if _risk_index is None:
+                _risk_index = StudentRiskIndex(redis_client=get_redis_client())
+    return _risk_index
@@ -0,0 +1,180 @@
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import Lower, TruncDate
+from django.utils import timezone
+from collections import Counter
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+STRESS_LEVEL_FIELDS = {
+    'low': 'low_sessions',
+    'moderate': 'moderate_sessions',
+    'high': 'high_sessions',
+    'critical': 'critical_sessions',
+}
+
+
+class DailyStatsRollup:
+    """Keeps DailyUserStats in step with sessions and scored messages, and
+    answers the dashboard and report aggregates from it."""
+
+    # Writes
+
+    def record_session_created(self, session):
+        self._add_sessions(session.user_id, session.session_start, session.stress_level, 1)
+
+    def record_session_deleted(self, session):
+        """Take a session and its scored messages out of the rollup.
+
+        Call before the messages are deleted (pre_delete), in the deleting
+        transaction.
+        """
+        from ..models import ChatMessage, DailyUserStats
+
+        with transaction.atomic():
+            self._add_sessions(session.user_id, session.session_start, session.stress_level, -1)
+
+            removed = list(self._scored_message_totals(ChatMessage.objects.filter(session=session)))
+            if not removed:
+                return
+
+            days = {row['day'] for row in removed}
+            # The deleted messages may have been the first of their emotion
+            # that day; take the first-seen times from what remains
+            remaining = self._scored_message_totals(ChatMessage.objects.filter(
+                session__user_id=session.user_id, timestamp__date__in=days
+            ).exclude(session=session))
+            first_seen = {(row['day'], row['emotion']): row['first_seen'] for row in remaining}
+
+            rows = DailyUserStats.objects.select_for_update().filter(user_id=session.user_id, date__in=days)
+            for stats in rows:
+                for row in removed:
+                    if row['day'] != stats.date:
+                        continue
+                    emotion = row['emotion']
+                    count = stats.emotion_counts.get(emotion, 0) - row['count']
+                    if count > 0 and (row['day'], emotion) in first_seen:
+                        stats.emotion_counts[emotion] = count
+                        stats.emotion_confidence_sums[emotion] = round(
+                            stats.emotion_confidence_sums.get(emotion, 0) - float(row['confidence'] or 0), 2
+                        )
+                        stats.emotion_first_seen[emotion] = first_seen[(row['day'], emotion)].isoformat()
+                    else:
+                        stats.emotion_counts.pop(emotion, None)
+                        stats.emotion_confidence_sums.pop(emotion, None)
+                        stats.emotion_first_seen.pop(emotion, None)
+                stats.save(update_fields=['emotion_counts', 'emotion_confidence_sums', 'emotion_first_seen'])
+
+    def record_session_level_change(self, session, previous_level):
+        if previous_level == session.stress_level:
+            return
+        with transaction.atomic():
+            self._add_sessions(session.user_id, session.session_start, previous_level, -1)
+            self._add_sessions(session.user_id, session.session_start, session.stress_level, 1)
+
+    def record_message_emotion(self, user_id, sent_at, emotion, confidence):
+        from ..models import DailyUserStats
+
+        with transaction.atomic():
+            stats_id = self._get_or_create_id(user_id, sent_at)
+            # The JSON counters are read-modify-write, so lock the row
+            stats = DailyUserStats.objects.select_for_update().only(
+                'id', 'emotion_counts', 'emotion_confidence_sums', 'emotion_first_seen'
+            ).get(id=stats_id)
+
+            stats.emotion_counts[emotion] = stats.emotion_counts.get(emotion, 0) + 1
+            # Confidences have two decimals; rounding keeps the sums exact
+            stats.emotion_confidence_sums[emotion] = round(
+                stats.emotion_confidence_sums.get(emotion, 0) + float(confidence or 0), 2
+            )
+            stats.emotion_first_seen.setdefault(emotion, sent_at.isoformat())
+            stats.save(update_fields=['emotion_counts', 'emotion_confidence_sums', 'emotion_first_seen'])
+
+    def _add_sessions(self, user_id, started_at, stress_level, delta):
+        from ..models import DailyUserStats
+
+        field = STRESS_LEVEL_FIELDS.get(stress_level)
+        if field is None:
+            return
+        if delta < 0:
+            # Never create a row just to decrement it, e.g. while the user is being deleted
+            rows = DailyUserStats.objects.filter(user_id=user_id, date=timezone.localdate(started_at))
+        else:
+            rows = DailyUserStats.objects.filter(id=self._get_or_create_id(user_id, started_at))
+        rows.update(**{field: F(field) + delta})
+
+    def _scored_message_totals(self, messages):
+        """Per day and emotion: scored user messages, confidence sum and first timestamp"""
+        return messages.filter(sender='user', emotion_detected__isnull=False).annotate(
+            day=TruncDate('timestamp'),
+            emotion=Lower('emotion_detected')
+        ).order_by().values('day', 'emotion').annotate(
+            count=Count('id'),
+            confidence=Sum('emotion_confidence'),
+            first_seen=Min('timestamp')
+        )
+
+    def _get_or_create_id(self, user_id, at):
+        from ..models import DailyUserStats
+
+        stats, _ = DailyUserStats.objects.only('id').get_or_create(
+            user_id=user_id,
+            date=timezone.localdate(at)
+        )
+        return stats.id
+
+    # Reads
+
+    def session_level_counts(self, user_ids, start_date, end_date):
+        """user id -> {stress level: sessions started between the dates}"""
+        from ..models import DailyUserStats
+
+        rows = DailyUserStats.objects.filter(
+            user_id__in=user_ids, date__range=[start_date, end_date]
+        ).order_by().values('user_id').annotate(
+            **{level: Sum(field) for level, field in STRESS_LEVEL_FIELDS.items()}
+        )
+        counts = {}
+        for row in rows:
+            level_counts = {level: row[level] for level in STRESS_LEVEL_FIELDS if row[level]}
+            if level_counts:
+                counts[row['user_id']] = level_counts
+        return counts
+
+    def emotion_counts(self, user_ids, start_date, end_date):
+        """user id -> Counter of detected emotions between the dates, in first-seen order"""
+        from ..models import DailyUserStats
+
+        rows = DailyUserStats.objects.filter(
+            user_id__in=user_ids, date__range=[start_date, end_date]
+        ).order_by().values_list('user_id', 'emotion_counts', 'emotion_first_seen')
+
+        totals = {}
+        first_seen = {}
+        for user_id, day_counts, day_first_seen in rows:
+            user_totals = totals.setdefault(user_id, Counter())
+            user_first_seen = first_seen.setdefault(user_id, {})
+            for emotion, count in day_counts.items():
+                user_totals[emotion] += count
+                seen = day_first_seen.get(emotion, '')
+                if emotion not in user_first_seen or seen < user_first_seen[emotion]:
+                    user_first_seen[emotion] = seen
+
+        return {
+            user_id: Counter({
+                emotion: user_totals[emotion]
+                for emotion in sorted(user_totals, key=lambda emotion: first_seen[user_id][emotion])
+            })
+            for user_id, user_totals in totals.items()
+        }
+
+    def stress_trend(self, user, days=7):
+        """Sessions per stress level over the last few days, as [{'stress_level', 'count'}]"""
+        today = timezone.localdate()
+        counts = self.session_level_counts([user.id], today - timedelta(days=days - 1), today).get(user.id, {})
+        return [{'stress_level': level, 'count': count} for level, count in counts.items()]
+
+
+daily_stats_rollup = DailyStatsRollup()
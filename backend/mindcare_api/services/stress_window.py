@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import threading
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+HIGH_STRESS_LEVELS = ('high', 'critical')
+
+
+class PersistentStressDetector:
+    """Sliding-window count of each student's high-stress sessions.
+
+    Every user has a Redis hash of hourly buckets (keyed by the hour the
+    session started) holding how many of their sessions are currently high or
+    critical. Sessions are added or removed as their stress level crosses that
+    line and removed when deleted, so the count for the window is a sum over at most window_hours small
+    fields, and the alert fires as soon as the threshold is reached. Without
+    Redis the count is taken from the database on each change.
+    """
+
+    def __init__(self, redis_client=None, window_hours=None, threshold=None,
+                 bucket_seconds=3600, key_prefix='stress_window'):
+        self.redis_client = redis_client
+        self.window_hours = window_hours or settings.PERSISTENT_STRESS_WINDOW_HOURS
+        self.threshold = threshold or settings.PERSISTENT_STRESS_THRESHOLD
+        self.bucket_seconds = bucket_seconds
+        self.key_prefix = key_prefix
+
+    def make_key(self, user_id):
+        return f"{self.key_prefix}:{user_id}"
+
+    def window_start(self):
+        return timezone.now() - timedelta(hours=self.window_hours)
+
+    def session_changed(self, user, session, previous_level):
+        """Update the window after a session's stress level changed; alert on crossing the threshold"""
+        was_high = previous_level in HIGH_STRESS_LEVELS
+        is_high = session.stress_level in HIGH_STRESS_LEVELS
+        if was_high == is_high or user.role != 'student':
+            return None
+        if session.session_start < self.window_start():
+            return None
+
+        high_stress_count = self._add(user.id, session.session_start, 1 if is_high else -1)
+        if is_high and high_stress_count >= self.threshold:
+            from .alert_service import AlertService
+            return AlertService().check_and_send_persistent_stress_alert(user, high_stress_count)
+        return None
+
+    def session_deleted(self, session):
+        """Take a deleted high-stress session out of the window"""
+        if session.stress_level not in HIGH_STRESS_LEVELS or session.session_start < self.window_start():
+            return
+        if self.redis_client is None:
+            # Counted from the database on each change
+            return
+        try:
+            self._add_to_buckets(session.user_id, session.session_start, -1)
+        except Exception as e:
+            logger.warning(f"Error updating stress window in Redis: {str(e)}")
+
+    def _add(self, user_id, started_at, delta):
+        if self.redis_client is not None:
+            try:
+                return self._add_to_buckets(user_id, started_at, delta)
+            except Exception as e:
+                logger.warning(f"Error updating stress window in Redis, counting in the database: {str(e)}")
+        return self._count_in_database(user_id)
+
+    def _add_to_buckets(self, user_id, started_at, delta):
+        key = self.make_key(user_id)
+        bucket = int(started_at.timestamp()) // self.bucket_seconds
+
+        pipeline = self.redis_client.pipeline()
+        pipeline.hincrby(key, bucket, delta)
+        pipeline.expire(key, self.window_hours * 3600 + self.bucket_seconds)
+        pipeline.hgetall(key)
+        buckets = pipeline.execute()[2]
+
+        oldest = int(self.window_start().timestamp()) // self.bucket_seconds
+        high_stress_count = 0
+        stale = []
+        for field, count in buckets.items():
+            count = int(count)
+            if int(field) < oldest or count <= 0:
+                stale.append(field)
+            else:
+                high_stress_count += count
+        if stale:
+            self.redis_client.hdel(key, *stale)
+        return high_stress_count
+
+    def _count_in_database(self, user_id):
+        from ..models import ChatSession
+
+        return ChatSession.objects.filter(
+            user_id=user_id,
+            stress_level__in=HIGH_STRESS_LEVELS,
+            session_start__gte=self.window_start()
+        ).count()
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_persistent_stress_detector():
+    """Return the process-wide persistent stress detector"""
+    global _detector
+
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = PersistentStressDetector(redis_client=get_redis_client())
+    return _detector
@@ -0,0 +1,202 @@
+from django.conf import settings
+from collections import OrderedDict
+import copy
+import hashlib
+import logging
+import threading
+import time
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class TokenUserCache:
+    """Caches which user an API token belongs to.
+
+    The in-process tier is a bounded LRU of token digest -> user with a short
+    TTL, so most requests authenticate without a query. The optional shared
+    tier is Redis: it maps token digests to user ids, so a local miss costs a
+    primary key lookup instead of the token join, and it carries
+    invalidations. Deleting a token or changing a user writes a timestamped
+    marker, and any entry loaded before the marker (less an allowance for
+    clock skew between hosts) is treated as a miss, in every process.
+    Without Redis, invalidations reach other processes only when their
+    entries expire. Raw tokens are never stored, only their SHA-256.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=60, shared_ttl_seconds=3600,
+                 redis_client=None, key_prefix='auth', clock_skew_seconds=1.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared_ttl_seconds = shared_ttl_seconds
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.clock_skew_seconds = clock_skew_seconds
+        # Markers must outlive every entry they can invalidate
+        self.marker_ttl_seconds = int(max(ttl_seconds, shared_ttl_seconds) + clock_skew_seconds) + 1
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.shared_errors = 0
+
+    def digest(self, token_key):
+        return hashlib.sha256(token_key.encode('utf-8')).hexdigest()
+
+    def make_token_key(self, digest):
+        return f"{self.key_prefix}:token:{digest}"
+
+    def make_revoked_key(self, digest):
+        return f"{self.key_prefix}:revoked:{digest}"
+
+    def make_user_key(self, user_id):
+        return f"{self.key_prefix}:user_changed:{user_id}"
+
+    def get(self, token_key):
+        """Return the cached user of token_key, or None on a miss"""
+        digest = self.digest(token_key)
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[2] <= time.monotonic():
+                del self._entries[digest]
+                entry = None
+
+        if entry is not None:
+            user, loaded_at, _ = entry
+            if self.redis_client is None or not self._invalidated_since(
+                loaded_at, self.make_revoked_key(digest), self.make_user_key(user.id)
+            ):
+                with self._lock:
+                    self.local_hits += 1
+                    if digest in self._entries:
+                        self._entries.move_to_end(digest)
+                # Each request gets its own instance to modify
+                return copy.copy(user)
+
+            with self._lock:
+                self._entries.pop(digest, None)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get_user_id(self, token_key):
+        """Return the user id the shared tier has for token_key, or None"""
+        if self.redis_client is None:
+            return None
+
+        digest = self.digest(token_key)
+        try:
+            mapping, revoked_at = self.redis_client.mget(
+                self.make_token_key(digest), self.make_revoked_key(digest)
+            )
+        except Exception as e:
+            self._shared_error('reading', e)
+            return None
+        if mapping is None:
+            return None
+
+        user_id, loaded_at = mapping.decode().split(':')
+        if self._is_stale(float(loaded_at), [revoked_at]):
+            return None
+        with self._lock:
+            self.shared_hits += 1
+        return int(user_id)
+
+    def set(self, token_key, user, loaded_at, shared=True):
+        """Cache the user of token_key; loaded_at is time.time() from before the lookup"""
+        digest = self.digest(token_key)
+        if shared and self.redis_client is not None:
+            try:
+                self.redis_client.set(
+                    self.make_token_key(digest), f"{user.id}:{loaded_at}", ex=self.shared_ttl_seconds
+                )
+            except Exception as e:
+                self._shared_error('writing', e)
+
+        with self._lock:
+            self._entries[digest] = (copy.copy(user), loaded_at, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_token(self, token_key):
+        """Forget a deleted token everywhere"""
+        digest = self.digest(token_key)
+        with self._lock:
+            self.invalidations += 1
+            self._entries.pop(digest, None)
+        self._mark(self.make_revoked_key(digest), self.make_token_key(digest))
+
+    def invalidate_user(self, user_id):
+        """Drop every cached copy of the user, e.g. after it was deactivated"""
+        with self._lock:
+            self.invalidations += 1
+            for digest in [digest for digest, entry in self._entries.items() if entry[0].id == user_id]:
+                del self._entries[digest]
+        self._mark(self.make_user_key(user_id))
+
+    def _mark(self, marker_key, delete_key=None):
+        if self.redis_client is None:
+            return
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.set(marker_key, time.time(), ex=self.marker_ttl_seconds)
+            if delete_key:
+                pipeline.delete(delete_key)
+            pipeline.execute()
+        except Exception as e:
+            self._shared_error('invalidating', e)
+
+    def _invalidated_since(self, loaded_at, *marker_keys):
+        try:
+            markers = self.redis_client.mget(*marker_keys)
+        except Exception as e:
+            # Cannot tell whether the entry was invalidated; treat it as stale
+            self._shared_error('reading', e)
+            return True
+        return self._is_stale(loaded_at, markers)
+
+    def _is_stale(self, loaded_at, markers):
+        return any(
+            marker is not None and float(marker) >= loaded_at - self.clock_skew_seconds
+            for marker in markers
+        )
+
+    def _shared_error(self, action, error):
+        with self._lock:
+            self.shared_errors += 1
+        logger.warning(f"Error {action} shared token cache: {str(error)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'shared_errors': self.shared_errors,
+            }
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_user_cache():
+    """Return the process-wide token user cache"""
+    global _token_cache
+
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenUserCache(
+                    max_entries=settings.AUTH_TOKEN_CACHE_SIZE,
+                    ttl_seconds=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+                    redis_client=get_redis_client()
+                )
+    return _token_cache
@@ -0,0 +1,16 @@
+from django.db import transaction
+
+from .services.risk_index import get_student_risk_index
+from .services.rollup_service import daily_stats_rollup
+from .services.stress_window import HIGH_STRESS_LEVELS, get_persistent_stress_detector
+
+
+def on_session_stress_changed(user, session, previous_level):
+    """Run after a chat session's stress level has been saved"""
+    if session.stress_level == previous_level:
+        return
+    daily_stats_rollup.record_session_level_change(session, previous_level)
+    if previous_level in HIGH_STRESS_LEVELS or session.stress_level in HIGH_STRESS_LEVELS:
+        risk_index = get_student_risk_index()
+        transaction.on_commit(lambda: risk_index.user_changed(user.id))
+    get_persistent_stress_detector().session_changed(user, session, previous_level)
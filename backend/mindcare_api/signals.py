@@ -0,0 +1,116 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import Alert, Booking, ChatMessage, ChatSession, GroupMembership, PeerPost, Resource, User
+from .services.dashboard_cache import get_dashboard_cache
+from .services.feed_cache import get_peer_feed_cache
+from .services.resource_search import SEARCH_FIELDS, update_search_vectors
+from .services.risk_index import RISK_ALERT_TYPES, get_student_risk_index
+from .services.rollup_service import daily_stats_rollup
+from .services.stress_window import HIGH_STRESS_LEVELS, get_persistent_stress_detector
+from .services.token_cache import get_token_user_cache
+
+
+@receiver(post_save, sender=PeerPost)
+def update_peer_feed_on_save(sender, instance, created, **kwargs):
+    feed_cache = get_peer_feed_cache()
+    if feed_cache is None:
+        return
+
+    # Only touch the cache once the row is visible to other connections
+    if created:
+        if not instance.is_flagged:
+            transaction.on_commit(lambda: feed_cache.push(instance))
+    elif instance.is_flagged:
+        transaction.on_commit(lambda: feed_cache.remove(instance))
+    else:
+        # An edited or unflagged post would be out of place; rebuild the list
+        transaction.on_commit(lambda: feed_cache.invalidate(instance.group_id))
+
+
+@receiver(post_delete, sender=PeerPost)
+def update_peer_feed_on_delete(sender, instance, **kwargs):
+    feed_cache = get_peer_feed_cache()
+    if feed_cache is not None:
+        transaction.on_commit(lambda: feed_cache.remove(instance))
+
+
+@receiver(post_save, sender=ChatSession)
+def update_daily_stats_on_session_create(sender, instance, created, **kwargs):
+    # Later stress level changes go through session_events.on_session_stress_changed
+    if created:
+        daily_stats_rollup.record_session_created(instance)
+        if instance.stress_level in HIGH_STRESS_LEVELS:
+            # Created already at risk, e.g. with stress_level set through the API
+            risk_index = get_student_risk_index()
+            transaction.on_commit(lambda: risk_index.user_changed(instance.user_id))
+
+
+@receiver(pre_delete, sender=ChatSession)
+def update_daily_stats_on_session_delete(sender, instance, **kwargs):
+    # Before the cascade removes the messages whose emotions are subtracted
+    daily_stats_rollup.record_session_deleted(instance)
+
+
+@receiver(post_delete, sender=ChatSession)
+def update_risk_on_session_delete(sender, instance, **kwargs):
+    if instance.stress_level in HIGH_STRESS_LEVELS:
+        risk_index = get_student_risk_index()
+        transaction.on_commit(lambda: risk_index.user_changed(instance.user_id))
+        detector = get_persistent_stress_detector()
+        transaction.on_commit(lambda: detector.session_deleted(instance))
+
+
+@receiver(post_save, sender=Alert)
+def update_risk_index_on_alert(sender, instance, created, **kwargs):
+    if created and instance.alert_type in RISK_ALERT_TYPES:
+        risk_index = get_student_risk_index()
+        transaction.on_commit(lambda: risk_index.user_changed(instance.user_id))
+
+
+def _invalidate_dashboard(user_id):
+    dashboard_cache = get_dashboard_cache()
+    if dashboard_cache is not None and user_id is not None:
+        # Bump after commit so a rebuild cannot cache the pre-write data under the new version
+        transaction.on_commit(lambda: dashboard_cache.bump(user_id))
+
+
+@receiver([post_save, post_delete], sender=ChatSession)
+@receiver([post_save, post_delete], sender=GroupMembership)
+def invalidate_dashboard_on_user_change(sender, instance, **kwargs):
+    _invalidate_dashboard(instance.user_id)
+
+
+@receiver(post_save, sender=ChatMessage)
+def invalidate_dashboard_on_message(sender, instance, **kwargs):
+    # Deleting messages only happens with their session, which bumps already
+    _invalidate_dashboard(instance.session.user_id)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def invalidate_dashboard_on_booking_change(sender, instance, **kwargs):
+    _invalidate_dashboard(instance.student_id)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    # Covers logout, which deletes the user's token. The key is the primary
+    # key, which delete() clears before the commit callback runs
+    token_cache, key = get_token_user_cache(), instance.key
+    transaction.on_commit(lambda: token_cache.invalidate_token(key))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Deactivated users must stop authenticating at once, and role changes should show
+    token_cache, user_id = get_token_user_cache(), instance.id
+    transaction.on_commit(lambda: token_cache.invalidate_user(user_id))
+
+
+@receiver(post_save, sender=Resource)
+def update_resource_search_vector(sender, instance, update_fields=None, **kwargs):
+    # Bulk loads skip signals; run rebuild_resource_search after them
+    if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+        update_search_vectors(Resource.objects.filter(pk=instance.pk))
@@ -1,148 +1,131 @@
-from celery import shared_task
+from celery import chord, shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
 from django.utils import timezone
 from datetime import timedelta, datetime
 import logging
-from .models import User, ChatSession, WeeklyReport, Alert
-from .services.emotion_service import EmotionDetectionService
+from .models import User, ChatSession, WeeklyReport, WeeklyReportRun, WeeklyReportShard
 from .services.alert_service import AlertService
+from .services.notification_dispatcher import NotificationDispatcher
+from .services.report_service import WeeklyReportEngine, current_week_range
+from .services.risk_index import get_student_risk_index
+from .services.stress_window import HIGH_STRESS_LEVELS, get_persistent_stress_detector
 
 logger = logging.getLogger(__name__)
 
 @shared_task
 def generate_weekly_reports():
-    """Generate weekly reports for all active users"""
+    """Start (or resume) this week's report run, fanned out as one task per shard of students.
+    
+    Shards that already completed are not dispatched again, and reports that
+    already exist are skipped thanks to the (user, week_start) uniqueness, so
+    running this again after a crash only redoes the unfinished work.
+    """
     try:
-        # Get all active students
-        students = User.objects.filter(role='student', is_active=True)
-        
-        # Calculate week range (Sunday to Saturday)
-        today = timezone.now().date()
-        days_since_sunday = today.weekday() + 1 if today.weekday() != 6 else 0
-        week_start = today - timedelta(days=days_since_sunday)
-        week_end = week_start + timedelta(days=6)
-        
-        emotion_service = EmotionDetectionService()
-        alert_service = AlertService()
+        week_start, week_end = current_week_range()
+        engine = WeeklyReportEngine(week_start, week_end)
+        
+        with transaction.atomic():
+            run, created = WeeklyReportRun.objects.select_for_update().get_or_create(
+                week_start=week_start,
+                defaults={'week_end': week_end}
+            )
+            if run.status == 'completed':
+                logger.info(f"Weekly report run for {week_start} already completed")
+                return f"Weekly report run for {week_start} already completed"
+            
+            if not run.shards.exists():
+                WeeklyReportShard.objects.bulk_create([
+                    WeeklyReportShard(run=run, min_user_id=min_id, max_user_id=max_id)
+                    for min_id, max_id in engine.shard_ranges(settings.WEEKLY_REPORT_SHARD_SIZE)
+                ])
+            run.status = 'running'
+            run.total_shards = run.shards.count()
+            run.save(update_fields=['status', 'total_shards'])
+            
+            shard_ids = list(run.shards.exclude(status='completed').values_list('id', flat=True))
         
-        reports_generated = 0
+        if not shard_ids:
+            return finalize_weekly_report_run([], run.id)
         
-        for student in students:
-            try:
-                # Check if report already exists for this week
-                existing_report = WeeklyReport.objects.filter(
-                    user=student,
-                    week_start=week_start
-                ).first()
-                
-                if existing_report:
-                    continue
-                
-                # Get sessions for the week
-                sessions = ChatSession.objects.filter(
-                    user=student,
-                    session_start__date__range=[week_start, week_end]
-                )
-                
-                if not sessions.exists():
-                    continue
-                
-                # Calculate metrics
-                total_sessions = sessions.count()
-                stress_levels = [s.stress_level for s in sessions]
-                stress_scores = {
-                    'low': 0.2, 'moderate': 0.4, 'high': 0.7, 'critical': 1.0
-                }
-                avg_stress = sum(stress_scores.get(level, 0.2) for level in stress_levels) / len(stress_levels)
-                
-                # Analyze emotions
-                emotion_analysis = emotion_service.analyze_weekly_emotions(student, week_start, week_end)
-                
-                # Determine risk assessment
-                risk_assessment = 'low'
-                if avg_stress >= 0.8:
-                    risk_assessment = 'critical'
-                elif avg_stress >= 0.6:
-                    risk_assessment = 'high'
-                elif avg_stress >= 0.4:
-                    risk_assessment = 'moderate'
-                
-                # Generate summary
-                summary = generate_weekly_summary(student, sessions, emotion_analysis, avg_stress)
-                
-                # Create report
-                report = WeeklyReport.objects.create(
-                    user=student,
-                    week_start=week_start,
-                    week_end=week_end,
-                    total_sessions=total_sessions,
-                    avg_stress_level=round(avg_stress, 2),
-                    dominant_emotions=emotion_analysis,
-                    summary=summary,
-                    risk_assessment=risk_assessment
-                )
-                
-                # Send report to guardian if configured
-                if student.guardian_email:
-                    alert_service.send_weekly_report(student, report)
-                
-                reports_generated += 1
-                logger.info(f"Generated weekly report for user {student.id}")
-                
-            except Exception as e:
-                logger.error(f"Error generating report for user {student.id}: {str(e)}")
-                continue
+        # A shard that gives up retrying fails the chord, which then calls the
+        # error callback instead of finalize; either way the run is closed
+        chord(
+            generate_weekly_report_shard.s(shard_id) for shard_id in shard_ids
+        )(finalize_weekly_report_run.s(run.id).on_error(fail_weekly_report_run.s(run.id)))
         
-        logger.info(f"Weekly report generation completed. Generated {reports_generated} reports.")
-        return f"Generated {reports_generated} weekly reports"
+        logger.info(f"Dispatched {len(shard_ids)} weekly report shards for {week_start}")
+        return f"Dispatched {len(shard_ids)} weekly report shards"
         
     except Exception as e:
         logger.error(f"Error in weekly report generation task: {str(e)}")
         raise
 
-def generate_weekly_summary(user, sessions, emotion_analysis, avg_stress):
-    """Generate human-readable weekly summary"""
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600,
+             retry_jitter=True, max_retries=5)
+def generate_weekly_report_shard(self, shard_id):
+    """Generate the reports of one shard of students"""
+    shard = WeeklyReportShard.objects.select_related('run').get(id=shard_id)
+    if shard.status == 'completed':
+        return shard.reports_generated
+    
+    WeeklyReportShard.objects.filter(id=shard_id).update(status='running', attempts=F('attempts') + 1)
+    engine = WeeklyReportEngine(shard.run.week_start, shard.run.week_end, alert_service=AlertService())
+    
     try:
-        total_sessions = sessions.count()
-        
-        # Stress level summary
-        if avg_stress >= 0.8:
-            stress_summary = "showed high levels of emotional distress"
-        elif avg_stress >= 0.6:
-            stress_summary = "experienced elevated stress levels"
-        elif avg_stress >= 0.4:
-            stress_summary = "had moderate stress indicators"
-        else:
-            stress_summary = "maintained relatively stable emotional well-being"
-        
-        # Emotion summary
-        emotion_summary = ""
-        if emotion_analysis and 'dominant_emotion' in emotion_analysis:
-            dominant = emotion_analysis['dominant_emotion']
-            emotion_summary = f" The most frequently detected emotion was {dominant}."
-        
-        # Activity summary
-        if total_sessions >= 7:
-            activity_summary = "engaged frequently with the mental health support system"
-        elif total_sessions >= 3:
-            activity_summary = "regularly used the mental health support resources"
-        else:
-            activity_summary = "had limited engagement with support resources"
-        
-        summary = f"This week, {user.first_name} {activity_summary} with {total_sessions} chat sessions and {stress_summary}.{emotion_summary}"
-        
-        # Add recommendations
-        if avg_stress >= 0.7:
-            summary += " Recommendation: Consider scheduling a counseling session for additional support."
-        elif avg_stress >= 0.5:
-            summary += " Recommendation: Continue monitoring and encourage use of coping strategies."
-        else:
-            summary += " Overall positive engagement with mental health resources."
-        
-        return summary
-        
+        reports_generated = engine.run(min_id=shard.min_user_id, max_id=shard.max_user_id)
     except Exception as e:
-        logger.error(f"Error generating weekly summary: {str(e)}")
-        return f"Weekly summary for {total_sessions} sessions with average stress level of {avg_stress:.2f}."
+        logger.error(f"Error generating weekly report shard {shard_id}: {str(e)}")
+        WeeklyReportShard.objects.filter(id=shard_id).update(status='failed', last_error=str(e))
+        raise
+    
+    with transaction.atomic():
+        updated = WeeklyReportShard.objects.filter(id=shard_id).exclude(status='completed').update(
+            status='completed',
+            reports_generated=reports_generated,
+            last_error=None,
+            finished_at=timezone.now()
+        )
+        if updated:
+            WeeklyReportRun.objects.filter(id=shard.run_id).update(
+                completed_shards=F('completed_shards') + 1,
+                reports_generated=F('reports_generated') + reports_generated
+            )
+    
+    logger.info(f"Weekly report shard {shard_id} generated {reports_generated} reports")
+    return reports_generated
+
+@shared_task
+def finalize_weekly_report_run(shard_results, run_id):
+    """Close a weekly report run once every shard task has finished"""
+    run = _close_weekly_report_run(run_id)
+    return f"Generated {run.reports_generated} weekly reports"
+
+@shared_task
+def fail_weekly_report_run(request, exc, traceback, run_id):
+    """Chord error callback: close a run whose shard ran out of retries as failed.
+    
+    The next generate_weekly_reports resumes it with the unfinished shards.
+    """
+    logger.error(f"Weekly report run {run_id} failed: {str(exc)}")
+    _close_weekly_report_run(run_id)
+
+def _close_weekly_report_run(run_id):
+    run = WeeklyReportRun.objects.get(id=run_id)
+    pending = run.shards.exclude(status='completed').count()
+    
+    # Shard counters miss reports written by attempts that later failed
+    run.reports_generated = WeeklyReport.objects.filter(week_start=run.week_start).count()
+    run.status = 'completed' if pending == 0 else 'failed'
+    run.finished_at = timezone.now()
+    run.save(update_fields=['reports_generated', 'status', 'finished_at'])
+    
+    logger.info(
+        f"Weekly report generation completed. Generated {run.reports_generated} reports "
+        f"in {run.total_shards} shards ({pending} unfinished)."
+    )
+    return run
 
 @shared_task
 def cleanup_old_sessions():
@@ -168,46 +151,32 @@ def cleanup_old_sessions():
 
 @shared_task
 def monitor_critical_stress_levels():
-    """Monitor for users with consistently high stress levels"""
+    """Reconcile persistent-stress alerts.
+    
+    Alerts normally fire from the stress window as sessions change; this pass
+    catches anything it missed (e.g. while Redis was down) with one grouped
+    query, relying on the alert cooldown to skip students already alerted.
+    """
     try:
-        # Look for users with multiple critical/high stress sessions in the last 3 days
-        three_days_ago = timezone.now() - timedelta(days=3)
-        
-        high_stress_users = User.objects.filter(
-            role='student',
-            is_active=True,
-            chat_sessions__stress_level__in=['high', 'critical'],
-            chat_sessions__session_start__gte=three_days_ago
-        ).distinct()
+        detector = get_persistent_stress_detector()
+        high_stress_counts = dict(
+            ChatSession.objects.filter(
+                user__role='student',
+                user__is_active=True,
+                stress_level__in=HIGH_STRESS_LEVELS,
+                session_start__gte=detector.window_start()
+            ).order_by().values('user_id').annotate(
+                high_stress_count=Count('id')
+            ).filter(
+                high_stress_count__gte=detector.threshold
+            ).values_list('user_id', 'high_stress_count')
+        )
         
         alert_service = AlertService()
         alerts_sent = 0
-        
-        for user in high_stress_users:
-            # Count high stress sessions in the last 3 days
-            high_stress_count = user.chat_sessions.filter(
-                stress_level__in=['high', 'critical'],
-                session_start__gte=three_days_ago
-            ).count()
-            
-            if high_stress_count >= 3:  # 3 or more high stress sessions
-                # Check if we've already sent an alert recently
-                recent_alert = Alert.objects.filter(
-                    user=user,
-                    alert_type='critical_stress',
-                    created_at__gte=timezone.now() - timedelta(hours=48)
-                ).exists()
-                
-                if not recent_alert:
-                    alert = Alert.objects.create(
-                        user=user,
-                        alert_type='critical_stress',
-                        message=f"Persistent high stress detected: {high_stress_count} high-stress sessions in the last 3 days."
-                    )
-                    
-                    alert_service._send_alert_notifications(alert)
-                    alerts_sent += 1
-                    logger.info(f"Sent persistent stress alert for user {user.id}")
+        for user in User.objects.filter(id__in=high_stress_counts):
+            if alert_service.check_and_send_persistent_stress_alert(user, high_stress_counts[user.id]):
+                alerts_sent += 1
         
         logger.info(f"Stress monitoring completed. Sent {alerts_sent} alerts.")
         return f"Monitored stress levels, sent {alerts_sent} alerts"
@@ -215,3 +184,39 @@ def monitor_critical_stress_levels():
     except Exception as e:
         logger.error(f"Error in stress monitoring task: {str(e)}")
         raise
+
+@shared_task
+def dispatch_notifications(max_batches=None):
+    """Deliver due guardian notifications from the outbox.
+    
+    Started after alerts are created, and every minute (CELERY_BEAT_SCHEDULE)
+    so that retries and notifications whose dispatcher died are picked up.
+    """
+    try:
+        counts = NotificationDispatcher().dispatch_pending(max_batches=max_batches)
+        logger.info(
+            f"Notification dispatch completed. Sent {counts['sent']}, "
+            f"retrying {counts['retried']}, failed {counts['failed']}."
+        )
+        return counts
+        
+    except Exception as e:
+        logger.error(f"Error in notification dispatch task: {str(e)}")
+        raise
+
+@shared_task
+def rebuild_risk_index():
+    """Rebuild the counselor risk leaderboard from the database.
+    
+    Scheduled hourly (CELERY_BEAT_SCHEDULE): scores only change when a
+    student's sessions or alerts do, so this is what lowers them as those
+    leave the window and drops students with no critical session left.
+    """
+    try:
+        students = get_student_risk_index().rebuild()
+        logger.info(f"Risk index rebuilt with {students} students")
+        return f"Rebuilt risk index with {students} students"
+        
+    except Exception as e:
+        logger.error(f"Error rebuilding risk index: {str(e)}")
+        raise
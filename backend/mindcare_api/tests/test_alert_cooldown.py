@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from unittest import mock
+import threading
+import unittest
+
+from ..models import Alert, ChatSession, User
+from ..services.alert_cooldown import AlertCooldown
+from ..services.alert_service import AlertService
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+COOLDOWN_SECONDS = 24 * 3600
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class AlertCooldownTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.cooldown = AlertCooldown(redis_client=self.redis, cooldown_seconds=COOLDOWN_SECONDS)
+        self.user = User.objects.create_user(username='student', password='pw')
+
+    def test_one_claim_per_window(self):
+        self.assertTrue(self.cooldown.acquire(self.user, 'critical_stress'))
+        self.assertFalse(self.cooldown.acquire(self.user, 'critical_stress'))
+        self.assertTrue(self.cooldown.acquire(self.user, 'emergency'))
+
+        self.cooldown.release(self.user, 'critical_stress')
+        self.assertTrue(self.cooldown.acquire(self.user, 'critical_stress'))
+
+    def test_existing_alert_ends_the_window_with_its_own(self):
+        alert = Alert.objects.create(user=self.user, alert_type='critical_stress', message='High stress')
+        Alert.objects.filter(id=alert.id).update(created_at=timezone.now() - timedelta(hours=20))
+
+        self.assertFalse(self.cooldown.acquire(self.user, 'critical_stress'))
+
+        ttl = self.redis.ttl(self.cooldown.make_key(self.user.id, 'critical_stress'))
+        self.assertGreater(ttl, 3.9 * 3600)
+        self.assertLessEqual(ttl, 4 * 3600)
+
+    def test_expired_alert_does_not_block(self):
+        alert = Alert.objects.create(user=self.user, alert_type='critical_stress', message='High stress')
+        Alert.objects.filter(id=alert.id).update(created_at=timezone.now() - timedelta(hours=25))
+
+        self.assertTrue(self.cooldown.acquire(self.user, 'critical_stress'))
+
+    def test_database_fallback(self):
+        cooldown = AlertCooldown(cooldown_seconds=COOLDOWN_SECONDS)
+        self.assertTrue(cooldown.acquire(self.user, 'critical_stress'))
+        Alert.objects.create(user=self.user, alert_type='critical_stress', message='High stress')
+        self.assertFalse(cooldown.acquire(self.user, 'critical_stress'))
+        self.assertEqual(cooldown.stats()['database_fallbacks'], 2)
+
+
+class ConcurrentAlertTests(TransactionTestCase):
+    workers = 8
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw')
+        self.session = ChatSession.objects.create(user=self.user, stress_level='critical')
+        patcher = mock.patch.object(AlertService, '_start_dispatch')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _send_concurrently(self, cooldown):
+        barrier = threading.Barrier(self.workers)
+
+        def send(_):
+            try:
+                barrier.wait()
+                return AlertService().check_and_send_alert(self.user, self.session)
+            finally:
+                connection.close()
+
+        with mock.patch('mindcare_api.services.alert_service.get_alert_cooldown', return_value=cooldown):
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                return [alert for alert in pool.map(send, range(self.workers)) if alert is not None]
+
+    @unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+    def test_exactly_one_alert_per_window_with_redis(self):
+        cooldown = AlertCooldown(redis_client=fakeredis.FakeRedis(), cooldown_seconds=COOLDOWN_SECONDS)
+
+        alerts = self._send_concurrently(cooldown)
+
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(Alert.objects.filter(user=self.user, alert_type='critical_stress').count(), 1)
+        self.assertEqual(cooldown.stats()['sent'], 1)
+        self.assertEqual(cooldown.stats()['suppressed'], self.workers - 1)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Row locks need PostgreSQL')
+    def test_exactly_one_alert_per_window_in_database(self):
+        alerts = self._send_concurrently(AlertCooldown(cooldown_seconds=COOLDOWN_SECONDS))
+
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(Alert.objects.filter(user=self.user, alert_type='critical_stress').count(), 1)
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ..models import ChatMessage, ChatSession, User
+
+
+class ChatSessionListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw', role='student')
+        self.client.force_authenticate(self.user)
+
+    def _add_sessions(self, count, messages_per_session=5):
+        for _ in range(count):
+            session = ChatSession.objects.create(user=self.user)
+            ChatMessage.objects.bulk_create([
+                ChatMessage(session=session, sender='user' if i % 2 == 0 else 'bot', message=f"message {i}")
+                for i in range(messages_per_session)
+            ])
+
+    def _list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('chat-sessions'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def test_list_runs_constant_queries(self):
+        self._add_sessions(2)
+        few_queries, _ = self._list_queries()
+
+        self._add_sessions(15, messages_per_session=20)
+        many_queries, data = self._list_queries()
+
+        self.assertEqual(many_queries, few_queries)
+        self.assertEqual(len(data['results']), 17)
+
+    def test_list_summarizes_instead_of_nesting_messages(self):
+        self._add_sessions(1, messages_per_session=3)
+
+        _, data = self._list_queries()
+        summary = data['results'][0]
+
+        self.assertNotIn('messages', summary)
+        self.assertEqual(summary['message_count'], 3)
+        self.assertEqual(summary['last_message_preview'], 'message 2')
+        self.assertIsNotNone(summary['last_message_at'])
+
+    def test_messages_are_paged_oldest_first(self):
+        self._add_sessions(1, messages_per_session=5)
+        session = ChatSession.objects.get(user=self.user)
+        url = reverse('chat-session-messages', args=[session.id])
+
+        response = self.client.get(url, {'page_size': 3})
+        self.assertEqual([row['message'] for row in response.data['results']],
+                         ['message 0', 'message 1', 'message 2'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['message'] for row in response.data['results']], ['message 3', 'message 4'])
+        self.assertIsNone(response.data['next'])
+
+    def test_messages_of_another_users_session_are_not_found(self):
+        other = User.objects.create_user(username='other', password='pw', role='student')
+        session = ChatSession.objects.create(user=other)
+
+        response = self.client.get(reverse('chat-session-messages', args=[session.id]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APITestCase
+import unittest
+
+from ..models import Resource, SupportGroup, User
+
+
+class ConditionalListTestMixin:
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='student', password='pw'))
+
+    def assertRevalidates(self, url, change):
+        """200, then 304 for the same ETag, then 200 again once change() has run"""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def _touch(self, obj):
+        # A later updated_at than the list was served with, as a real edit would give
+        type(obj).objects.filter(id=obj.id).update(updated_at=timezone.now() + timedelta(seconds=1))
+
+
+class SupportGroupListConditionalTests(ConditionalListTestMixin, APITestCase):
+    def _groups(self):
+        return [SupportGroup.objects.create(name=name, category='exams') for name in ('Exam stress', 'Study buddies')]
+
+    def test_support_group_list_after_an_update(self):
+        groups = self._groups()
+        self.assertRevalidates(reverse('support-groups'), lambda: self._touch(groups[1]))
+
+    def test_support_group_list_after_a_delete(self):
+        groups = self._groups()
+        self.assertRevalidates(reverse('support-groups'), groups[0].delete)
+
+    def test_if_modified_since_alone_never_hides_a_delete(self):
+        self._groups()[0].delete()
+        response = self.client.get(reverse('support-groups'), HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Saving a resource updates its search vector')
+class ResourceListConditionalTests(ConditionalListTestMixin, APITestCase):
+    def _resources(self):
+        return [
+            Resource.objects.create(title=title, resource_type='article', category='sleep')
+            for title in ('Sleep hygiene', 'Wind-down routine')
+        ]
+
+    def test_resource_list_after_an_update(self):
+        resources = self._resources()
+        self.assertRevalidates(reverse('resources'), lambda: self._touch(resources[0]))
+
+    def test_resource_list_after_a_delete(self):
+        resources = self._resources()
+        response = self.assertRevalidates(reverse('resources'), resources[1].delete)
+        self.assertEqual([row['title'] for row in response.data['results']], ['Sleep hygiene'])
@@ -0,0 +1,89 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from unittest import mock
+
+from ..models import ChatSession, User
+from ..services.ai_service import AIService
+from ..services.context_engine import CHARS_PER_TOKEN, ConversationContextEngine
+from ..services.emotion_service import EmotionDetectionService
+
+
+class ConversationContextEngineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw')
+        self.session = ChatSession.objects.create(user=self.user)
+        self.engine = ConversationContextEngine(tail_size=4, summary_max_chars=60, token_budget=600)
+
+    def _talk(self, engine, turns):
+        for i in range(turns):
+            engine.record_turn(self.session, 'user', f'worry {i}', emotion='fear')
+            engine.record_turn(self.session, 'bot', f'reply {i}')
+
+    def test_evicted_student_turns_are_folded_into_the_summary(self):
+        self._talk(self.engine, 3)
+
+        session = ChatSession.objects.get(pk=self.session.pk)
+        self.assertEqual([turn['text'] for turn in session.recent_turns], ['worry 1', 'reply 1', 'worry 2', 'reply 2'])
+        # Assistant turns are not kept once they leave the tail
+        self.assertEqual(session.session_summary, '- worry 0 (fear)')
+        self.assertEqual(self.session.recent_turns, session.recent_turns)
+
+    def test_summary_stays_bounded(self):
+        self._talk(self.engine, 20)
+
+        summary = ChatSession.objects.get(pk=self.session.pk).session_summary
+        self.assertLessEqual(len(summary), 60)
+        self.assertTrue(summary.endswith('- worry 17 (fear)'))
+        self.assertNotIn('worry 0 ', summary)
+
+    def test_context_is_built_from_the_session_row_alone(self):
+        self._talk(self.engine, 10)
+        session = ChatSession.objects.get(pk=self.session.pk)
+
+        with self.assertNumQueries(0):
+            context = self.engine.build_context(session)
+            with mock.patch('mindcare_api.services.ai_service.get_llm_client'):
+                AIService()._build_messages('and now?', session)
+
+        self.assertEqual(context.splitlines(), [
+            'Earlier in this conversation the student said:',
+            *session.session_summary.splitlines(),
+            'Student: worry 8', 'Assistant: reply 8', 'Student: worry 9', 'Assistant: reply 9',
+        ])
+
+    def test_context_is_trimmed_to_the_token_budget(self):
+        engine = ConversationContextEngine(tail_size=6, summary_max_chars=1200, token_budget=25)
+        for i in range(10):
+            engine.record_turn(self.session, 'user', f'{i} ' + 'x' * 30)
+
+        context = engine.build_context(self.session)
+
+        self.assertLessEqual(len(context), 25 * CHARS_PER_TOKEN)
+        # The newest turns claim the budget before older ones and the summary
+        self.assertEqual(context.splitlines(), [f'Student: {i} ' + 'x' * 30 for i in (8, 9)])
+
+
+class SendMessageContextTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw')
+        self.client.force_authenticate(self.user)
+        self.session = ChatSession.objects.create(user=self.user)
+        patcher = mock.patch.object(EmotionDetectionService, 'detect_emotion',
+                                    return_value={'emotion': 'sadness', 'confidence': 0.6})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_prompt_carries_turns_that_left_the_tail(self):
+        llm_client = mock.Mock()
+        llm_client.chat_completion.return_value = "I'm here with you."
+
+        with mock.patch('mindcare_api.services.ai_service.get_llm_client', return_value=llm_client), \
+                self.settings(CHAT_CONTEXT_TAIL_TURNS=2):
+            for message in ['My exams start Monday', 'I cannot sleep', 'What should I do?']:
+                response = self.client.post(reverse('send-message', args=[self.session.id]), {'message': message})
+                self.assertEqual(response.status_code, 200)
+
+        prompt = llm_client.chat_completion.call_args.kwargs['messages'][1]['content']
+        self.assertIn('- My exams start Monday (sadness)\n- I cannot sleep (sadness)', prompt)
+        self.assertIn("Assistant: I'm here with you.\nStudent: What should I do?", prompt)
@@ -0,0 +1,85 @@
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from unittest import mock
+import unittest
+
+from ..models import Booking, ChatMessage, ChatSession, User
+from ..services.dashboard_cache import DashboardCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class UserDashboardCacheTests(APITestCase):
+    def setUp(self):
+        self.cache = DashboardCache(fakeredis.FakeRedis())
+        for target in ('views', 'signals'):
+            patcher = mock.patch(f"mindcare_api.{target}.get_dashboard_cache", return_value=self.cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='student', password='pw')
+        self.client.force_authenticate(self.user)
+        self.session = ChatSession.objects.create(user=self.user)
+
+    def _dashboard(self):
+        response = self.client.get(reverse('user-dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _stress_trend(self):
+        return {row['stress_level']: row['count'] for row in self._dashboard()['stress_trend']}
+
+    def test_second_request_is_served_from_the_cache(self):
+        first = self._dashboard()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._dashboard(), first)
+        self.assertEqual((self.cache.stats()['hits'], self.cache.stats()['misses']), (1, 1))
+
+    def test_new_session_refreshes_the_dashboard(self):
+        self.assertEqual(self._dashboard()['total_sessions'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse('chat-sessions'), {}).status_code, 201)
+
+        self.assertEqual(self._dashboard()['total_sessions'], 2)
+
+    def test_new_message_refreshes_the_session_summary(self):
+        self.assertEqual(self._dashboard()['recent_sessions'][0]['message_count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ChatMessage.objects.create(session=self.session, sender='user', message='Exams next week')
+
+        summary = self._dashboard()['recent_sessions'][0]
+        self.assertEqual((summary['message_count'], summary['last_message_preview']), (1, 'Exams next week'))
+
+    def test_stress_level_change_refreshes_the_trend(self):
+        self.assertEqual(self._stress_trend(), {'low': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            url = reverse('chat-session-detail', args=[self.session.id])
+            self.assertEqual(self.client.patch(url, {'stress_level': 'high'}).status_code, 200)
+
+        self.assertEqual(self._stress_trend(), {'high': 1})
+
+    def test_new_booking_refreshes_the_dashboard(self):
+        self.assertEqual(self._dashboard()['upcoming_bookings'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(student=self.user, appointment_date=timezone.localdate() + timedelta(days=1),
+                                   appointment_time='10:00')
+
+        self.assertEqual(len(self._dashboard()['upcoming_bookings']), 1)
+
+    def test_uncommitted_write_does_not_refresh_the_dashboard(self):
+        self._dashboard()
+
+        # Still inside the writing transaction: nothing may be rebuilt from it yet
+        with self.captureOnCommitCallbacks(execute=False):
+            ChatSession.objects.create(user=self.user)
+            self.assertEqual(self._dashboard()['total_sessions'], 1)
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+from io import StringIO
+import importlib.util
+import os
+import unittest
+
+from ..services.emotion_backends import ONNX_MODEL_FILENAME
+
+
+@unittest.skipUnless(importlib.util.find_spec('onnxruntime'), 'onnxruntime is not installed')
+@unittest.skipUnless(
+    os.path.exists(os.path.join(settings.EMOTION_ONNX_MODEL_DIR, ONNX_MODEL_FILENAME)),
+    'No exported ONNX model; run export_emotion_onnx first'
+)
+class EmotionBackendParityTests(SimpleTestCase):
+    def test_onnx_backend_matches_torch_on_fixed_corpus(self):
+        """Labels and stored (rounded) confidences agree with the torch pipeline"""
+        output = StringIO()
+        try:
+            call_command('compare_emotion_backends', repeat=1, stdout=output)
+        except CommandError:
+            self.fail(f"ONNX backend is outside the parity tolerance:\n{output.getvalue()}")
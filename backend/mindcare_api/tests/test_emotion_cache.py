@@ -0,0 +1,104 @@
+from django.test import SimpleTestCase, override_settings
+from unittest import mock
+import time
+import unittest
+
+from ..services.emotion_cache import EmotionResultCache
+from ..services.emotion_service import EmotionDetectionService
+from ..services.model_registry import EmotionModelRegistry
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+RESULT = {'emotion': 'fear', 'confidence': 0.87}
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError('Redis unavailable')
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError('Redis unavailable')
+
+
+class EmotionResultCacheTests(SimpleTestCase):
+    def test_normalized_text_shares_an_entry(self):
+        cache = EmotionResultCache()
+        cache.set('I am  SO worried', 'torch:v1', RESULT)
+
+        self.assertEqual(cache.get('i am so worried ', 'torch:v1'), RESULT)
+        self.assertIsNone(cache.get('I am so worried!', 'torch:v1'))
+
+    def test_model_change_makes_entries_unreachable(self):
+        cache = EmotionResultCache()
+        cache.set('exams tomorrow', 'torch:v1', RESULT)
+
+        self.assertIsNone(cache.get('exams tomorrow', 'onnx:v1'))
+        # Local entries of the old model are dropped, not just skipped
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = EmotionResultCache(max_entries=2)
+        cache.set('first', 'v1', RESULT)
+        cache.set('second', 'v1', RESULT)
+        cache.get('first', 'v1')
+
+        cache.set('third', 'v1', RESULT)
+
+        self.assertIsNone(cache.get('second', 'v1'))
+        self.assertEqual(cache.get('first', 'v1'), RESULT)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        cache = EmotionResultCache(ttl_seconds=60)
+        cache.set('exams tomorrow', 'v1', RESULT)
+
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now + 61):
+            self.assertIsNone(cache.get('exams tomorrow', 'v1'))
+
+    def test_returned_results_are_copies(self):
+        cache = EmotionResultCache()
+        cache.set('exams tomorrow', 'v1', RESULT)
+
+        cache.get('exams tomorrow', 'v1')['emotion'] = 'joy'
+
+        self.assertEqual(cache.get('exams tomorrow', 'v1'), RESULT)
+
+    def test_redis_errors_fall_back_to_the_local_tier(self):
+        cache = EmotionResultCache(redis_client=BrokenRedis())
+        cache.set('exams tomorrow', 'v1', RESULT)
+
+        self.assertEqual(cache.get('exams tomorrow', 'v1'), RESULT)
+        self.assertIsNone(cache.get('something else', 'v1'))
+        self.assertEqual(cache.stats()['shared_errors'], 2)
+
+    @unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+    def test_shared_tier_serves_other_processes_without_storing_text(self):
+        redis = fakeredis.FakeRedis()
+        EmotionResultCache(redis_client=redis).set('I am so worried', 'v1', RESULT)
+
+        other_process = EmotionResultCache(redis_client=redis)
+        self.assertEqual(other_process.get('I am so worried', 'v1'), RESULT)
+        self.assertEqual(other_process.stats()['shared_hits'], 1)
+        for key in redis.keys():
+            self.assertNotIn(b'worried', key + redis.get(key))
+
+
+class CachedEmotionDetectionTests(SimpleTestCase):
+    def test_repeated_text_skips_the_model(self):
+        classifier = mock.Mock(return_value=[{'label': 'Fear', 'score': 0.871}])
+        registry = EmotionModelRegistry(backend_name='torch')
+        cache = EmotionResultCache()
+
+        with mock.patch('mindcare_api.services.emotion_service.emotion_model_registry', registry), \
+                mock.patch.object(registry, 'get_classifier', return_value=classifier), \
+                mock.patch('mindcare_api.services.emotion_service.get_emotion_result_cache', return_value=cache), \
+                override_settings(EMOTION_BATCHING_ENABLED=False, EMOTION_CACHE_ENABLED=True):
+            service = EmotionDetectionService()
+            self.assertEqual(service.detect_emotion('Exams tomorrow'), RESULT)
+            self.assertEqual(service.detect_emotion('exams  tomorrow'), RESULT)
+
+        classifier.assert_called_once_with('Exams tomorrow')
@@ -0,0 +1,75 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from unittest import mock
+import unittest
+
+from ..models import PeerPost, SupportGroup, User
+from ..services.feed_cache import PeerFeedCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class PeerFeedCacheTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw', role='student')
+        self.client.force_authenticate(self.user)
+        self.group = SupportGroup.objects.create(name='Exam stress')
+        self.feed_cache = PeerFeedCache(fakeredis.FakeRedis(), max_posts=5)
+        for target in ('views', 'signals'):
+            patcher = mock.patch(f"mindcare_api.{target}.get_peer_feed_cache", return_value=self.feed_cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _create_posts(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                PeerPost.objects.create(group=self.group, user=self.user, content=f"post {i}")
+
+    def _read_feed(self, page_size):
+        ids = []
+        response = self.client.get(reverse('peer-posts'), {'group_id': self.group.id, 'page_size': page_size})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def _visible_ids(self):
+        return list(PeerPost.objects.filter(group=self.group, is_flagged=False)
+                    .order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_first_page_is_served_from_the_list(self):
+        self._create_posts(8)
+        self.assertEqual(self._read_feed(page_size=3), self._visible_ids())
+        self.assertEqual(self.feed_cache.misses, 1)
+
+        self.assertEqual(self._read_feed(page_size=3), self._visible_ids())
+        self.assertEqual(self.feed_cache.hits, 1)
+
+    def test_flagged_posts_do_not_end_the_feed_early(self):
+        self._create_posts(8)
+        self._read_feed(page_size=4)
+
+        # The cached list holds the 5 newest posts; flag two of them
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in PeerPost.objects.filter(group=self.group).order_by('-created_at', '-id')[:2]:
+                post.is_flagged = True
+                post.save()
+
+        ids = self._read_feed(page_size=4)
+        self.assertEqual(ids, self._visible_ids())
+        self.assertEqual(len(ids), 6)
+
+    def test_deleted_posts_do_not_end_the_feed_early(self):
+        self._create_posts(8)
+        self._read_feed(page_size=4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PeerPost.objects.filter(group=self.group).order_by('-created_at', '-id').first().delete()
+
+        self.assertEqual(self._read_feed(page_size=4), self._visible_ids())
@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+from concurrent.futures import ThreadPoolExecutor
+
+from ..services.inference_batcher import MicroBatcher
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_results_are_returned_to_their_callers(self):
+        batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch_size=4, max_wait_ms=20)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda item: batcher.submit(item, timeout=5), range(8)))
+        self.assertEqual(results, [item * 2 for item in range(8)])
+
+    def test_short_result_list_fails_every_caller(self):
+        # Drops the last result of each batch
+        batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=50)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(batcher.submit, item, 5) for item in range(4)]
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result(timeout=5)
+
+    def test_backend_error_fails_every_caller(self):
+        def infer_batch(items):
+            raise RuntimeError('model unavailable')
+
+        batcher = MicroBatcher(infer_batch, max_batch_size=2, max_wait_ms=1)
+        with self.assertRaises(RuntimeError):
+            batcher.submit('text', timeout=5)
@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+
+from ..services.keyword_matcher import KeywordMatcher, safety_matcher
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    def test_crisis_phrase_nested_in_longer_phrase_is_found(self):
+        matcher = KeywordMatcher({
+            'resources': ['self harm support group'],
+            'crisis': ['self harm'],
+        })
+        text = 'i need a self harm support group'
+
+        self.assertEqual(matcher.first_match(text, categories=('crisis',)), ('crisis', 'self harm'))
+        self.assertEqual(
+            sorted(matcher.find_all(text)),
+            [('crisis', 'self harm'), ('resources', 'self harm support group')]
+        )
+
+    def test_overlapping_phrases_are_all_reported(self):
+        matcher = KeywordMatcher({'crisis': ['want to die', 'die tonight']})
+        self.assertEqual(
+            matcher.find_all('I want to die tonight'),
+            [('crisis', 'want to die'), ('crisis', 'die tonight')]
+        )
+
+    def test_matches_are_in_text_order(self):
+        matcher = KeywordMatcher({'a': ['second'], 'b': ['first']})
+        self.assertEqual(matcher.first_match('first then second'), ('b', 'first'))
+
+    def test_normalized_variants_match(self):
+        self.assertEqual(safety_matcher.first_match('I w4nt to D1E', categories=('crisis',)),
+                         ('crisis', 'want to die'))
+        self.assertTrue(safety_matcher.matches('Ask about your medications', 'unsafe_response'))
+
+    def test_word_boundaries(self):
+        self.assertFalse(safety_matcher.matches('the precure episode', 'unsafe_response'))
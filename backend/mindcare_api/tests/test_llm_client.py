@@ -0,0 +1,95 @@
+from django.test import SimpleTestCase
+from types import SimpleNamespace
+from unittest import mock
+import httpx
+import openai
+import time
+
+from ..services.ai_service import AIService
+from ..services.enhanced_ai_service import EnhancedAIService
+from ..services.llm_client import CircuitOpenError, DeadlineExceededError, LLMClient, get_llm_client
+
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request('POST', 'http://llm.invalid/v1/chat/completions'))
+
+
+class LLMClientTests(SimpleTestCase):
+    def _client(self, responses, **options):
+        options = {'max_retries': 2, 'backoff_seconds': 0.001, 'failure_threshold': 3, 'reset_seconds': 30,
+                   'timeout': 5, **options}
+        llm_client = LLMClient(api_key='test', base_url='http://llm.invalid/v1', **options)
+        self.addCleanup(llm_client.http_client.close)
+        self.create = mock.Mock(side_effect=responses)
+        llm_client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self.create)))
+        return llm_client
+
+    def _ask(self, llm_client, **options):
+        return llm_client.chat_completion([{'role': 'user', 'content': 'hi'}], **options)
+
+    def test_transient_errors_are_retried(self):
+        llm_client = self._client([connection_error(), connection_error(), completion('Hello')])
+
+        self.assertEqual(self._ask(llm_client), 'Hello')
+        self.assertEqual(self.create.call_count, 3)
+        self.assertEqual((llm_client.stats()['retries'], llm_client.stats()['successes']), (2, 1))
+
+    def test_retries_are_bounded(self):
+        llm_client = self._client([connection_error()] * 5)
+
+        with self.assertRaises(openai.APIConnectionError):
+            self._ask(llm_client)
+        self.assertEqual(self.create.call_count, 3)
+
+    def test_no_attempt_starts_after_the_deadline(self):
+        def slow(**params):
+            time.sleep(0.05)
+            raise connection_error()
+
+        llm_client = self._client(slow, max_retries=10, backoff_seconds=0.02)
+
+        with self.assertRaises((openai.APIConnectionError, DeadlineExceededError)):
+            self._ask(llm_client, timeout=0.1)
+        self.assertLess(self.create.call_count, 10)
+        # Each attempt gets only what is left of the deadline
+        self.assertLessEqual(self.create.call_args.kwargs['timeout'].read, 0.1)
+
+    def test_circuit_opens_after_consecutive_failures_and_probes_after_the_reset(self):
+        llm_client = self._client([connection_error()] * 3 + [completion('Hello')], max_retries=0)
+        for _ in range(3):
+            with self.assertRaises(openai.APIConnectionError):
+                self._ask(llm_client)
+
+        with self.assertRaises(CircuitOpenError):
+            self._ask(llm_client)
+        self.assertEqual(self.create.call_count, 3)
+        self.assertEqual(llm_client.stats()['circuit_state'], 'open')
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 31):
+            self.assertEqual(self._ask(llm_client), 'Hello')
+        self.assertEqual(llm_client.stats()['circuit_state'], 'closed')
+
+
+class SharedLLMClientTests(SimpleTestCase):
+    def test_services_share_one_client_per_process(self):
+        self.assertIs(AIService().llm_client, EnhancedAIService().llm_client)
+        self.assertIs(get_llm_client(), AIService().llm_client)
+
+    def test_forked_worker_gets_its_own_client(self):
+        parent_client = get_llm_client()
+        with mock.patch('os.getpid', return_value=-1):
+            self.assertIsNot(get_llm_client(), parent_client)
+
+    def test_open_circuit_gives_the_fallback_reply(self):
+        llm_client = mock.Mock()
+        llm_client.chat_completion.side_effect = CircuitOpenError('open')
+        with mock.patch('mindcare_api.services.ai_service.get_llm_client', return_value=llm_client):
+            service = AIService()
+        with mock.patch.object(service, '_build_messages', return_value=[]), \
+                mock.patch.object(service, '_get_fallback_response', return_value='fallback'):
+            self.assertEqual(service.generate_response('hi', session=None), 'fallback')
+        llm_client.chat_completion.assert_called_once()
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.test import SimpleTestCase, override_settings
+from unittest import mock
+import threading
+import time
+
+from ..services.emotion_service import EmotionDetectionService
+from ..services.model_registry import EmotionModelRegistry
+
+
+class FakeClassifier:
+    model_name = 'fake-emotion'
+
+    def __call__(self, texts, batch_size=None):
+        if isinstance(texts, str):
+            return [{'label': 'joy', 'score': 0.91}]
+        return [{'label': 'sadness', 'score': 0.8} for _ in texts]
+
+
+class EmotionModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.loads = []
+        self.loading = threading.Lock()
+
+        def build(backend_name):
+            with self.loading:
+                self.loads.append(backend_name)
+            # Slow enough for concurrent first requests to overlap
+            time.sleep(0.05)
+            return FakeClassifier()
+
+        patcher = mock.patch('mindcare_api.services.model_registry.build_emotion_backend', side_effect=build)
+        self.build = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_model_is_loaded_once_on_first_use(self):
+        registry = EmotionModelRegistry(backend_name='torch')
+        self.assertFalse(registry.is_loaded())
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            classifiers = list(pool.map(lambda _: registry.get_classifier(), range(8)))
+
+        self.assertEqual(self.loads, ['torch'])
+        self.assertTrue(all(classifier is classifiers[0] for classifier in classifiers))
+        self.assertEqual(registry.stats()['model'], 'fake-emotion')
+        self.assertIsNotNone(registry.stats()['load_seconds'])
+
+    def test_services_share_the_registry_model(self):
+        registry = EmotionModelRegistry(backend_name='torch')
+        with mock.patch('mindcare_api.services.emotion_service.emotion_model_registry', registry):
+            first, second = EmotionDetectionService(), EmotionDetectionService()
+            self.assertIs(first.emotion_classifier, second.emotion_classifier)
+
+            with override_settings(EMOTION_BATCHING_ENABLED=False, EMOTION_CACHE_ENABLED=False):
+                self.assertEqual(first.detect_emotion('I passed!'), {'emotion': 'joy', 'confidence': 0.91})
+            with override_settings(EMOTION_CACHE_ENABLED=False):
+                self.assertEqual(second.detect_emotion('I failed'), {'emotion': 'sadness', 'confidence': 0.8})
+
+        self.assertEqual(len(self.loads), 1)
+
+    def test_failed_load_is_retried(self):
+        registry = EmotionModelRegistry(backend_name='torch')
+        self.build.side_effect = [OSError('model files missing'), FakeClassifier()]
+
+        self.assertIsNone(registry.get_classifier())
+        self.assertFalse(registry.is_loaded())
+        self.assertIsInstance(registry.get_classifier(), FakeClassifier)
+
+    @override_settings(EMOTION_BACKEND='onnx', EMOTION_ONNX_MODEL_DIR='/models/onnx',
+                       EMOTION_MODEL_NAME='hub/model', EMOTION_MODEL_REVISION='3')
+    def test_backend_follows_the_setting_unless_given(self):
+        registry = EmotionModelRegistry()
+        registry.get_classifier()
+
+        self.assertEqual(self.loads, ['onnx'])
+        self.assertEqual(registry.model_version(), 'onnx:/models/onnx:3')
+        self.assertEqual(EmotionModelRegistry(backend_name='torch').model_version(), 'torch:hub/model:3')
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+from unittest import mock
+
+from ..models import Alert, NotificationOutbox, User
+from ..tasks import dispatch_notifications
+from ..services.notification_dispatcher import NotificationDispatcher
+from ..services.notification_providers import (
+    InMemoryEmailProvider, InMemorySmsProvider, PermanentDeliveryError
+)
+
+
+class RejectingEmailProvider(InMemoryEmailProvider):
+    """Rejects a whole request containing an invalid address, like SendGrid's 400"""
+
+    def send_batch(self, template, messages):
+        if any(recipient.endswith('@invalid') for recipient, _, _ in messages):
+            raise PermanentDeliveryError('SendGrid rejected the request: 400')
+        super().send_batch(template, messages)
+
+
+class FlakyEmailProvider(InMemoryEmailProvider):
+    def send_batch(self, template, messages):
+        raise RuntimeError('SendGrid unavailable: 503')
+
+
+class NotificationDispatcherTests(TestCase):
+    def setUp(self):
+        recipients = ['a@example.com', 'b@invalid', 'c@example.com', 'd@example.com']
+        for i, recipient in enumerate(recipients):
+            user = User.objects.create_user(username=f"student{i}", password='pw', guardian_email=recipient)
+            alert = Alert.objects.create(user=user, alert_type='critical_stress', message='High stress')
+            NotificationOutbox.objects.create(
+                alert=alert, channel='email', recipient=recipient, subject='Alert', template='alert'
+            )
+
+    def _dispatcher(self, email_provider):
+        return NotificationDispatcher(email_provider=email_provider, sms_provider=InMemorySmsProvider(),
+                                      max_attempts=3, backoff_seconds=1)
+
+    def test_rejected_batch_fails_only_the_rejected_recipient(self):
+        provider = RejectingEmailProvider()
+
+        counts = self._dispatcher(provider).dispatch_batch()
+
+        self.assertEqual(counts, {'sent': 3, 'retried': 0, 'failed': 1})
+        self.assertEqual(sorted(recipient for recipient, _, _ in provider.sent),
+                         ['a@example.com', 'c@example.com', 'd@example.com'])
+        self.assertEqual(
+            list(NotificationOutbox.objects.filter(status='failed').values_list('recipient', flat=True)),
+            ['b@invalid']
+        )
+        self.assertEqual(Alert.objects.filter(status='sent').count(), 3)
+        self.assertEqual(Alert.objects.get(user__guardian_email='b@invalid').status, 'failed')
+
+    def test_transient_batch_error_retries_every_recipient(self):
+        counts = self._dispatcher(FlakyEmailProvider()).dispatch_batch()
+
+        self.assertEqual(counts, {'sent': 0, 'retried': 4, 'failed': 0})
+        self.assertEqual(NotificationOutbox.objects.filter(status='pending').count(), 4)
+
+
+class ScheduledDispatchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='student', password='pw', guardian_email='a@example.com')
+        self.alert = Alert.objects.create(user=user, alert_type='emergency', message='Crisis language')
+        self.notification = NotificationOutbox.objects.create(
+            alert=self.alert, channel='email', recipient='a@example.com', subject='Alert', template='alert'
+        )
+
+    def _dispatcher(self, email_provider):
+        return NotificationDispatcher(email_provider=email_provider, sms_provider=InMemorySmsProvider())
+
+    def _run_scheduled_dispatch(self, provider, at=None):
+        with mock.patch('mindcare_api.services.notification_dispatcher.build_email_provider', return_value=provider), \
+                mock.patch('django.utils.timezone.now', return_value=at or timezone.now()):
+            return dispatch_notifications()
+
+    def test_dispatch_is_scheduled(self):
+        tasks = [entry['task'] for entry in settings.CELERY_BEAT_SCHEDULE.values()]
+        self.assertIn(dispatch_notifications.name, tasks)
+
+    def test_retried_notification_is_sent_by_a_later_run(self):
+        with mock.patch.object(NotificationDispatcher, '_backoff', return_value=30):
+            self._dispatcher(FlakyEmailProvider()).dispatch_batch()
+        self.notification.refresh_from_db()
+        self.assertEqual(self.notification.status, 'pending')
+
+        provider = InMemoryEmailProvider()
+        # Not due yet
+        self.assertEqual(self._run_scheduled_dispatch(provider)['sent'], 0)
+
+        counts = self._run_scheduled_dispatch(provider, at=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(counts['sent'], 1)
+        self.notification.refresh_from_db()
+        self.assertEqual((self.notification.status, self.notification.attempts), ('sent', 2))
+        self.alert.refresh_from_db()
+        self.assertEqual(self.alert.status, 'sent')
+
+    def test_expired_claim_is_sent_by_a_later_run(self):
+        # Claimed by a dispatcher that died before recording the result
+        NotificationOutbox.objects.filter(id=self.notification.id).update(
+            status='sending', attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        provider = InMemoryEmailProvider()
+
+        self.assertEqual(self._run_scheduled_dispatch(provider)['sent'], 1)
+        self.assertEqual([recipient for recipient, _, _ in provider.sent], ['a@example.com'])
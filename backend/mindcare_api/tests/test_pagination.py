@@ -0,0 +1,46 @@
+from base64 import urlsafe_b64encode
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+import json
+
+from ..models import ChatMessage, ChatSession, User
+
+
+def make_cursor(value, last_id):
+    return urlsafe_b64encode(json.dumps([value, last_id]).encode('utf-8')).decode('ascii')
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw', role='student')
+        self.client.force_authenticate(self.user)
+        self.session = ChatSession.objects.create(user=self.user)
+        self.url = reverse('chat-session-messages', args=[self.session.id])
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ['not base64!', make_cursor('not a date', 1), make_cursor('2024-13-45T00:00:00', 1),
+                       make_cursor(None, 1), make_cursor('2024-01-01T00:00:00Z', 'x'), 'W10=']:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+    def test_tied_timestamps_are_paged_by_id_without_gaps_or_repeats(self):
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=self.session, sender='user', message=f"message {i}") for i in range(7)
+        ])
+        # Every message sent in the same instant
+        ChatMessage.objects.filter(session=self.session).update(timestamp=timezone.now())
+
+        seen = []
+        response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        expected = list(ChatMessage.objects.filter(session=self.session).order_by('id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+import json
+import random
+import unittest
+
+from ..models import (
+    Alert, Booking, ChatMessage, ChatSession, DailyUserStats, NotificationOutbox, PeerPost, SupportGroup, User
+)
+from ..services.stress_window import HIGH_STRESS_LEVELS
+from ..views import annotate_session_summaries
+
+STUDENTS = 1000
+SESSIONS_PER_STUDENT = 20
+MESSAGES_PER_SESSION = 6
+# Days of history the seeded rows are spread over
+HISTORY_DAYS = 365
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL')
+class HotQueryPlanTests(TestCase):
+    """EXPLAIN the hot ORM queries on a seeded dataset; none may sequentially scan its table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        cls.now = now = timezone.now()
+        students = User.objects.bulk_create([
+            User(username=f"plan-check-student-{i}", role='student', password='!') for i in range(STUDENTS)
+        ], batch_size=1000)
+        cls.student = students[0]
+        cls.counselor = User.objects.create(username='plan-check-counselor', role='counselor', password='!')
+        cls.group = SupportGroup.objects.create(name='plan-check-group')
+
+        sessions = ChatSession.objects.bulk_create([
+            ChatSession(
+                user=student,
+                stress_level=rng.choices(['low', 'moderate', 'high', 'critical'], [60, 25, 10, 5])[0]
+            )
+            for student in students
+            for _ in range(SESSIONS_PER_STUDENT)
+        ], batch_size=5000)
+        cls.session = sessions[0]
+        ChatMessage.objects.bulk_create([
+            ChatMessage(
+                session=session,
+                sender='user' if i % 2 == 0 else 'bot',
+                message='plan check',
+                emotion_detected=rng.choice(['joy', 'sadness', 'fear', None]) if i % 2 == 0 else None
+            )
+            for session in sessions
+            for i in range(MESSAGES_PER_SESSION)
+        ], batch_size=5000)
+
+        today = now.date()
+        Booking.objects.bulk_create([
+            Booking(
+                student=student,
+                counselor=cls.counselor if rng.random() < 0.05 else None,
+                appointment_date=today + timedelta(days=rng.randint(-365, 14)),
+                appointment_time='10:00',
+                status=rng.choices(['scheduled', 'completed', 'cancelled'], [5, 85, 10])[0]
+            )
+            for student in students
+            for _ in range(5)
+        ], batch_size=5000)
+        alerts = Alert.objects.bulk_create([
+            Alert(user=student, alert_type=rng.choice(['weekly_report', 'critical_stress']), message='plan check')
+            for student in students
+            for _ in range(5)
+        ], batch_size=5000)
+        NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(alert=alert, channel='email', recipient='guardian@example.com', status='sent')
+            for alert in alerts
+        ], batch_size=5000)
+        PeerPost.objects.bulk_create([
+            PeerPost(group=cls.group, user=rng.choice(students), content='plan check', is_flagged=rng.random() < 0.02)
+            for _ in range(len(students) * 5)
+        ], batch_size=5000)
+        DailyUserStats.objects.bulk_create([
+            DailyUserStats(
+                user=student, date=today - timedelta(days=day),
+                critical_sessions=1 if rng.random() < 0.02 else 0
+            )
+            for student in students
+            for day in range(60)
+        ], batch_size=5000)
+
+        # auto_now_add stamps every row with now; spread them over a year, so
+        # that as in production only a small share of sessions is still active
+        for model, field in [(ChatSession, 'session_start'), (ChatMessage, 'timestamp'),
+                             (Alert, 'created_at'), (PeerPost, 'created_at')]:
+            cls._spread(model, field)
+        # As an hour after cleanup_old_sessions last ran: active sessions sit on
+        # both sides of the 24 hour cutoff
+        ChatSession.objects.filter(session_start__lt=now - timedelta(hours=25)).update(is_active=False)
+
+        with connection.cursor() as cursor:
+            for model in [User, ChatSession, ChatMessage, Booking, Alert, NotificationOutbox, PeerPost, DailyUserStats]:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    @classmethod
+    def _spread(cls, model, field):
+        column = connection.ops.quote_name(model._meta.get_field(field).column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {connection.ops.quote_name(model._meta.db_table)} "
+                f"SET {column} = {column} - random() * interval '{HISTORY_DAYS} days'"
+            )
+
+    def _hot_queries(self):
+        student, session, counselor, now = self.student, self.session, self.counselor, self.now
+        return [
+            ('session list', ChatSession,
+             ChatSession.objects.filter(user=student).order_by('-session_start')[:20]),
+            ('session summaries', ChatSession,
+             annotate_session_summaries(ChatSession.objects.filter(user=student)).order_by('-session_start')[:5]),
+            ('old session cleanup', ChatSession,
+             ChatSession.objects.filter(is_active=True, session_start__lt=now - timedelta(hours=24))),
+            ('persistent stress reconciliation', ChatSession,
+             ChatSession.objects.filter(
+                 stress_level__in=HIGH_STRESS_LEVELS, session_start__gte=now - timedelta(hours=72)
+             ).order_by().values('user_id').annotate(high_stress_count=Count('id'))),
+            ('session messages page', ChatMessage,
+             ChatMessage.objects.filter(session=session).order_by('timestamp', 'id')[:51]),
+            ('scored messages', ChatMessage,
+             ChatMessage.objects.filter(session=session, sender='user', emotion_detected__isnull=False)),
+            ('alert cooldown', Alert,
+             Alert.objects.filter(user=student, alert_type='critical_stress', created_at__gte=now - timedelta(hours=24))),
+            ('alert history', Alert,
+             Alert.objects.filter(user=student).order_by('-created_at', '-id')[:21]),
+            ('counselor appointments', Booking,
+             Booking.objects.filter(
+                 counselor=counselor, appointment_date=now.date(), status='scheduled'
+             ).order_by('appointment_time')),
+            ('upcoming bookings', Booking,
+             Booking.objects.filter(
+                 student=student, appointment_date__gte=now.date(), status='scheduled'
+             ).order_by('appointment_date', 'appointment_time')[:3]),
+            ('group feed', PeerPost,
+             PeerPost.objects.filter(group=self.group, is_flagged=False).order_by('-created_at', '-id')[:21]),
+            ('outbox claim', NotificationOutbox,
+             NotificationOutbox.objects.filter(
+                 status__in=['pending', 'sending'], next_attempt_at__lte=now
+             ).order_by('next_attempt_at', 'id')[:500]),
+            ('students at risk', DailyUserStats,
+             DailyUserStats.objects.filter(
+                 date__gte=now.date() - timedelta(days=7), critical_sessions__gt=0
+             ).order_by().values_list('user_id', flat=True)),
+        ]
+
+    def test_hot_queries_use_an_index(self):
+        for name, model, queryset in self._hot_queries():
+            with self.subTest(name):
+                plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+                seq_scans = [
+                    node for node in plan_nodes(plan)
+                    if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == model._meta.db_table
+                ]
+                self.assertEqual(seq_scans, [], f"{name} scans {model._meta.db_table}:\n{queryset.explain()}")
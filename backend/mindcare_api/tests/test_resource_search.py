@@ -0,0 +1,57 @@
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from io import StringIO
+from rest_framework.test import APITestCase
+import unittest
+
+from ..models import Resource, User
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search and tag containment need PostgreSQL')
+class ResourceSearchTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='student', password='pw'))
+        self.sleep_guide = Resource.objects.create(
+            title='Better sleep before exams', description='Wind down routines for busy weeks',
+            resource_type='guide', tags=['sleep', 'exams'],
+        )
+        self.breathing = Resource.objects.create(
+            title='Box breathing', description='A calming exercise that also helps you sleep',
+            resource_type='audio', tags=['anxiety', 'sleep'],
+        )
+        self.exam_stress = Resource.objects.create(
+            title='Handling exam stress', description='Plan revision in short blocks',
+            resource_type='article', tags=['exams', 'stress'],
+        )
+
+    def _titles(self, **params):
+        response = self.client.get(reverse('resources'), params)
+        self.assertEqual(response.status_code, 200)
+        return [resource['title'] for resource in response.data['results']]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self._titles(q='sleeping'), ['Better sleep before exams', 'Box breathing'])
+
+    def test_web_search_syntax(self):
+        self.assertEqual(self._titles(q='sleep -exams'), ['Box breathing'])
+        self.assertEqual(self._titles(q='"exam stress"'), ['Handling exam stress'])
+        self.assertCountEqual(self._titles(q='breathing or stress'), ['Box breathing', 'Handling exam stress'])
+
+    def test_tags_must_all_match(self):
+        self.assertEqual(self._titles(tags='sleep'), ['Better sleep before exams', 'Box breathing'])
+        self.assertEqual(self._titles(tags='exams, sleep'), ['Better sleep before exams'])
+        self.assertEqual(self._titles(tags='exams,sleep', q='stress'), [])
+
+    def test_search_vector_follows_edits(self):
+        self.exam_stress.title = 'Handling exam nerves'
+        self.exam_stress.save()
+        self.assertEqual(self._titles(q='nerves'), ['Handling exam nerves'])
+
+        # Bulk loads skip the signal until the vectors are rebuilt
+        Resource.objects.bulk_create([Resource(title='Sleep diary', resource_type='guide')])
+        self.assertNotIn('Sleep diary', self._titles(q='diary'))
+        out = StringIO()
+        call_command('rebuild_resource_search', '--missing-only', stdout=out)
+        self.assertEqual(out.getvalue(), "Updated the search vector of 1 resources\n")
+        self.assertEqual(self._titles(q='diary'), ['Sleep diary'])
@@ -0,0 +1,167 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from io import StringIO
+from rest_framework.test import APITestCase
+from unittest import mock
+import unittest
+
+from ..models import Alert, ChatSession, User
+from ..services.risk_index import (
+    ALERT_WEIGHT, CRITICAL_SESSION_WEIGHT, HIGH_SESSION_WEIGHT, RISK_ALERT_TYPES, StudentRiskIndex
+)
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+WINDOW_DAYS = 7
+
+# (stress level, days ago) of each student's sessions; none sits on the window's first day
+SESSIONS = [
+    [('critical', 1), ('high', 2), ('low', 3)],
+    [('critical', 5), ('critical', 6)],
+    [('critical', 9), ('high', 1)],
+    [('high', 1), ('high', 2)],
+    [('critical', 0), ('moderate', 0)],
+    [('critical', 3)],
+]
+# (alert type, days ago) of each student's alerts
+ALERTS = [
+    [('critical_stress', 1)],
+    [],
+    [('emergency', 2)],
+    [('critical_stress', 1)],
+    [('weekly_report', 0), ('emergency', 10)],
+    [('emergency', 4), ('critical_stress', 5)],
+]
+
+
+class RiskIndexFixtureMixin:
+    def setUp(self):
+        now = timezone.now()
+        self.students = []
+        for i, (sessions, alerts) in enumerate(zip(SESSIONS, ALERTS)):
+            student = User.objects.create_user(username=f"student{i}", password='pw', role='student',
+                                               first_name=f"Student{i}")
+            self.students.append(student)
+            for level, days_ago in sessions:
+                session = ChatSession.objects.create(user=student, stress_level=level)
+                ChatSession.objects.filter(id=session.id).update(session_start=now - timedelta(days=days_ago, hours=1))
+            for alert_type, days_ago in alerts:
+                alert = Alert.objects.create(user=student, alert_type=alert_type, message='alert')
+                Alert.objects.filter(id=alert.id).update(created_at=now - timedelta(days=days_ago, hours=1))
+        self._backfill()
+
+    def _backfill(self):
+        call_command('backfill_daily_stats', stdout=StringIO())
+
+    def _full_scan(self):
+        """Scores computed straight from sessions and alerts, as before the index"""
+        window_start = timezone.now() - timedelta(days=WINDOW_DAYS)
+        at_risk = set(ChatSession.objects.filter(
+            stress_level='critical', session_start__gte=window_start
+        ).values_list('user_id', flat=True))
+
+        scores = {}
+        for user_id in at_risk:
+            sessions = ChatSession.objects.filter(user_id=user_id, session_start__gte=window_start)
+            scores[user_id] = (
+                CRITICAL_SESSION_WEIGHT * sessions.filter(stress_level='critical').count()
+                + HIGH_SESSION_WEIGHT * sessions.filter(stress_level='high').count()
+                + ALERT_WEIGHT * Alert.objects.filter(
+                    user_id=user_id, alert_type__in=RISK_ALERT_TYPES, created_at__gte=window_start
+                ).count()
+            )
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def assertMatchesFullScan(self, risk_index, limit=100):
+        board = [(row['user_id'], row['risk_score']) for row in risk_index.top(limit)]
+        self.assertEqual(board, self._full_scan()[:limit])
+
+
+class StudentRiskIndexTests(RiskIndexFixtureMixin, TestCase):
+    def test_database_board_matches_full_scan(self):
+        risk_index = StudentRiskIndex(window_days=WINDOW_DAYS)
+        self.assertMatchesFullScan(risk_index)
+        self.assertMatchesFullScan(risk_index, limit=2)
+
+    @unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+    def test_redis_board_matches_full_scan(self):
+        redis = fakeredis.FakeRedis()
+        risk_index = StudentRiskIndex(redis_client=redis, window_days=WINDOW_DAYS)
+        risk_index.rebuild()
+        self.assertMatchesFullScan(risk_index)
+        self.assertMatchesFullScan(risk_index, limit=2)
+
+        # Kept up to date one student at a time
+        redis.delete(risk_index.key)
+        for student in self.students:
+            risk_index.user_changed(student.id)
+        self.assertMatchesFullScan(risk_index)
+
+    @unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+    def test_rebuild_lowers_scores_as_the_window_moves(self):
+        redis = fakeredis.FakeRedis()
+        risk_index = StudentRiskIndex(redis_client=redis, window_days=WINDOW_DAYS)
+        risk_index.rebuild()
+
+        # Three days later, without any session or alert changing
+        later = timezone.now() + timedelta(days=3)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertMatchesFullScan(risk_index)
+            risk_index.rebuild()
+            self.assertEqual(
+                {int(member): score for member, score in redis.zrange(risk_index.key, 0, -1, withscores=True)},
+                {user_id: float(score) for user_id, score in self._full_scan()}
+            )
+
+
+    @unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+    def test_board_between_rebuilds_after_one_score_drops_and_another_rises(self):
+        redis = fakeredis.FakeRedis()
+        risk_index = StudentRiskIndex(redis_client=redis, window_days=WINDOW_DAYS)
+        risk_index.rebuild()
+        dropping, rising = self.students[5], self.students[3]
+        self.assertEqual([row['user_id'] for row in risk_index.top(1)], [dropping.id])
+        self.assertNotIn(rising.id, [row['user_id'] for row in risk_index.top(100)])
+
+        later = timezone.now() + timedelta(days=3)
+        with mock.patch('django.utils.timezone.now', return_value=later), \
+                mock.patch('mindcare_api.signals.get_student_risk_index', return_value=risk_index):
+            # The first student's alerts leave the window with no event; the
+            # other starts a session already at critical stress
+            with self.captureOnCommitCallbacks(execute=True):
+                ChatSession.objects.create(user=rising, stress_level='critical')
+
+            for limit in range(1, len(self.students) + 1):
+                self.assertMatchesFullScan(risk_index, limit=limit)
+            self.assertEqual([row['user_id'] for row in risk_index.top(2)], [rising.id, self.students[0].id])
+            # Entries read out of date were corrected on the board
+            self.assertEqual(
+                {int(member): score for member, score in redis.zrange(risk_index.key, 0, -1, withscores=True)},
+                {user_id: float(score) for user_id, score in self._full_scan()}
+            )
+
+
+class CounselorDashboardTests(RiskIndexFixtureMixin, APITestCase):
+    def test_high_risk_students(self):
+        counselor = User.objects.create_user(username='counselor', password='pw', role='counselor')
+        self.client.force_authenticate(counselor)
+
+        with mock.patch('mindcare_api.views.get_student_risk_index',
+                        return_value=StudentRiskIndex(window_days=WINDOW_DAYS)):
+            response = self.client.get(reverse('counselor-dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['high_risk_students']
+        self.assertEqual([(row['id'], row['risk_score']) for row in rows], self._full_scan())
+        for row in rows:
+            last_critical = ChatSession.objects.filter(
+                user_id=row['id'], stress_level='critical'
+            ).order_by('-session_start').first()
+            # Still the session's start time, as before the index
+            self.assertEqual(row['last_session'], last_critical.session_start)
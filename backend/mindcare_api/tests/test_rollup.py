@@ -0,0 +1,90 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from io import StringIO
+
+from ..models import ChatMessage, ChatSession, DailyUserStats, User
+from ..services.emotion_service import EmotionDetectionService
+from ..services.rollup_service import STRESS_LEVEL_FIELDS
+from ..session_events import on_session_stress_changed
+
+
+class DailyStatsRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw', role='student')
+        self.emotion_service = EmotionDetectionService()
+
+    def _session(self, days_ago=0):
+        session = ChatSession.objects.create(user=self.user)
+        if days_ago:
+            started = timezone.now() - timedelta(days=days_ago)
+            ChatSession.objects.filter(id=session.id).update(session_start=started)
+            # Move the row the create counted to the new day
+            DailyUserStats.objects.all().delete()
+            call_command('backfill_daily_stats', user_ids=[self.user.id], stdout=StringIO())
+            session.refresh_from_db()
+        return session
+
+    def _score(self, session, emotion, confidence):
+        message = ChatMessage.objects.create(session=session, sender='user', message=emotion)
+        if session.session_start.date() != message.timestamp.date():
+            # Sent on the day the session started
+            ChatMessage.objects.filter(id=message.id).update(timestamp=session.session_start)
+            message.refresh_from_db()
+        self.emotion_service.record_message_emotion(message, {'emotion': emotion, 'confidence': confidence})
+        return message
+
+    def _set_level(self, session, level):
+        previous_level, session.stress_level = session.stress_level, level
+        session.save(update_fields=['stress_level'])
+        on_session_stress_changed(self.user, session, previous_level)
+
+    def _snapshot(self):
+        """The user's non-empty rollup rows, keyed by date"""
+        rows = {}
+        for stats in DailyUserStats.objects.filter(user=self.user):
+            levels = tuple(getattr(stats, field) for field in STRESS_LEVEL_FIELDS.values())
+            if any(levels) or stats.emotion_counts:
+                rows[stats.date] = (
+                    levels, stats.emotion_counts, stats.emotion_confidence_sums, stats.emotion_first_seen
+                )
+        return rows
+
+    def assertMatchesRecompute(self):
+        incremental = self._snapshot()
+        call_command('backfill_daily_stats', user_ids=[self.user.id], stdout=StringIO())
+        self.assertEqual(incremental, self._snapshot())
+
+    def test_rollup_equals_recompute_after_create_score_level_change_and_delete(self):
+        kept = self._session()
+        deleted = self._session()
+        yesterday = self._session(days_ago=1)
+
+        self._score(kept, 'joy', '0.90')
+        self._score(deleted, 'sadness', '0.70')
+        first_fear = self._score(deleted, 'fear', '0.60')
+        self._score(kept, 'fear', '0.85')
+        self._score(kept, 'sadness', '0.55')
+        self._score(yesterday, 'anger', '0.80')
+        self._set_level(deleted, 'critical')
+        self._set_level(kept, 'high')
+        self._set_level(kept, 'moderate')
+        self.assertMatchesRecompute()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+
+        stats = DailyUserStats.objects.get(user=self.user, date=timezone.localdate())
+        self.assertEqual(stats.emotion_counts, {'joy': 1, 'fear': 1, 'sadness': 1})
+        self.assertEqual(stats.critical_sessions, 0)
+        self.assertNotEqual(stats.emotion_first_seen['fear'], first_fear.timestamp.isoformat())
+        self.assertMatchesRecompute()
+
+    def test_deleting_the_only_session_of_a_day_empties_it(self):
+        session = self._session()
+        self._score(session, 'joy', '0.90')
+
+        session.delete()
+
+        self.assertEqual(self._snapshot(), {})
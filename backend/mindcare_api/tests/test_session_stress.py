@@ -0,0 +1,73 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from io import StringIO
+
+from ..models import ChatMessage, ChatSession, User
+from ..services.emotion_service import EmotionDetectionService
+
+# (emotion, confidence) of each scored user message of the two sessions
+SCORES = [
+    [('fear', 0.9), ('sadness', 0.6), ('fear', 0.7)],
+    [('joy', 0.8), ('anger', 0.5)],
+]
+
+
+class SessionStressAggregateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw')
+        self.emotion_service = EmotionDetectionService()
+        self.sessions = []
+        for scores in SCORES:
+            session = ChatSession.objects.create(user=self.user)
+            for emotion, confidence in scores:
+                message = ChatMessage.objects.create(session=session, sender='user', message=emotion)
+                self.emotion_service.record_message_emotion(message, {'emotion': emotion, 'confidence': confidence})
+                ChatMessage.objects.create(session=session, sender='bot', message='reply')
+            self.sessions.append(session)
+        self.expected = self._aggregates()
+
+    def _aggregates(self):
+        return {
+            session.id: (round(session.stress_score_sum, 6), round(session.emotion_confidence_sum, 6),
+                         session.emotion_counts)
+            for session in ChatSession.objects.filter(user=self.user)
+        }
+
+    def _repair(self, *args):
+        out = StringIO()
+        call_command('repair_session_stress', *args, stdout=out)
+        return out.getvalue()
+
+    def test_running_aggregates_match_the_history(self):
+        self.assertEqual(self.expected, {
+            self.sessions[0].id: (round(0.9 * 1.6 + 0.7 * 0.6, 6), 2.2, {'fear': 2, 'sadness': 1}),
+            self.sessions[1].id: (round(0.1 * 0.8 + 0.8 * 0.5, 6), 1.3, {'joy': 1, 'anger': 1}),
+        })
+        self.assertEqual(self.emotion_service.calculate_session_stress(self.sessions[0]), 'critical')
+        self.assertEqual(self.emotion_service.calculate_session_stress(self.sessions[1]), 'low')
+        self.assertEqual(self._repair('--verify'), "Checked 2 sessions, found 0 with stale aggregates\n")
+
+    def test_repair_recomputes_stale_aggregates(self):
+        ChatSession.objects.filter(id=self.sessions[0].id).update(
+            stress_score_sum=5.0, emotion_confidence_sum=0.1, emotion_counts={'joy': 7}
+        )
+        ChatSession.objects.filter(id=self.sessions[1].id).update(emotion_counts={'joy': 1})
+        with self.assertRaises(CommandError):
+            self._repair('--verify')
+
+        self.assertEqual(self._repair('--chunk-size', '1'), "Checked 2 sessions, repaired 2 with stale aggregates\n")
+
+        self.assertEqual(self._aggregates(), self.expected)
+        # Nothing is left to change
+        self.assertEqual(self._repair(), "Checked 2 sessions, repaired 0 with stale aggregates\n")
+        self.assertEqual(self._aggregates(), self.expected)
+
+    def test_repair_can_be_limited_to_sessions(self):
+        ChatSession.objects.update(stress_score_sum=0)
+
+        self._repair('--session-id', str(self.sessions[1].id))
+
+        repaired = self._aggregates()
+        self.assertEqual(repaired[self.sessions[1].id], self.expected[self.sessions[1].id])
+        self.assertEqual(repaired[self.sessions[0].id][0], 0)
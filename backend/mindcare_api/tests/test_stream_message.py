@@ -0,0 +1,80 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from unittest import mock
+import json
+
+from ..models import ChatMessage, ChatSession, User
+from ..services.emotion_service import EmotionDetectionService
+
+
+class FakeLLMClient:
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    def stream_chat_completion(self, messages, timeout=None, **params):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise ConnectionError('upstream closed the stream')
+            yield chunk
+
+
+class StreamMessageTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw')
+        self.client.force_authenticate(self.user)
+        self.session = ChatSession.objects.create(user=self.user)
+        patcher = mock.patch.object(EmotionDetectionService, 'detect_emotion',
+                                    return_value={'emotion': 'sadness', 'confidence': 0.6})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _stream(self, llm_client, message='I feel so alone'):
+        with mock.patch('mindcare_api.services.ai_service.get_llm_client', return_value=llm_client):
+            response = self.client.post(
+                reverse('send-message-stream', args=[self.session.id]), {'message': message}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            body = b''.join(response.streaming_content).decode()
+
+        events = []
+        for frame in body.strip().split('\n\n'):
+            event, data = frame.split('\n')
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    def _bot_messages(self):
+        return list(ChatMessage.objects.filter(session=self.session, sender='bot').values_list('message', flat=True))
+
+    def test_tokens_stream_before_the_reply_is_saved(self):
+        events = self._stream(FakeLLMClient(["You're ", 'not ', 'alone.']))
+
+        self.assertEqual([name for name, _ in events], ['user_message', 'token', 'token', 'token', 'done'])
+        self.assertEqual(events[0][1]['message'], 'I feel so alone')
+        self.assertEqual(''.join(data['content'] for name, data in events if name == 'token'), "You're not alone.")
+        self.assertEqual(events[-1][1]['bot_message']['message'], "You're not alone.")
+        self.assertEqual(self._bot_messages(), ["You're not alone."])
+
+    def test_unsafe_reply_is_replaced_before_it_is_saved(self):
+        events = self._stream(FakeLLMClient(['I can ', 'diagnose ', 'that.']))
+
+        self.assertEqual([name for name, _ in events][-2:], ['replace', 'done'])
+        fallback = events[-2][1]['content']
+        self.assertNotIn('diagnose', fallback)
+        self.assertEqual(self._bot_messages(), [fallback])
+
+    def test_broken_stream_saves_only_the_fallback(self):
+        events = self._stream(FakeLLMClient(['Take a ', 'slow ', 'breath.'], fail_after=2))
+
+        self.assertEqual([name for name, _ in events], ['user_message', 'token', 'token', 'replace', 'done'])
+        self.assertEqual(self._bot_messages(), [events[-2][1]['content']])
+        self.assertNotIn('Take a slow', self._bot_messages()[0])
+
+    def test_other_students_session_is_not_found(self):
+        other = ChatSession.objects.create(user=User.objects.create_user(username='other', password='pw'))
+
+        response = self.client.post(reverse('send-message-stream', args=[other.id]), {'message': 'hi'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(ChatMessage.objects.exists())
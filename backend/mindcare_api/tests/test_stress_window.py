@@ -0,0 +1,65 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from unittest import mock
+import unittest
+
+from ..models import ChatSession, DailyUserStats, User
+from ..services.stress_window import PersistentStressDetector
+from ..session_events import on_session_stress_changed
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class PersistentStressDetectorTests(APITestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.detector = PersistentStressDetector(redis_client=self.redis, window_hours=72, threshold=3)
+        for target in ('signals', 'session_events'):
+            patcher = mock.patch(f"mindcare_api.{target}.get_persistent_stress_detector", return_value=self.detector)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='student', password='pw', role='student')
+        self.client.force_authenticate(self.user)
+
+    def _high_stress_count(self):
+        return sum(int(count) for count in self.redis.hvals(self.detector.make_key(self.user.id)))
+
+    def _raise_to(self, session, level):
+        previous_level, session.stress_level = session.stress_level, level
+        session.save(update_fields=['stress_level'])
+        on_session_stress_changed(self.user, session, previous_level)
+
+    def test_downgrade_leaves_the_window(self):
+        session = ChatSession.objects.create(user=self.user)
+        self._raise_to(session, 'critical')
+        self.assertEqual(self._high_stress_count(), 1)
+
+        self._raise_to(session, 'moderate')
+        self.assertEqual(self._high_stress_count(), 0)
+
+    def test_deleted_session_leaves_the_window(self):
+        sessions = [ChatSession.objects.create(user=self.user) for _ in range(2)]
+        for session in sessions:
+            self._raise_to(session, 'high')
+        self.assertEqual(self._high_stress_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sessions[0].delete()
+        self.assertEqual(self._high_stress_count(), 1)
+
+    def test_stress_level_set_through_the_api_updates_the_window_and_rollup(self):
+        session = ChatSession.objects.create(user=self.user)
+        url = reverse('chat-session-detail', args=[session.id])
+
+        self.assertEqual(self.client.patch(url, {'stress_level': 'high'}).status_code, 200)
+        self.assertEqual(self._high_stress_count(), 1)
+
+        self.assertEqual(self.client.patch(url, {'stress_level': 'low'}).status_code, 200)
+        self.assertEqual(self._high_stress_count(), 0)
+
+        stats = DailyUserStats.objects.get(user=self.user)
+        self.assertEqual((stats.low_sessions, stats.high_sessions), (1, 0))
@@ -0,0 +1,83 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from io import StringIO
+from rest_framework.test import APITestCase
+
+from ..models import GroupMembership, SupportGroup, User
+from ..services.group_service import SupportGroupService
+
+
+class GroupMemberCountTests(APITestCase):
+    def setUp(self):
+        self.group = SupportGroup.objects.create(name='Exam stress')
+        self.user = User.objects.create_user(username='student', password='pw')
+        self.client.force_authenticate(self.user)
+
+    def _member_count(self):
+        self.group.refresh_from_db()
+        return self.group.member_count
+
+    def _join(self):
+        return self.client.post(reverse('group-memberships'), {'group': self.group.id})
+
+    def _leave(self, membership_id):
+        return self.client.delete(reverse('group-membership-detail', args=[membership_id]))
+
+    def test_join_and_leave_move_the_count(self):
+        response = self._join()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._member_count(), 1)
+
+        self.assertEqual(self._leave(response.data['id']).status_code, 204)
+        self.assertEqual(self._member_count(), 0)
+
+        # Rejoining reactivates the same membership
+        self.assertEqual(self._join().data['id'], response.data['id'])
+        self.assertEqual(self._member_count(), 1)
+
+    def test_joining_twice_counts_once(self):
+        self._join()
+        self._join()
+
+        self.assertEqual(self._member_count(), 1)
+        self.assertEqual(GroupMembership.objects.filter(user=self.user, group=self.group).count(), 1)
+
+    def test_leaving_when_not_a_member_leaves_the_count(self):
+        other = User.objects.create_user(username='other', password='pw')
+        SupportGroupService().join_group(other, self.group)
+        membership = SupportGroupService().join_group(self.user, self.group)
+        SupportGroupService().leave_group(membership)
+        self.assertEqual(self._member_count(), 1)
+
+        self.assertEqual(self._leave(membership.id).status_code, 404)
+        SupportGroupService().leave_group(membership)
+
+        self.assertEqual(self._member_count(), 1)
+
+
+class ReconcileGroupMemberCountsTests(APITestCase):
+    def setUp(self):
+        self.group = SupportGroup.objects.create(name='Exam stress')
+        for i in range(3):
+            user = User.objects.create_user(username=f"student{i}", password='pw')
+            GroupMembership.objects.create(user=user, group=self.group, is_active=i < 2)
+        # Drifted: memberships written without the service
+        SupportGroup.objects.filter(id=self.group.id).update(member_count=5)
+
+    def _reconcile(self, *args):
+        call_command('reconcile_group_member_counts', *args, stdout=StringIO())
+
+    def test_verify_reports_the_drift_without_fixing_it(self):
+        with self.assertRaises(CommandError):
+            self._reconcile('--verify')
+
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 5)
+
+    def test_reconcile_repairs_the_count(self):
+        self._reconcile()
+
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 2)
+        self._reconcile('--verify')
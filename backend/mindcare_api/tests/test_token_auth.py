@@ -0,0 +1,137 @@
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from unittest import mock
+import time
+import unittest
+
+from ..authentication import CachedTokenAuthentication
+from ..models import User
+from ..services.token_cache import TokenUserCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+TTL_SECONDS = 60
+
+
+class TokenAuthTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pw')
+        self.token = Token.objects.create(user=self.user)
+        # delete() clears the token's primary key, which is the key
+        self.key = self.token.key
+        self.cache = self._cache()
+        self.use_cache(self.cache)
+
+    def _cache(self):
+        return TokenUserCache(ttl_seconds=TTL_SECONDS)
+
+    def use_cache(self, cache):
+        """Make cache the process-wide token cache, as in the process handling a request"""
+        for target in ('authentication', 'signals'):
+            patcher = mock.patch(f"mindcare_api.{target}.get_token_user_cache", return_value=cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def authenticate(self, key=None):
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key or self.key)
+        return user
+
+    def assertRejected(self, key=None):
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(key)
+
+
+class CachedTokenAuthenticationTests(TokenAuthTestMixin, TestCase):
+    def test_cached_token_authenticates_without_a_query(self):
+        self.assertEqual(self.authenticate(), self.user)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), self.user)
+        self.assertEqual(self.cache.stats()['local_hits'], 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.authenticate()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+
+        self.assertRejected()
+
+    def test_rotated_token_replaces_the_old_one(self):
+        self.authenticate()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+            rotated = Token.objects.create(user=self.user)
+
+        self.assertRejected()
+        self.assertEqual(self.authenticate(rotated.key), self.user)
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate()
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertRejected()
+
+    def test_other_processes_without_redis_stop_within_the_ttl(self):
+        # Another process cached the token; it does not see this one's invalidation
+        other_process = TokenUserCache(ttl_seconds=TTL_SECONDS)
+        self.use_cache(other_process)
+        self.authenticate()
+        self.use_cache(self.cache)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+
+        self.use_cache(other_process)
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now + TTL_SECONDS - 1):
+            self.assertEqual(self.authenticate(), self.user)
+        with mock.patch('time.monotonic', return_value=now + TTL_SECONDS + 1):
+            self.assertRejected()
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class SharedTokenCacheTests(TokenAuthTestMixin, TestCase):
+    def _cache(self):
+        if not hasattr(self, 'redis'):
+            self.redis = fakeredis.FakeRedis()
+        return TokenUserCache(ttl_seconds=TTL_SECONDS, redis_client=self.redis)
+
+    def test_local_miss_costs_a_primary_key_lookup(self):
+        self.authenticate()
+
+        self.use_cache(self._cache())
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), self.user)
+
+    def test_deleted_token_is_rejected_in_every_process(self):
+        other_process = self._cache()
+        self.use_cache(other_process)
+        self.authenticate()
+
+        self.use_cache(self.cache)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+
+        self.use_cache(other_process)
+        self.assertRejected()
+
+    def test_deactivated_user_is_rejected_in_every_process(self):
+        other_process = self._cache()
+        self.use_cache(other_process)
+        self.authenticate()
+
+        self.use_cache(self.cache)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.use_cache(other_process)
+        self.assertRejected()
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from unittest import mock
+import threading
+import unittest
+
+from ..models import Alert, ChatSession, NotificationOutbox, User, WeeklyReport, WeeklyReportRun, WeeklyReportShard
+from ..services.alert_service import AlertService
+from ..services.report_service import WeeklyReportEngine, current_week_range
+from ..tasks import fail_weekly_report_run, generate_weekly_reports
+
+
+class WeeklyReportSetupMixin:
+    def setUp(self):
+        self.students = [
+            User.objects.create_user(
+                username=f"student{i}", password='pw', role='student',
+                first_name=f"Student{i}", guardian_email=f"guardian{i}@example.com"
+            )
+            for i in range(3)
+        ]
+        for student in self.students:
+            ChatSession.objects.create(user=student, stress_level='high')
+        self.engine = WeeklyReportEngine(*current_week_range(), alert_service=AlertService())
+
+    def _student_ids(self):
+        return [student.id for student in self.students]
+
+
+class WeeklyReportEngineTests(WeeklyReportSetupMixin, TestCase):
+    def test_reports_are_created_and_queued_once(self):
+        created = self.engine.generate_chunk(self._student_ids())
+
+        self.assertEqual(len(created), 3)
+        self.assertEqual(WeeklyReport.objects.count(), 3)
+        self.assertEqual(NotificationOutbox.objects.filter(template='weekly_report').count(), 3)
+
+    def test_rerun_sends_only_new_reports(self):
+        self.engine.generate_chunk(self._student_ids()[:2])
+
+        # A resumed run covering students that already have their report
+        created = self.engine.generate_chunk(self._student_ids())
+
+        self.assertEqual([report.user_id for report in created], [self.students[2].id])
+        self.assertEqual(Alert.objects.filter(alert_type='weekly_report').count(), 3)
+        self.assertEqual(
+            sorted(NotificationOutbox.objects.values_list('recipient', flat=True)),
+            [student.guardian_email for student in self.students]
+        )
+
+    def test_run_covers_every_student_once(self):
+        self.assertEqual(self.engine.run(), 3)
+        self.assertEqual(self.engine.run(), 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 3)
+
+    def test_reports_are_not_stored_when_their_emails_cannot_be_queued(self):
+        with mock.patch.object(AlertService, '_queue', side_effect=RuntimeError('outbox unavailable')):
+            with self.assertRaises(RuntimeError):
+                self.engine.generate_chunk(self._student_ids())
+
+        self.assertFalse(WeeklyReport.objects.exists())
+        self.assertFalse(Alert.objects.exists())
+
+        # The retried chunk writes and queues everything
+        self.assertEqual(len(self.engine.generate_chunk(self._student_ids())), 3)
+        self.assertEqual(NotificationOutbox.objects.count(), 3)
+
+
+class WeeklyReportRunTests(TestCase):
+    def setUp(self):
+        week_start, week_end = current_week_range()
+        self.run = WeeklyReportRun.objects.create(week_start=week_start, week_end=week_end, total_shards=2)
+        WeeklyReportShard.objects.create(run=self.run, min_user_id=1, max_user_id=10, status='completed')
+        WeeklyReportShard.objects.create(run=self.run, min_user_id=11, max_user_id=20, status='failed')
+
+    def test_error_callback_closes_the_run_as_failed(self):
+        fail_weekly_report_run(None, RuntimeError('shard gave up'), None, self.run.id)
+
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.status, 'failed')
+        self.assertIsNotNone(self.run.finished_at)
+
+    def test_chord_callback_carries_the_error_callback(self):
+        with mock.patch('mindcare_api.tasks.chord') as chord:
+            generate_weekly_reports()
+
+        callback = chord.return_value.call_args.args[0]
+        self.assertEqual(callback.task, 'mindcare_api.tasks.finalize_weekly_report_run')
+        [errback] = callback.options['link_error']
+        self.assertEqual(errback.task, 'mindcare_api.tasks.fail_weekly_report_run')
+        self.assertEqual(errback.args, (self.run.id,))
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Row locks need PostgreSQL')
+class ConcurrentWeeklyReportTests(WeeklyReportSetupMixin, TransactionTestCase):
+    def test_concurrent_runs_send_each_report_once(self):
+        barrier = threading.Barrier(2)
+
+        def generate():
+            try:
+                barrier.wait()
+                return len(self.engine.generate_chunk(self._student_ids()))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            created = [future.result() for future in [pool.submit(generate) for _ in range(2)]]
+
+        self.assertEqual(sorted(created), [0, 3])
+        self.assertEqual(NotificationOutbox.objects.count(), 3)
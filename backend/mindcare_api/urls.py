@@ -12,7 +12,9 @@ urlpatterns = [
     # Chat
     path('chat/sessions/', views.ChatSessionListCreateView.as_view(), name='chat-sessions'),
     path('chat/sessions/<int:pk>/', views.ChatSessionDetailView.as_view(), name='chat-session-detail'),
+    path('chat/sessions/<int:session_id>/messages/', views.ChatMessageListView.as_view(), name='chat-session-messages'),
     path('chat/sessions/<int:session_id>/message/', views.send_message, name='send-message'),
+    path('chat/sessions/<int:session_id>/message/stream/', views.stream_message, name='send-message-stream'),
     
     # Bookings
     path('bookings/', views.BookingListCreateView.as_view(), name='bookings'),
@@ -24,6 +26,7 @@ urlpatterns = [
     # Support Groups
     path('groups/', views.SupportGroupListView.as_view(), name='support-groups'),
     path('groups/memberships/', views.GroupMembershipListCreateView.as_view(), name='group-memberships'),
+    path('groups/memberships/<int:pk>/', views.GroupMembershipDetailView.as_view(), name='group-membership-detail'),
     path('groups/posts/', views.PeerPostListCreateView.as_view(), name='peer-posts'),
     
     # Dashboard
@@ -33,4 +36,5 @@ urlpatterns = [
     
     # Emergency
     path('emergency/alert/', views.emergency_alert, name='emergency-alert'),
+    path('alerts/', views.AlertListView.as_view(), name='alerts'),
 ]
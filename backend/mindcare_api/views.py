@@ -2,10 +2,16 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Q, Avg, Count
+from django.db.models import Q, Avg, Count, Max, OuterRef, Subquery
+from django.db.models.functions import Substr
+from django.shortcuts import get_object_or_404
 from datetime import datetime, timedelta
+import json
 import logging
 
 from .models import (
@@ -13,13 +19,23 @@ from .models import (
     Alert, Resource, SupportGroup, GroupMembership, PeerPost
 )
 from .serializers import (
-    UserSerializer, LoginSerializer, ChatSessionSerializer, ChatMessageSerializer,
+    UserSerializer, LoginSerializer, ChatSessionSerializer, ChatSessionSummarySerializer, ChatMessageSerializer,
     BookingSerializer, WeeklyReportSerializer, AlertSerializer, ResourceSerializer,
     SupportGroupSerializer, PeerPostSerializer, GroupMembershipSerializer
 )
 from .services.ai_service import AIService
 from .services.emotion_service import EmotionDetectionService
 from .services.alert_service import AlertService
+from .services.group_service import SupportGroupService
+from .services.dashboard_cache import get_dashboard_cache
+from .services.feed_cache import get_peer_feed_cache
+from .services.resource_search import filter_by_tags, search_resources
+from .services.risk_index import get_student_risk_index
+from .services.rollup_service import daily_stats_rollup
+from .session_events import on_session_stress_changed
+from .pagination import ChatMessagePagination, PeerPostPagination, AlertPagination
+from .conditional import ConditionalGetMixin, conditional_get, make_etag, queryset_validators
+from .services.context_engine import ConversationContextEngine
 
 logger = logging.getLogger(__name__)
 
@@ -62,20 +78,115 @@ def logout(request):
         return Response({'error': 'Error logging out'}, status=status.HTTP_400_BAD_REQUEST)
 
 # Chat Views
+def annotate_session_summaries(queryset):
+    """Add message count, last message preview and timestamp computed in SQL"""
+    last_message = ChatMessage.objects.filter(session=OuterRef('pk')).order_by('-timestamp', '-id')
+    return queryset.annotate(
+        message_count=Count('messages'),
+        last_message_preview=Subquery(
+            last_message.annotate(preview=Substr('message', 1, 100)).values('preview')[:1]
+        ),
+        last_message_at=Subquery(last_message.values('timestamp')[:1]),
+    )
+
 class ChatSessionListCreateView(generics.ListCreateAPIView):
-    serializer_class = ChatSessionSerializer
+    serializer_class = ChatSessionSummarySerializer
     
     def get_queryset(self):
-        return ChatSession.objects.filter(user=self.request.user)
+        return annotate_session_summaries(
+            ChatSession.objects.filter(user=self.request.user)
+        ).order_by('-session_start')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class ChatSessionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ChatSessionDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ChatSessionSerializer
     
     def get_queryset(self):
         return ChatSession.objects.filter(user=self.request.user)
+    
+    def get_validators(self):
+        # The session's own fields plus a summary of its messages: new messages
+        # change the count and last id, scoring and flagging the other counts
+        session = self.get_object()
+        messages = session.messages.aggregate(
+            count=Count('id'),
+            last_id=Max('id'),
+            scored=Count('emotion_detected'),
+            flagged=Count('id', filter=Q(is_flagged=True))
+        )
+        etag = make_etag(
+            session.id, session.session_end, session.overall_emotion, session.stress_level,
+            session.session_summary, session.is_active, *messages.values()
+        )
+        return etag, None
+    
+    def perform_update(self, serializer):
+        # A stress level set by hand moves the rollup, risk index and stress
+        # window just like one computed from the conversation
+        previous_level = serializer.instance.stress_level
+        session = serializer.save()
+        on_session_stress_changed(self.request.user, session, previous_level)
+
+class ChatMessageListView(generics.ListAPIView):
+    """Messages of one session, oldest first, in cursor-paginated pages"""
+    serializer_class = ChatMessageSerializer
+    pagination_class = ChatMessagePagination
+    
+    def get_queryset(self):
+        session = get_object_or_404(ChatSession, id=self.kwargs['session_id'], user=self.request.user)
+        return ChatMessage.objects.filter(session=session)
+
+def _record_user_message(session, user_message):
+    """Save a user message and attach its detected emotion"""
+    user_msg = ChatMessage.objects.create(
+        session=session,
+        sender='user',
+        message=user_message
+    )
+    
+    # Detect emotion in user message
+    emotion_service = EmotionDetectionService()
+    emotion_result = emotion_service.detect_emotion(user_message)
+    
+    if emotion_result:
+        emotion_service.record_message_emotion(user_msg, emotion_result)
+    
+    # Keep the rolling prompt context current without re-reading history
+    ConversationContextEngine().record_turn(
+        session, 'user', user_message,
+        emotion=emotion_result['emotion'] if emotion_result else None
+    )
+    
+    return user_msg, emotion_service
+
+def _record_bot_message(user, session, emotion_service, bot_response):
+    """Save the bot reply, update the session stress level and alert if needed"""
+    bot_msg = ChatMessage.objects.create(
+        session=session,
+        sender='bot',
+        message=bot_response
+    )
+    ConversationContextEngine().record_turn(session, 'bot', bot_response)
+    
+    # Update session stress level based on conversation
+    previous_level = session.stress_level
+    stress_level = emotion_service.calculate_session_stress(session)
+    session.stress_level = stress_level
+    session.save(update_fields=['stress_level'])
+    on_session_stress_changed(user, session, previous_level)
+    
+    # Check if alert is needed
+    if stress_level in ['high', 'critical']:
+        alert_service = AlertService()
+        alert_service.check_and_send_alert(user, session)
+    
+    return bot_msg, stress_level
+
+def _sse_event(event, data):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
 
 @api_view(['POST'])
 def send_message(request, session_id):
@@ -88,41 +199,14 @@ def send_message(request, session_id):
             return Response({'error': 'Message is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Save user message
-        user_msg = ChatMessage.objects.create(
-            session=session,
-            sender='user',
-            message=user_message
-        )
-        
-        # Detect emotion in user message
-        emotion_service = EmotionDetectionService()
-        emotion_result = emotion_service.detect_emotion(user_message)
-        
-        if emotion_result:
-            user_msg.emotion_detected = emotion_result['emotion']
-            user_msg.emotion_confidence = emotion_result['confidence']
-            user_msg.save()
+        user_msg, emotion_service = _record_user_message(session, user_message)
         
         # Generate AI response
         ai_service = AIService()
         bot_response = ai_service.generate_response(user_message, session)
         
         # Save bot message
-        bot_msg = ChatMessage.objects.create(
-            session=session,
-            sender='bot',
-            message=bot_response
-        )
-        
-        # Update session stress level based on conversation
-        stress_level = emotion_service.calculate_session_stress(session)
-        session.stress_level = stress_level
-        session.save()
-        
-        # Check if alert is needed
-        if stress_level in ['high', 'critical']:
-            alert_service = AlertService()
-            alert_service.check_and_send_alert(request.user, session)
+        bot_msg, stress_level = _record_bot_message(request.user, session, emotion_service, bot_response)
         
         return Response({
             'user_message': ChatMessageSerializer(user_msg).data,
@@ -136,6 +220,60 @@ def send_message(request, session_id):
         logger.error(f"Error in send_message: {str(e)}")
         return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+def stream_message(request, session_id):
+    """Send a message in a chat session and stream the AI response as Server-Sent Events"""
+    try:
+        session = ChatSession.objects.get(id=session_id, user=request.user)
+    except ChatSession.DoesNotExist:
+        return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    user_message = request.data.get('message', '')
+    if not user_message:
+        return Response({'error': 'Message is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    user = request.user
+    
+    def event_stream():
+        user_msg, emotion_service = _record_user_message(session, user_message)
+        yield _sse_event('user_message', ChatMessageSerializer(user_msg).data)
+        
+        ai_service = AIService()
+        chunks = []
+        try:
+            for chunk in ai_service.stream_response(user_message, session):
+                chunks.append(chunk)
+                yield _sse_event('token', {'content': chunk})
+        except Exception as e:
+            logger.error(f"Error streaming AI response: {str(e)}")
+            # Never persist a truncated reply; the fallback replaces it below
+            chunks = []
+        
+        # The safety filter runs on the complete text before anything is persisted;
+        # if it rejects the streamed text the client is told to replace it
+        streamed = ''.join(chunks)
+        bot_response = ai_service.finalize_response(streamed)
+        if bot_response != streamed.strip():
+            yield _sse_event('replace', {'content': bot_response})
+        
+        try:
+            bot_msg, stress_level = _record_bot_message(user, session, emotion_service, bot_response)
+        except Exception as e:
+            logger.error(f"Error in stream_message: {str(e)}")
+            yield _sse_event('error', {'error': 'Internal server error'})
+            return
+        
+        yield _sse_event('done', {
+            'bot_message': ChatMessageSerializer(bot_msg).data,
+            'session_stress_level': stress_level
+        })
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 # Booking Views
 class BookingListCreateView(generics.ListCreateAPIView):
     serializer_class = BookingSerializer
@@ -160,14 +298,19 @@ class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Booking.objects.filter(student=self.request.user)
 
 # Resource Views
-class ResourceListView(generics.ListAPIView):
+class ResourceListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ResourceSerializer
     
+    def get_validators(self):
+        return queryset_validators(self.request, self.filter_queryset(self.get_queryset()))
+    
     def get_queryset(self):
-        queryset = Resource.objects.filter(is_active=True)
+        queryset = Resource.objects.filter(is_active=True).defer('search_vector')
         category = self.request.query_params.get('category')
         resource_type = self.request.query_params.get('type')
         language = self.request.query_params.get('language', 'en')
+        tags = self.request.query_params.get('tags')
+        search = self.request.query_params.get('q', '').strip()
         
         if category:
             queryset = queryset.filter(category=category)
@@ -175,43 +318,78 @@ class ResourceListView(generics.ListAPIView):
             queryset = queryset.filter(resource_type=resource_type)
         if language:
             queryset = queryset.filter(language=language)
+        if tags:
+            # ?tags=a,b matches resources tagged with both
+            queryset = filter_by_tags(queryset, [tag.strip() for tag in tags.split(',') if tag.strip()])
+        if search:
+            queryset = search_resources(queryset, search)
             
         return queryset
 
 # Support Group Views
-class SupportGroupListView(generics.ListAPIView):
+class SupportGroupListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = SupportGroupSerializer
     queryset = SupportGroup.objects.filter(is_active=True)
+    
+    def get_validators(self):
+        return queryset_validators(self.request, self.filter_queryset(self.get_queryset()))
 
 class GroupMembershipListCreateView(generics.ListCreateAPIView):
     serializer_class = GroupMembershipSerializer
     
     def get_queryset(self):
-        return GroupMembership.objects.filter(user=self.request.user, is_active=True)
+        return GroupMembership.objects.filter(
+            user=self.request.user, is_active=True
+        ).select_related('group')
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # Rejoining reactivates the existing membership
+        serializer.instance = SupportGroupService().join_group(
+            self.request.user, serializer.validated_data['group']
+        )
+
+class GroupMembershipDetailView(generics.DestroyAPIView):
+    """Leave a group; the membership is deactivated rather than deleted"""
+    serializer_class = GroupMembershipSerializer
+    
+    def get_queryset(self):
+        return GroupMembership.objects.filter(user=self.request.user, is_active=True)
+    
+    def perform_destroy(self, instance):
+        SupportGroupService().leave_group(instance)
 
 class PeerPostListCreateView(generics.ListCreateAPIView):
     serializer_class = PeerPostSerializer
+    pagination_class = PeerPostPagination
     
     def get_queryset(self):
         group_id = self.request.query_params.get('group_id')
         if group_id:
-            return PeerPost.objects.filter(group_id=group_id, is_flagged=False)
-        return PeerPost.objects.filter(is_flagged=False)
+            return PeerPost.objects.filter(group_id=group_id, is_flagged=False).select_related('user')
+        return PeerPost.objects.filter(is_flagged=False).select_related('user')
+    
+    def list(self, request, *args, **kwargs):
+        # The first page of a group feed comes pre-serialized from the feed
+        # cache; older pages are read from the database by cursor
+        group_id = request.query_params.get('group_id', '')
+        feed_cache = get_peer_feed_cache()
+        if feed_cache and group_id.isdigit() and not request.query_params.get(self.paginator.cursor_query_param):
+            rows = feed_cache.get_page(int(group_id), self.paginator.get_page_size(request))
+            if rows is not None:
+                page = self.paginator.paginate_serialized(rows, request)
+                return self.paginator.get_paginated_response(page)
+        return super().list(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 # Dashboard and Analytics Views
-@api_view(['GET'])
-def user_dashboard(request):
-    """Get user dashboard data"""
-    user = request.user
-    
+def build_user_dashboard(user):
+    """Compute the dashboard payload of a user"""
     # Recent chat sessions
-    recent_sessions = ChatSession.objects.filter(user=user).order_by('-session_start')[:5]
+    recent_sessions = annotate_session_summaries(
+        ChatSession.objects.filter(user=user)
+    ).order_by('-session_start')[:5]
     
     # Upcoming bookings
     upcoming_bookings = Booking.objects.filter(
@@ -221,34 +399,52 @@ def user_dashboard(request):
     ).order_by('appointment_date', 'appointment_time')[:3]
     
     # Weekly stress trend
-    week_ago = timezone.now() - timedelta(days=7)
-    stress_data = ChatSession.objects.filter(
-        user=user,
-        session_start__gte=week_ago
-    ).values('stress_level').annotate(count=Count('id'))
+    stress_data = daily_stats_rollup.stress_trend(user, days=7)
     
     # Support groups
-    user_groups = GroupMembership.objects.filter(user=user, is_active=True)
+    user_groups = GroupMembership.objects.filter(user=user, is_active=True).select_related('group')
     
-    return Response({
-        'recent_sessions': ChatSessionSerializer(recent_sessions, many=True).data,
+    return {
+        'recent_sessions': ChatSessionSummarySerializer(recent_sessions, many=True).data,
         'upcoming_bookings': BookingSerializer(upcoming_bookings, many=True).data,
         'stress_trend': list(stress_data),
         'support_groups': GroupMembershipSerializer(user_groups, many=True).data,
         'total_sessions': ChatSession.objects.filter(user=user).count(),
         'total_bookings': Booking.objects.filter(student=user).count(),
-    })
+    }
+
+@api_view(['GET'])
+def user_dashboard(request):
+    """Get user dashboard data"""
+    user = request.user
+    
+    dashboard_cache = get_dashboard_cache()
+    if dashboard_cache is None:
+        return Response(build_user_dashboard(user))
+    return Response(dashboard_cache.get_or_build(user.id, lambda: build_user_dashboard(user)))
 
 @api_view(['GET'])
 def weekly_report(request):
     """Get user's latest weekly report"""
-    try:
-        report = WeeklyReport.objects.filter(user=request.user).latest('week_start')
-        return Response(WeeklyReportSerializer(report).data)
-    except WeeklyReport.DoesNotExist:
+    latest = WeeklyReport.objects.filter(user=request.user).order_by('-week_start').values('id', 'created_at').first()
+    if latest is None:
         return Response({'message': 'No weekly report available'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # Reports are never modified once generated
+    return conditional_get(
+        request, make_etag(latest['id'], latest['created_at']), latest['created_at'],
+        lambda: Response(WeeklyReportSerializer(WeeklyReport.objects.get(id=latest['id'])).data)
+    )
 
 # Emergency and Crisis Views
+class AlertListView(generics.ListAPIView):
+    """Alert history of the current user, newest first"""
+    serializer_class = AlertSerializer
+    pagination_class = AlertPagination
+    
+    def get_queryset(self):
+        return Alert.objects.filter(user=self.request.user)
+
 @api_view(['POST'])
 def emergency_alert(request):
     """Trigger emergency alert"""
@@ -285,22 +481,39 @@ def counselor_dashboard(request):
         appointment_date__range=[week_start, week_end]
     ).count()
     
-    # High-risk students (those with recent critical stress levels)
-    high_risk_sessions = ChatSession.objects.filter(
+    # High-risk students (those with recent critical stress levels), highest risk first;
+    # ?caseload=true limits them to students who have booked with this counselor
+    caseload = None
+    if request.query_params.get('caseload', '').lower() in ('1', 'true'):
+        caseload = Booking.objects.filter(
+            counselor=request.user
+        ).exclude(status='cancelled').order_by().values_list('student_id', flat=True).distinct()
+    risk_index = get_student_risk_index()
+    high_risk = risk_index.top(settings.COUNSELOR_HIGH_RISK_LIMIT, user_ids=caseload)
+    student_ids = [row['user_id'] for row in high_risk]
+    students = User.objects.in_bulk(student_ids)
+    # The board counts whole days, from the start of the window's first day
+    first_day = timezone.make_aware(
+        datetime.combine(timezone.localdate(risk_index.window_start()), datetime.min.time())
+    )
+    last_sessions = dict(ChatSession.objects.filter(
+        user_id__in=student_ids,
         stress_level='critical',
-        session_start__gte=timezone.now() - timedelta(days=7)
-    ).select_related('user').distinct('user')
+        session_start__gte=first_day
+    ).order_by().values('user_id').annotate(last=Max('session_start')).values_list('user_id', 'last'))
     
     return Response({
         'today_appointments': BookingSerializer(today_bookings, many=True).data,
         'week_appointment_count': week_bookings,
         'high_risk_students': [
             {
-                'id': session.user.id,
-                'name': session.user.get_full_name(),
-                'last_session': session.session_start,
-                'stress_level': session.stress_level
+                'id': row['user_id'],
+                'name': students[row['user_id']].get_full_name(),
+                'last_session': last_sessions.get(row['user_id']),
+                'stress_level': 'critical',
+                'critical_sessions': row['critical_sessions'],
+                'risk_score': row['risk_score']
             }
-            for session in high_risk_sessions
+            for row in high_risk if row['user_id'] in students
         ]
     })
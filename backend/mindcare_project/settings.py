@@ -1,4 +1,5 @@
 import os
+from celery.schedules import crontab
 from decouple import config
 from pathlib import Path
 
@@ -21,7 +22,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'mindcare_api',
 ]
@@ -69,6 +72,8 @@ DATABASES = {
     }
 }
 
+AUTH_USER_MODEL = 'mindcare_api.User'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,7 +106,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'mindcare_api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -121,10 +126,81 @@ CORS_ALLOW_CREDENTIALS = True
 # Celery Configuration (for background tasks)
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
+CELERY_BEAT_SCHEDULE = {
+    # Delivers retries, expired claims and notifications whose dispatch,
+    # started when their alert was created, never ran
+    'dispatch-notifications': {
+        'task': 'mindcare_api.tasks.dispatch_notifications',
+        'schedule': crontab(),
+    },
+    # Risk scores are only lowered when recomputed, so rescore the counselor
+    # board as sessions and alerts leave its window
+    'rebuild-risk-index': {
+        'task': 'mindcare_api.tasks.rebuild_risk_index',
+        'schedule': crontab(minute=5),
+    },
+}
+
+# Shared Redis used by the application caches (leave empty to keep caches in-process)
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+CACHE_REDIS_TIMEOUT_SECONDS = config('CACHE_REDIS_TIMEOUT_SECONDS', default=0.5, cast=float)
+
+# Per-group peer post feed cache (needs CACHE_REDIS_URL)
+PEER_FEED_CACHE_ENABLED = config('PEER_FEED_CACHE_ENABLED', default=True, cast=bool)
+PEER_FEED_CACHE_SIZE = config('PEER_FEED_CACHE_SIZE', default=200, cast=int)
+PEER_FEED_CACHE_TTL_SECONDS = config('PEER_FEED_CACHE_TTL_SECONDS', default=3600, cast=int)
+
+# Token -> user lookups for API authentication; CACHE_REDIS_URL adds the shared tier
+AUTH_TOKEN_CACHE_SIZE = config('AUTH_TOKEN_CACHE_SIZE', default=10000, cast=int)
+AUTH_TOKEN_CACHE_TTL_SECONDS = config('AUTH_TOKEN_CACHE_TTL_SECONDS', default=60, cast=int)
+
+# Per-user dashboard cache (needs CACHE_REDIS_URL)
+DASHBOARD_CACHE_ENABLED = config('DASHBOARD_CACHE_ENABLED', default=True, cast=bool)
+DASHBOARD_CACHE_TTL_SECONDS = config('DASHBOARD_CACHE_TTL_SECONDS', default=300, cast=int)
+
+# Text search configuration used for the resource library
+RESOURCE_SEARCH_CONFIG = config('RESOURCE_SEARCH_CONFIG', default='english')
 
 # AI and ML Configuration
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+# Point at a local stub server to develop or test without the real API
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='https://api.openai.com/v1')
+OPENAI_MODEL = config('OPENAI_MODEL', default='gpt-3.5-turbo')
+# Shared LLM client: per-call deadline, retry and circuit breaker policy
+LLM_TIMEOUT_SECONDS = config('LLM_TIMEOUT_SECONDS', default=20, cast=float)
+LLM_CONNECT_TIMEOUT_SECONDS = config('LLM_CONNECT_TIMEOUT_SECONDS', default=3, cast=float)
+LLM_MAX_RETRIES = config('LLM_MAX_RETRIES', default=2, cast=int)
+LLM_RETRY_BACKOFF_SECONDS = config('LLM_RETRY_BACKOFF_SECONDS', default=0.5, cast=float)
+LLM_POOL_SIZE = config('LLM_POOL_SIZE', default=20, cast=int)
+LLM_CIRCUIT_FAILURE_THRESHOLD = config('LLM_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+LLM_CIRCUIT_RESET_SECONDS = config('LLM_CIRCUIT_RESET_SECONDS', default=30, cast=float)
+# Optional JSON file of extra safety phrases: {"crisis": [...], "medical_advice": [...]}
+SAFETY_PHRASES_FILE = config('SAFETY_PHRASES_FILE', default='')
+# Rolling conversation context kept on each ChatSession
+CHAT_CONTEXT_TAIL_TURNS = config('CHAT_CONTEXT_TAIL_TURNS', default=6, cast=int)
+CHAT_CONTEXT_SUMMARY_MAX_CHARS = config('CHAT_CONTEXT_SUMMARY_MAX_CHARS', default=1200, cast=int)
+CHAT_CONTEXT_TOKEN_BUDGET = config('CHAT_CONTEXT_TOKEN_BUDGET', default=600, cast=int)
 HUGGINGFACE_API_KEY = config('HUGGINGFACE_API_KEY', default='')
+EMOTION_MODEL_NAME = config('EMOTION_MODEL_NAME', default='bhadresh-savani/distilbert-base-uncased-emotion')
+# Inference backend for the emotion model: 'torch' (transformers pipeline) or 'onnx'
+# (int8 quantized graph produced by `manage.py export_emotion_onnx`)
+EMOTION_BACKEND = config('EMOTION_BACKEND', default='torch')
+EMOTION_ONNX_MODEL_DIR = config('EMOTION_ONNX_MODEL_DIR', default=str(BASE_DIR / 'models' / 'emotion-onnx'))
+EMOTION_ONNX_THREADS = config('EMOTION_ONNX_THREADS', default=0, cast=int)
+# Bump to invalidate cached emotion results when a model is retrained under the same id
+EMOTION_MODEL_REVISION = config('EMOTION_MODEL_REVISION', default='')
+# Load the shared emotion model when the app registry is ready (set per worker type)
+EMOTION_MODEL_WARMUP = config('EMOTION_MODEL_WARMUP', default=False, cast=bool)
+# Micro-batching of concurrent emotion detection requests
+EMOTION_BATCHING_ENABLED = config('EMOTION_BATCHING_ENABLED', default=True, cast=bool)
+EMOTION_BATCH_MAX_SIZE = config('EMOTION_BATCH_MAX_SIZE', default=16, cast=int)
+EMOTION_BATCH_MAX_WAIT_MS = config('EMOTION_BATCH_MAX_WAIT_MS', default=5, cast=float)
+EMOTION_BATCH_TIMEOUT_SECONDS = config('EMOTION_BATCH_TIMEOUT_SECONDS', default=30, cast=float)
+# Cache of emotion results keyed by a hash of the normalized text and model version
+EMOTION_CACHE_ENABLED = config('EMOTION_CACHE_ENABLED', default=True, cast=bool)
+EMOTION_CACHE_MAX_ENTRIES = config('EMOTION_CACHE_MAX_ENTRIES', default=10000, cast=int)
+EMOTION_CACHE_TTL_SECONDS = config('EMOTION_CACHE_TTL_SECONDS', default=86400, cast=int)
+EMOTION_CACHE_SHARED = config('EMOTION_CACHE_SHARED', default=True, cast=bool)
 
 # Messaging Configuration
 SENDGRID_API_KEY = config('SENDGRID_API_KEY', default='')
@@ -132,11 +208,28 @@ TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
 
+# Guardian notification delivery (providers are dotted paths, e.g. the in-memory fakes for local testing)
+NOTIFICATION_FROM_EMAIL = config('NOTIFICATION_FROM_EMAIL', default='noreply@mindcare.edu')
+NOTIFICATION_EMAIL_PROVIDER = config('NOTIFICATION_EMAIL_PROVIDER', default='mindcare_api.services.notification_providers.SendGridEmailProvider')
+NOTIFICATION_SMS_PROVIDER = config('NOTIFICATION_SMS_PROVIDER', default='mindcare_api.services.notification_providers.TwilioSmsProvider')
+NOTIFICATION_BATCH_SIZE = config('NOTIFICATION_BATCH_SIZE', default=500, cast=int)
+NOTIFICATION_SMS_CONCURRENCY = config('NOTIFICATION_SMS_CONCURRENCY', default=8, cast=int)
+NOTIFICATION_MAX_ATTEMPTS = config('NOTIFICATION_MAX_ATTEMPTS', default=5, cast=int)
+NOTIFICATION_RETRY_BACKOFF_SECONDS = config('NOTIFICATION_RETRY_BACKOFF_SECONDS', default=30, cast=float)
+NOTIFICATION_CLAIM_SECONDS = config('NOTIFICATION_CLAIM_SECONDS', default=300, cast=int)
+
 # Mental Health System Configuration
 STRESS_THRESHOLD_CRITICAL = config('STRESS_THRESHOLD_CRITICAL', default=0.8, cast=float)
 STRESS_THRESHOLD_HIGH = config('STRESS_THRESHOLD_HIGH', default=0.6, cast=float)
 STRESS_THRESHOLD_MODERATE = config('STRESS_THRESHOLD_MODERATE', default=0.4, cast=float)
 ALERT_COOLDOWN_HOURS = config('ALERT_COOLDOWN_HOURS', default=24, cast=int)
+PERSISTENT_STRESS_WINDOW_HOURS = config('PERSISTENT_STRESS_WINDOW_HOURS', default=72, cast=int)
+PERSISTENT_STRESS_THRESHOLD = config('PERSISTENT_STRESS_THRESHOLD', default=3, cast=int)
+PERSISTENT_STRESS_COOLDOWN_HOURS = config('PERSISTENT_STRESS_COOLDOWN_HOURS', default=48, cast=int)
+WEEKLY_REPORT_CHUNK_SIZE = config('WEEKLY_REPORT_CHUNK_SIZE', default=500, cast=int)
+WEEKLY_REPORT_SHARD_SIZE = config('WEEKLY_REPORT_SHARD_SIZE', default=5000, cast=int)
+RISK_INDEX_WINDOW_DAYS = config('RISK_INDEX_WINDOW_DAYS', default=7, cast=int)
+COUNSELOR_HIGH_RISK_LIMIT = config('COUNSELOR_HIGH_RISK_LIMIT', default=50, cast=int)
 
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True